@@ -0,0 +1 @@
+"""Scheduler micro-benchmarks and synthetic workload generation."""
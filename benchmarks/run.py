@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict
+from typing import Callable, Dict, List, Optional
+
+from lab_gpu.master import Master
+from lab_gpu.models import TaskStatus
+from lab_gpu.scheduler import Scheduler, SchedulerPolicy
+
+from .workload import WorkloadSpec, make_cluster, make_profiles, make_tasks
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def _latency_stats(samples: List[float]) -> Dict[str, float]:
+    total = sum(samples)
+    return {
+        "iterations": len(samples),
+        "per_sec": round(len(samples) / total, 2) if total > 0 else 0.0,
+        "p50_ms": round(_percentile(samples, 50) * 1000, 4),
+        "p99_ms": round(_percentile(samples, 99) * 1000, 4),
+        "max_ms": round(max(samples, default=0.0) * 1000, 4),
+    }
+
+
+def build_master(spec: WorkloadSpec, policy: Optional[SchedulerPolicy] = None) -> Master:
+    master = Master(Scheduler(policy))
+    for node in make_cluster(spec):
+        master.register_node(node)
+    master.scheduler.profiles.update(make_profiles(spec))
+    for task in make_tasks(spec):
+        master.submit(task)
+    return master
+
+
+def bench_schedule(spec: WorkloadSpec, ticks: int, churn: float, policy: SchedulerPolicy) -> Dict[str, float]:
+    master = build_master(spec, policy)
+    rng = random.Random(spec.seed + 3)
+    running: List[int] = []
+    samples: List[float] = []
+    placed = 0
+    for _ in range(ticks):
+        start = time.perf_counter()
+        assignments = master.schedule_once()
+        samples.append(time.perf_counter() - start)
+        placed += len(assignments)
+        running.extend(task_id for task_id, _, _ in assignments)
+        finished = int(len(running) * churn)
+        for _ in range(finished):
+            task_id = running.pop(rng.randrange(len(running)))
+            master.mark_succeeded(task_id)
+    result = _latency_stats(samples)
+    result["assignments"] = placed
+    if master.scheduler.last_tick is not None:
+        result["last_tick"] = asdict(master.scheduler.last_tick)
+    return result
+
+
+def bench_summary(spec: WorkloadSpec, iterations: int, policy: SchedulerPolicy) -> Dict[str, float]:
+    master = build_master(spec, policy)
+    master.schedule_once()
+    samples: List[float] = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        master.summary()
+        samples.append(time.perf_counter() - start)
+    return _latency_stats(samples)
+
+
+def bench_oom_recovery(spec: WorkloadSpec, iterations: int, policy: SchedulerPolicy) -> Dict[str, float]:
+    master = build_master(spec, policy)
+    running = [task_id for task_id, _, _ in master.schedule_once()]
+    if not running:
+        return _latency_stats([])
+    rng = random.Random(spec.seed + 4)
+    samples: List[float] = []
+    for _ in range(iterations):
+        task_id = rng.choice(running)
+        task = master.scheduler.state.tasks[task_id]
+        start = time.perf_counter()
+        master.scheduler.apply_oom_recovery(task_id, 1.0)
+        samples.append(time.perf_counter() - start)
+        master.scheduler.update_task_status(task.task_id, TaskStatus.RUNNING)
+    return _latency_stats(samples)
+
+
+def peak_memory_mb(build: Callable[[], object]) -> float:
+    tracemalloc.start()
+    try:
+        state = build()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del state
+    return round(peak / (1024 * 1024), 2)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def run(spec: WorkloadSpec, ticks: int, iterations: int, churn: float, policy: SchedulerPolicy) -> dict:
+    def _build_and_tick() -> Master:
+        master = build_master(spec, policy)
+        master.schedule_once()
+        return master
+
+    return {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "workload": asdict(spec),
+        "policy": asdict(policy),
+        "ticks": ticks,
+        "churn": churn,
+        "results": {
+            "schedule": bench_schedule(spec, ticks, churn, policy),
+            "summary": bench_summary(spec, iterations, policy),
+            "oom_recovery": bench_oom_recovery(spec, iterations, policy),
+        },
+        "peak_memory_mb": peak_memory_mb(_build_and_tick),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Lab-GPU scheduler micro-benchmarks")
+    parser.add_argument("--gpus", type=int, default=512)
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--gpus-per-node", type=int, default=8)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--profiles", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--ticks", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--churn", type=float, default=0.1, help="fraction of running tasks finished per tick")
+    parser.add_argument("--placement", default="first-fit")
+    parser.add_argument("--partitioned", action="store_true", help="schedule gpu_type pools independently")
+    parser.add_argument("--pool-workers", type=int, default=4)
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    spec = WorkloadSpec(
+        gpus=args.gpus,
+        tasks=args.tasks,
+        gpus_per_node=args.gpus_per_node,
+        users=args.users,
+        profiles=args.profiles,
+        seed=args.seed,
+    )
+    policy = SchedulerPolicy(placement=args.placement, partitioned=args.partitioned, pool_workers=args.pool_workers)
+    report = run(spec, args.ticks, args.iterations, args.churn, policy)
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(payload + "\n")
+    else:
+        sys.stdout.write(payload + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
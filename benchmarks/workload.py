@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import random
+from typing import Dict, List, Optional
+
+from lab_gpu.models import GPU, Node, Priority, Task
+from lab_gpu.scheduler import TaskProfile
+
+GPU_TYPES: Dict[Optional[str], float] = {"A100": 80.0, "H100": 80.0, "3090": 24.0, None: 48.0}
+VRAM_CHOICES = [0.0, 2.0, 4.0, 8.0, 12.0, 16.0, 20.0, 40.0, 70.0]
+
+
+@dataclass
+class WorkloadSpec:
+    gpus: int = 512
+    tasks: int = 10000
+    gpus_per_node: int = 8
+    users: int = 50
+    profiles: int = 200
+    typed_fraction: float = 0.4
+    time_limit_fraction: float = 0.6
+    seed: int = 0
+
+
+def make_cluster(spec: WorkloadSpec) -> List[Node]:
+    rng = random.Random(spec.seed)
+    types = list(GPU_TYPES)
+    nodes: List[Node] = []
+    remaining = spec.gpus
+    while remaining > 0:
+        count = min(spec.gpus_per_node, remaining)
+        gpu_type = rng.choice(types)
+        vram = GPU_TYPES[gpu_type]
+        nodes.append(
+            Node(
+                name=f"node-{len(nodes):05d}",
+                gpus=[GPU(gpu_id=i, total_vram_gb=vram) for i in range(count)],
+                gpu_type=gpu_type,
+            )
+        )
+        remaining -= count
+    return nodes
+
+
+def make_profiles(spec: WorkloadSpec) -> Dict[str, TaskProfile]:
+    rng = random.Random(spec.seed + 1)
+    return {
+        f"profile-{i}": TaskProfile(peak_vram_gb=rng.choice(VRAM_CHOICES[1:]), success_count=rng.randint(1, 20))
+        for i in range(spec.profiles)
+    }
+
+
+def make_tasks(spec: WorkloadSpec, start_id: int = 1, submit_ts: float = 0.0) -> List[Task]:
+    rng = random.Random(spec.seed + 2)
+    typed = [t for t in GPU_TYPES if t]
+    priorities = [Priority.HIGH, Priority.NORMAL, Priority.NORMAL, Priority.LOW, Priority.LOW]
+    tasks: List[Task] = []
+    for i in range(spec.tasks):
+        min_vram = rng.choice(VRAM_CHOICES)
+        profile_key = f"profile-{rng.randrange(spec.profiles)}" if spec.profiles and (min_vram == 0 or rng.random() < 0.3) else None
+        tasks.append(
+            Task(
+                task_id=start_id + i,
+                user=f"user-{rng.randrange(spec.users)}",
+                cmd=f"python sweep.py --trial {i}",
+                min_vram_gb=min_vram,
+                priority=rng.choice(priorities),
+                gpu_type=rng.choice(typed) if rng.random() < spec.typed_fraction else None,
+                time_limit_s=rng.choice([600, 1800, 3600, 14400]) if rng.random() < spec.time_limit_fraction else None,
+                profile_key=profile_key,
+                submit_ts=submit_ts + i * 0.001,
+            )
+        )
+    return tasks
@@ -3,12 +3,14 @@ from __future__ import annotations
 from dataclasses import dataclass
 import os
 import re
+import shutil
 import signal
 import subprocess
 import threading
-from typing import Iterable, Optional, Tuple
+from typing import Iterable, List, Optional, Tuple
 
 from .models import OOMSignal
+from .tracing import span, traced
 
 
 OOM_REGEX = re.compile(
@@ -27,10 +29,37 @@ class ProcessSample:
     duration_s: float
 
 
+def pin_cpus(cpus: Optional[List[int]], pid: int = 0) -> bool:
+    # Best effort: CPUs the host does not have (e.g. a topology file written
+    # for another machine) are dropped, platforms without affinity are a no-op.
+    if not cpus or not hasattr(os, "sched_setaffinity"):
+        return False
+    usable = set(cpus) & os.sched_getaffinity(0)
+    if not usable:
+        return False
+    try:
+        os.sched_setaffinity(pid, usable)
+    except OSError:
+        return False
+    return True
+
+
+def _taskset_prefix(cpus: Optional[List[int]]) -> List[str]:
+    # Pins the task before bash execs, without a preexec_fn (which can
+    # deadlock the child of a multi-threaded parent).
+    if not cpus or not hasattr(os, "sched_getaffinity") or shutil.which("taskset") is None:
+        return []
+    usable = sorted(set(cpus) & os.sched_getaffinity(0))
+    if not usable:
+        return []
+    return ["taskset", "-c", ",".join(str(cpu) for cpu in usable)]
+
+
 class Agent:
     def __init__(self, on_oom=None) -> None:
         self.on_oom = on_oom
 
+    @traced("agent.parse_oom")
     def parse_oom(self, stderr_lines: Iterable[str], current_used_gb: float) -> Optional[OOMSignal]:
         tail = list(stderr_lines)[-100:]
         for line in reversed(tail):
@@ -94,6 +123,7 @@ class Agent:
         current_used_gb: float,
         log_root: str = "/nas/logs",
         on_start=None,
+        cpus: Optional[List[int]] = None,
     ) -> Tuple[int, Optional[OOMSignal]]:
         try:
             os.makedirs(log_root, exist_ok=True)
@@ -104,13 +134,19 @@ class Agent:
 
         with open(log_path, "a", encoding="utf-8", buffering=1) as log_file:
             full_cmd = self.build_command(cmd, env)
-            proc = subprocess.Popen(
-                ["bash", "-lc", full_cmd],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1,
-            )
+            taskset = _taskset_prefix(cpus)
+            with span("agent.spawn", task_id=task_id):
+                proc = subprocess.Popen(
+                    taskset + ["bash", "-lc", full_cmd],
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    text=True,
+                    bufsize=1,
+                )
+            if cpus and not taskset:
+                # No taskset: pin from the parent right away; only what bash
+                # starts before this call runs unpinned.
+                pin_cpus(cpus, proc.pid)
             if on_start:
                 on_start(proc.pid, log_path)
 
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .journal import TASK_FIELDS, task_from_row, task_row
+from .models import Task
+
+
+# Append-only archive of finished tasks. Each batch is a header line
+# {"min", "max", "count", "bytes"} followed by one payload line
+# {"fields", "rows", "logs"}; lookups read headers only and skip payloads by
+# length, so memory holds one (min, max, offset) range per batch.
+class TaskArchive:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.count = 0
+        self._ranges: List[Tuple[int, int, int]] = []
+        self._load_headers()
+
+    def _load_headers(self) -> None:
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            offset = 0
+            while True:
+                header = f.readline()
+                if not header.endswith(b"\n"):
+                    break
+                try:
+                    meta = json.loads(header)
+                except ValueError:
+                    break
+                payload_at = offset + len(header)
+                if payload_at + meta["bytes"] > os.fstat(f.fileno()).st_size:
+                    break
+                self._ranges.append((meta["min"], meta["max"], payload_at))
+                self.count += meta["count"]
+                offset = payload_at + meta["bytes"]
+                f.seek(offset)
+        if os.path.getsize(self.path) > offset:
+            # Torn batch from a crash mid-append.
+            with open(self.path, "r+b") as f:
+                f.truncate(offset)
+
+    @property
+    def max_id(self) -> int:
+        return max((high for _, high, _ in self._ranges), default=0)
+
+    def append(self, tasks: List[Task], logs: Optional[Dict[int, str]] = None) -> None:
+        if not tasks:
+            return
+        ids = [task.task_id for task in tasks]
+        payload = json.dumps(
+            {
+                "fields": TASK_FIELDS,
+                "rows": [task_row(task) for task in tasks],
+                "logs": {str(task_id): path for task_id, path in (logs or {}).items()},
+            },
+            separators=(",", ":"),
+        ).encode("utf-8") + b"\n"
+        header = json.dumps({"min": min(ids), "max": max(ids), "count": len(ids), "bytes": len(payload)}).encode("utf-8") + b"\n"
+        with open(self.path, "ab") as f:
+            offset = f.tell()
+            f.write(header + payload)
+            f.flush()
+            os.fsync(f.fileno())
+        self._ranges.append((min(ids), max(ids), offset + len(header)))
+        self.count += len(ids)
+
+    def _batch(self, f, offset: int) -> Tuple[List[Task], Dict[int, str]]:
+        f.seek(offset)
+        batch = json.loads(f.readline())
+        names = batch["fields"]
+        tasks = [task_from_row(row, names) for row in batch["rows"]]
+        return tasks, {int(task_id): path for task_id, path in batch["logs"].items()}
+
+    def get(self, task_id: int) -> Optional[Tuple[Task, Optional[str]]]:
+        # Latest archived copy of the task and its log path; a retried task
+        # can be archived more than once.
+        candidates = [offset for low, high, offset in self._ranges if low <= task_id <= high]
+        if not candidates:
+            return None
+        with open(self.path, "rb") as f:
+            for offset in reversed(candidates):
+                tasks, logs = self._batch(f, offset)
+                for task in tasks:
+                    if task.task_id == task_id:
+                        return task, logs.get(task_id)
+        return None
+
+    def scan(self) -> Iterator[Task]:
+        if not self._ranges:
+            return
+        with open(self.path, "rb") as f:
+            for _, _, offset in self._ranges:
+                yield from self._batch(f, offset)[0]
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .models import Node, Task
+
+BACKFILL_MODES = ("limit", "easy", "conservative")
+INF = float("inf")
+
+
+@dataclass
+class Reservation:
+    task_id: int
+    start_ts: float
+    node: str
+    gpu_ids: List[int]
+
+
+def _compatible(task: Task, node: Node) -> bool:
+    return not (task.gpu_type and node.gpu_type and task.gpu_type != node.gpu_type)
+
+
+# Availability timeline built from running tasks' start_ts + time_limit_s. A
+# running task without a time limit never frees its VRAM as far as the planner
+# is concerned; one that overran its limit is treated as finishing now.
+class BackfillPlanner:
+    def __init__(
+        self,
+        tasks: Dict[int, Task],
+        running: Dict[int, Tuple[str, List[int], float]],
+        nodes: Iterable[Node],
+        now: float,
+    ) -> None:
+        self.now = now
+        self.reservations: List[Reservation] = []
+        self._nodes = {node.name: node for node in nodes}
+        self._shadow: Dict[Tuple[str, int], float] = {}
+        self._releases: Dict[str, Dict[int, List[Tuple[float, float]]]] = {}
+        for task_id, (node_name, gpu_ids, vram_gb) in running.items():
+            task = tasks[task_id]
+            end = INF
+            if task.start_ts is not None and task.time_limit_s is not None:
+                end = max(now, task.start_ts + task.time_limit_s)
+            per_gpu = self._releases.setdefault(node_name, {})
+            for gpu_id in gpu_ids:
+                per_gpu.setdefault(gpu_id, []).append((end, vram_gb))
+        for per_gpu in self._releases.values():
+            for releases in per_gpu.values():
+                releases.sort()
+
+    def _ready_at(self, free: float, releases: List[Tuple[float, float]], need: float) -> float:
+        if free >= need:
+            return self.now
+        for end, vram_gb in releases:
+            free += vram_gb
+            if free >= need:
+                return end
+        return INF
+
+    def earliest(self, task: Task) -> Optional[Reservation]:
+        need = task.min_vram_gb
+        k = max(1, task.gpu_count)
+        best: Optional[Reservation] = None
+        for node_name, per_gpu in self._releases.items():
+            node = self._nodes.get(node_name)
+            if node is None or not _compatible(task, node):
+                continue
+            times = []
+            for gpu in node.gpus:
+                if gpu.zombie or (node_name, gpu.gpu_id) in self._shadow:
+                    continue
+                ready = self._ready_at(gpu.free_vram_gb, per_gpu.get(gpu.gpu_id, []), need)
+                if ready < INF:
+                    times.append((ready, gpu.gpu_id))
+            if len(times) < k:
+                continue
+            times.sort()
+            start = times[k - 1][0]
+            if best is None or start < best.start_ts:
+                best = Reservation(task.task_id, start, node_name, sorted(gpu_id for _, gpu_id in times[:k]))
+        return best
+
+    def reserve(self, task: Task) -> Optional[Reservation]:
+        reservation = self.earliest(task)
+        if reservation is None:
+            return None
+        self.reservations.append(reservation)
+        for gpu_id in reservation.gpu_ids:
+            self._shadow[(reservation.node, gpu_id)] = reservation.start_ts
+        return reservation
+
+    def blocking(self, task: Task) -> Set[Tuple[str, int]]:
+        # GPUs the task must avoid: those reserved before it would finish.
+        finish = INF if task.time_limit_s is None else self.now + task.time_limit_s
+        return {key for key, start in self._shadow.items() if start < finish}
@@ -0,0 +1,375 @@
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .cluster_array import ClusterArrays
+from .models import GPU, Node, Task
+
+NO_FIT = float("-inf")
+
+
+class _MaxTree:
+    def __init__(self, values: List[float]) -> None:
+        size = 1
+        while size < len(values):
+            size *= 2
+        self.size = size
+        self.tree = [NO_FIT] * (2 * size)
+        self.tree[size : size + len(values)] = values
+        for i in range(size - 1, 0, -1):
+            self.tree[i] = max(self.tree[2 * i], self.tree[2 * i + 1])
+
+    def update(self, slot: int, value: float) -> None:
+        i = slot + self.size
+        self.tree[i] = value
+        i //= 2
+        while i:
+            best = max(self.tree[2 * i], self.tree[2 * i + 1])
+            if self.tree[i] == best:
+                break
+            self.tree[i] = best
+            i //= 2
+
+    def first_at_least(self, need: float) -> Optional[int]:
+        tree = self.tree
+        if tree[1] < need:
+            return None
+        i = 1
+        while i < self.size:
+            i *= 2
+            if tree[i] < need:
+                i += 1
+        return i - self.size
+
+
+class _Pool:
+    def __init__(self, gpu_type: Optional[str]) -> None:
+        self.gpu_type = gpu_type
+        self.slots: List[Tuple[Node, GPU]] = []
+        self.order: List[int] = []
+        self.values: List[float] = []
+        self.by_free: List[Tuple[float, int, int]] = []
+        self.tree = _MaxTree([])
+        self.nodes: List[List[int]] = []
+        self.node_list: List[Node] = []
+        self.node_of: List[int] = []
+        self.gang_trees: Dict[int, _MaxTree] = {}
+        self.busy: List[bool] = []
+
+    def add_node(self, node: Node, first_order: int) -> None:
+        slots = []
+        for offset, gpu in enumerate(node.gpus):
+            slots.append(len(self.slots))
+            self.node_of.append(len(self.nodes))
+            self.slots.append((node, gpu))
+            self.order.append(first_order + offset)
+            self.busy.append(gpu.used_vram_gb > 0)
+        self.nodes.append(slots)
+        self.node_list.append(node)
+
+    def build(self) -> None:
+        self.values = [_free(gpu) for _, gpu in self.slots]
+        self.by_free = sorted((value, self.order[slot], slot) for slot, value in enumerate(self.values))
+        self.tree = _MaxTree(self.values)
+        self.gang_trees = {}
+
+    def kth_free(self, node_pos: int, k: int) -> float:
+        slots = self.nodes[node_pos]
+        if len(slots) < k:
+            return NO_FIT
+        return sorted((self.values[slot] for slot in slots), reverse=True)[k - 1]
+
+    def gang_tree(self, k: int) -> _MaxTree:
+        # Per node, the k-th largest free VRAM: a node can host k GPUs of
+        # `need` each exactly when that value is >= need.
+        tree = self.gang_trees.get(k)
+        if tree is None:
+            tree = self.gang_trees[k] = _MaxTree([self.kth_free(pos, k) for pos in range(len(self.nodes))])
+        return tree
+
+    def set(self, slot: int, value: float) -> float:
+        old = self.values[slot]
+        if old == value:
+            return 0.0
+        del self.by_free[bisect_left(self.by_free, (old, self.order[slot], slot))]
+        insort(self.by_free, (value, self.order[slot], slot))
+        self.values[slot] = value
+        self.tree.update(slot, value)
+        if self.gang_trees:
+            pos = self.node_of[slot]
+            for k, tree in self.gang_trees.items():
+                tree.update(pos, self.kth_free(pos, k))
+        return max(value, 0.0) - max(old, 0.0)
+
+    def smallest_at_least(self, need: float) -> Optional[Tuple[float, int, int]]:
+        i = bisect_left(self.by_free, (need, -1, -1))
+        return self.by_free[i] if i < len(self.by_free) else None
+
+    def largest(self) -> Optional[Tuple[float, int, int]]:
+        if not self.by_free or self.by_free[-1][0] == NO_FIT:
+            return None
+        top = self.by_free[-1][0]
+        return self.by_free[bisect_left(self.by_free, (top, -1, -1))]
+
+    def free_between(self, low: float, high: float) -> float:
+        lo = bisect_right(self.by_free, (low, float("inf"), 0))
+        hi = bisect_left(self.by_free, (high, -1, -1))
+        return sum((entry[0] for entry in self.by_free[lo:hi]), 0.0)
+
+
+def _free(gpu: GPU) -> float:
+    return NO_FIT if gpu.zombie else gpu.free_vram_gb
+
+
+# Free VRAM per GPU, bucketed by node gpu_type. Each pool keeps a max-tree over
+# its GPUs in registration order, so first-fit is an O(log n) descent. Anything
+# that changes used/unmanaged VRAM or the zombie flag must call refresh().
+class CapacityIndex:
+    def __init__(self) -> None:
+        self._pools: Dict[Optional[str], _Pool] = {}
+        self._locations: Dict[Tuple[str, int], Tuple[_Pool, int]] = {}
+        self._signature: List[Tuple[int, int, int]] = []
+        self.total_free_gb = 0.0
+        self.busy_gpus = 0
+        self.arrays: Optional[ClusterArrays] = None
+        self._nodes: List[Node] = []
+        self._synced: Optional[List[Node]] = None
+        self._grown: Optional[Set[Optional[str]]] = None
+        self._held: Set[Tuple[str, int]] = set()
+        self._views: Dict[Optional[str], CapacityIndex] = {}
+        self._tenants: Dict[Tuple[str, int], Tuple[int, float]] = {}
+
+    @property
+    def nodes(self) -> List[Node]:
+        return self._nodes
+
+    def use_arrays(self, enabled: bool) -> None:
+        if enabled and self.arrays is None:
+            self.arrays = ClusterArrays(self._nodes)
+        elif not enabled:
+            self.arrays = None
+
+    def pool_types(self) -> Set[Optional[str]]:
+        return set(self._pools)
+
+    def view(self, gpu_type: Optional[str]) -> CapacityIndex:
+        # An index over one pool that shares its structures, so disjoint pools
+        # can be placed into from worker threads. Free-VRAM changes made
+        # through the view are folded back with absorb().
+        view = self._views.get(gpu_type)
+        if view is None:
+            view = CapacityIndex()
+            pool = self._pools.get(gpu_type)
+            if pool is not None:
+                view._pools = {gpu_type: pool}
+                view._locations = {key: loc for key, loc in self._locations.items() if loc[0] is pool}
+                view._nodes = list(pool.node_list)
+            view._grown = set()
+            view._tenants = self._tenants
+            self._views[gpu_type] = view
+        view.total_free_gb = 0.0
+        view.busy_gpus = 0
+        return view
+
+    def absorb(self, view: CapacityIndex) -> None:
+        self.total_free_gb += view.total_free_gb
+        self.busy_gpus += view.busy_gpus
+        view.total_free_gb = 0.0
+        view.busy_gpus = 0
+        grown = view.take_grown()
+        if self._grown is not None and grown:
+            self._grown |= grown
+
+    def take_grown(self) -> Optional[Set[Optional[str]]]:
+        # Pools whose free VRAM went up since the last call; None means all.
+        grown, self._grown = self._grown, set()
+        return grown
+
+    def sync(self, nodes: List[Node]) -> None:
+        if nodes is self._synced and len(nodes) == len(self._nodes):
+            return
+        self._synced = nodes
+        signature = [(id(node), id(node.gpus), len(node.gpus)) for node in nodes]
+        if signature != self._signature:
+            self.rebuild(nodes)
+            self._signature = signature
+
+    def rebuild(self, nodes: List[Node]) -> None:
+        self._nodes = list(nodes)
+        self._grown = None
+        self._held = set()
+        self._pools = {}
+        self._locations = {}
+        self._views = {}
+        order = 0
+        for node in nodes:
+            pool = self._pools.get(node.gpu_type)
+            if pool is None:
+                pool = self._pools[node.gpu_type] = _Pool(node.gpu_type)
+            for offset, gpu in enumerate(node.gpus):
+                self._locations[(node.name, gpu.gpu_id)] = (pool, len(pool.slots) + offset)
+            pool.add_node(node, order)
+            order += len(node.gpus)
+        for pool in self._pools.values():
+            pool.build()
+        self.total_free_gb = sum(max(v, 0.0) for pool in self._pools.values() for v in pool.values)
+        self.busy_gpus = sum(sum(pool.busy) for pool in self._pools.values())
+        if self.arrays is not None:
+            self.arrays = ClusterArrays(self._nodes)
+
+    def gpu(self, node_name: str, gpu_id: int) -> Optional[GPU]:
+        located = self._locations.get((node_name, gpu_id))
+        if located is None:
+            return None
+        pool, slot = located
+        return pool.slots[slot][1]
+
+    @property
+    def total_gpus(self) -> int:
+        return len(self._locations)
+
+    def refresh(self, node_name: str, gpu_id: int) -> None:
+        located = self._locations.get((node_name, gpu_id))
+        if located is None:
+            return
+        pool, slot = located
+        busy = pool.slots[slot][1].used_vram_gb > 0
+        if busy != pool.busy[slot]:
+            pool.busy[slot] = busy
+            self.busy_gpus += 1 if busy else -1
+        if (node_name, gpu_id) in self._held:
+            return
+        old = pool.values[slot]
+        self.total_free_gb += pool.set(slot, _free(pool.slots[slot][1]))
+        if pool.values[slot] > old and self._grown is not None:
+            self._grown.add(pool.gpu_type)
+        if self.arrays is not None:
+            self.arrays.load(pool.order[slot])
+
+    def mark_grown(self, node_name: str, gpu_id: int) -> None:
+        # For changes other than free VRAM that can make a GPU usable again.
+        located = self._locations.get((node_name, gpu_id))
+        if located is not None and self._grown is not None:
+            self._grown.add(located[0].gpu_type)
+
+    def tenants(self, node_name: str, gpu_id: int) -> Tuple[int, float]:
+        # (tasks placed on the GPU, sum of their expected utilisation)
+        return self._tenants.get((node_name, gpu_id), (0, 0.0))
+
+    def add_tenant(self, node_name: str, gpu_id: int, load: float, count: int = 1) -> None:
+        tenants, total = self.tenants(node_name, gpu_id)
+        tenants += count
+        if tenants <= 0:
+            self._tenants.pop((node_name, gpu_id), None)
+        else:
+            self._tenants[(node_name, gpu_id)] = (tenants, max(0.0, total + load * count))
+
+    def hold(self, keys: Iterable[Tuple[str, int]]) -> None:
+        # Hide GPUs from lookups for the rest of a tick without touching the
+        # GPU objects; unhold() restores them and is not reported as growth.
+        for key in keys:
+            located = self._locations.get(key)
+            if located is None or key in self._held:
+                continue
+            pool, slot = located
+            self.total_free_gb += pool.set(slot, NO_FIT)
+            self._held.add(key)
+
+    def unhold(self) -> None:
+        held, self._held = self._held, set()
+        for key in held:
+            pool, slot = self._locations[key]
+            self.total_free_gb += pool.set(slot, _free(pool.slots[slot][1]))
+
+    def _candidate_pools(self, task: Task) -> List[_Pool]:
+        if not task.gpu_type:
+            return list(self._pools.values())
+        return [pool for key in (task.gpu_type, None) if (pool := self._pools.get(key)) is not None]
+
+    def fitting(self, task: Task) -> Iterator[Tuple[int, Node, GPU]]:
+        # Every GPU with enough free VRAM, as (registration order, node, gpu).
+        need = task.min_vram_gb
+        for pool in self._candidate_pools(task):
+            by_free = pool.by_free
+            for i in range(bisect_left(by_free, (need, -1, -1)), len(by_free)):
+                _, order, slot = by_free[i]
+                node, gpu = pool.slots[slot]
+                yield order, node, gpu
+
+    def first_fit(self, task: Task) -> Optional[Tuple[Node, GPU]]:
+        best: Optional[Tuple[int, Node, GPU]] = None
+        for pool in self._candidate_pools(task):
+            slot = pool.tree.first_at_least(task.min_vram_gb)
+            if slot is None:
+                continue
+            if best is None or pool.order[slot] < best[0]:
+                node, gpu = pool.slots[slot]
+                best = (pool.order[slot], node, gpu)
+        if best is None:
+            return None
+        return best[1], best[2]
+
+    def gang_fit(self, task: Task) -> Optional[Tuple[Node, List[GPU]]]:
+        k = max(1, task.gpu_count)
+        need = task.min_vram_gb
+        best: Optional[Tuple[int, _Pool, int]] = None
+        for pool in self._candidate_pools(task):
+            pos = pool.gang_tree(k).first_at_least(need)
+            if pos is None:
+                continue
+            order = pool.order[pool.nodes[pos][0]]
+            if best is None or order < best[0]:
+                best = (order, pool, pos)
+        if best is None:
+            return None
+        _, pool, pos = best
+        slots = [slot for slot in pool.nodes[pos] if pool.values[slot] >= need][:k]
+        return pool.slots[slots[0]][0], [pool.slots[slot][1] for slot in slots]
+
+    def gang_nodes(self, task: Task) -> Iterator[Tuple[Node, List[GPU]]]:
+        # Every node able to host the gang with its fitting GPUs, in
+        # registration order.
+        k = max(1, task.gpu_count)
+        need = task.min_vram_gb
+        found = []
+        for pool in self._candidate_pools(task):
+            tree = pool.gang_tree(k)
+            for pos in range(len(pool.nodes)):
+                if tree.tree[tree.size + pos] >= need:
+                    found.append((pool.order[pool.nodes[pos][0]], pool, pos))
+        for _, pool, pos in sorted(found, key=lambda item: item[0]):
+            slots = [slot for slot in pool.nodes[pos] if pool.values[slot] >= need]
+            yield pool.slots[slots[0]][0], [pool.slots[slot][1] for slot in slots]
+
+    def best_fit(self, task: Task, need: Optional[float] = None) -> Optional[Tuple[Node, GPU]]:
+        need = task.min_vram_gb if need is None else need
+        best: Optional[Tuple[Tuple[float, int, int], _Pool]] = None
+        for pool in self._candidate_pools(task):
+            entry = pool.smallest_at_least(need)
+            if entry is not None and (best is None or entry < best[0]):
+                best = (entry, pool)
+        if best is None:
+            return None
+        return best[1].slots[best[0][2]]
+
+    def worst_fit(self, task: Task) -> Optional[Tuple[Node, GPU]]:
+        best: Optional[Tuple[Tuple[float, int, int], _Pool]] = None
+        for pool in self._candidate_pools(task):
+            entry = pool.largest()
+            if entry is None or entry[0] < task.min_vram_gb:
+                continue
+            if best is None or (-entry[0], entry[1]) < (-best[0][0], best[0][1]):
+                best = (entry, pool)
+        if best is None:
+            return None
+        return best[1].slots[best[0][2]]
+
+    def largest_free_gb(self, gpu_types: Optional[Iterable[Optional[str]]] = None) -> float:
+        pools = self._pools.values() if gpu_types is None else [self._pools[t] for t in gpu_types if t in self._pools]
+        return max([0.0] + [pool.tree.tree[1] for pool in pools])
+
+    def stranded_gb(self, min_demand: float) -> float:
+        if self.arrays is not None:
+            return self.arrays.stranded_gb(min_demand)
+        return sum((pool.free_between(0.0, min_demand) for pool in self._pools.values()), 0.0)
@@ -1,14 +1,21 @@
 from __future__ import annotations
 
+from dataclasses import fields
 import json
 import time
-from typing import Any, Optional
+import os
+import shutil
+from typing import Any, List, Optional
 import typer
 
 from .agent import Agent
-from .master import Master
+from .master import IdempotencyConflict, Master
 from .models import GPU, Node, Priority, Task
 from .policy import load_policy
+from .scheduler import SchedulerPolicy
+from .simulator import compare, load_trace, synthetic_trace
+from .store import task_dict
+from .tracing import TRACER
 from .tui import LabTui
 
 app = typer.Typer(add_completion=False)
@@ -24,6 +31,14 @@ def _parse_mem_gb(value: str) -> float:
     return float(value.rstrip("Gg"))
 
 
+def _dry_run_placement(task: Task) -> Optional[dict]:
+    placement = _master.find_placement(task)
+    if placement is None:
+        return None
+    node, gpus = placement
+    return {"node": node.name, "gpu": gpus[0].gpu_id, "gpus": [gpu.gpu_id for gpu in gpus]}
+
+
 def _task_from_payload(payload: dict[str, Any], task_id: int) -> Task:
     mem_value = payload.get("mem")
     if mem_value is None:
@@ -32,6 +47,12 @@ def _task_from_payload(payload: dict[str, Any], task_id: int) -> Task:
         raise typer.BadParameter("Task requires 'mem' like '10G' or 'min_vram_gb'.")
     mem_gb = _parse_mem_gb(str(mem_value))
     priority = Priority(payload.get("priority", Priority.NORMAL))
+    try:
+        gpu_count = int(payload.get("gpus", 1))
+    except (TypeError, ValueError):
+        gpu_count = 0
+    if gpu_count < 1:
+        raise typer.BadParameter(f"'gpus' must be a positive integer, got {payload.get('gpus')!r}.")
     return Task(
         task_id=task_id,
         user=payload.get("user", "me"),
@@ -41,27 +62,71 @@ def _task_from_payload(payload: dict[str, Any], task_id: int) -> Task:
         env=payload.get("env"),
         gpu_type=payload.get("gpu_type"),
         time_limit_s=payload.get("time_limit"),
+        gpu_count=gpu_count,
     )
 
 
+def _load_policy_into(master: Master, policy: Optional[str]) -> None:
+    if not policy:
+        return
+    config = load_policy(policy)
+    if config:
+        for item in fields(config):
+            setattr(master.scheduler.policy, item.name, getattr(config, item.name))
+        typer.echo(f"Loaded policy from {policy}")
+    else:
+        typer.echo(f"Policy file {policy} not loaded, using defaults.")
+
+
+def _open_state(master: Master) -> None:
+    # Topology, journal recovery, task store and archive from the policy.
+    policy = master.scheduler.policy
+    if policy.topology_path:
+        master.load_topology(policy.topology_path)
+        typer.echo(f"Loaded topology from {policy.topology_path}")
+    if policy.journal_path:
+        master.open_journal(
+            policy.journal_path, sync_every=policy.journal_sync_every, snapshot_every=policy.journal_snapshot_every
+        )
+        summary = master.summary()
+        typer.echo(
+            f"Recovered {summary['tasks']} tasks ({summary['pending']} pending, "
+            f"{summary['running']} running) from {policy.journal_path}"
+        )
+    if policy.store_path:
+        master.open_store(policy.store_path)
+    if policy.archive_path:
+        master.open_archive(policy.archive_path)
+
+
+def _scratch_master(policy: Optional[str], scratch: str) -> Master:
+    # State as `server start` would load it, but from copies in `scratch`:
+    # profiled ticks journal assignments and save profiles, and must not touch
+    # the files a running server writes. Store and archive stay closed.
+    master = Master()
+    _load_policy_into(master, policy)
+    config = master.scheduler.policy
+    if config.journal_path and os.path.isdir(config.journal_path):
+        config.journal_path = shutil.copytree(config.journal_path, os.path.join(scratch, "journal"))
+    else:
+        config.journal_path = None
+    if config.profile_path and os.path.isfile(config.profile_path):
+        config.profile_path = shutil.copy(config.profile_path, os.path.join(scratch, "profiles.json"))
+    else:
+        config.profile_path = None
+    config.store_path = config.archive_path = None
+    _open_state(master)
+    return master
+
+
 @server_app.command("start")
 def server_start(
     role: str = typer.Option(..., "--role"),
     host: str = typer.Option("127.0.0.1", "--host"),
     policy: Optional[str] = typer.Option(None, "--policy"),
 ) -> None:
-    if policy:
-        config = load_policy(policy)
-        if config:
-            _master.scheduler.policy.night_start = config.night_start
-            _master.scheduler.policy.night_end = config.night_end
-            _master.scheduler.policy.base_idle_util_threshold = config.base_idle_util_threshold
-            _master.scheduler.policy.night_idle_util_threshold = config.night_idle_util_threshold
-            _master.scheduler.policy.backfill_time_limit_s = config.backfill_time_limit_s
-            _master.scheduler.policy.night_low_bonus = config.night_low_bonus
-            typer.echo(f"Loaded policy from {policy}")
-        else:
-            typer.echo(f"Policy file {policy} not loaded, using defaults.")
+    _load_policy_into(_master, policy)
+    _open_state(_master)
     typer.echo(f"Starting lab-gpu {role} on {host} (demo mode)")
 
 @server_app.command("add-node")
@@ -70,7 +135,10 @@ def server_add_node(
     gpus: int = typer.Option(1, "--gpus"),
     vram: float = typer.Option(24.0, "--vram"),
     gpu_type: Optional[str] = typer.Option(None, "--gpu-type"),
+    topology: Optional[str] = typer.Option(None, "--topology"),
 ) -> None:
+    if topology:
+        _master.load_topology(topology)
     gpu_list = [GPU(gpu_id=i, total_vram_gb=vram, used_vram_gb=0.0) for i in range(gpus)]
     _master.register_node(Node(name=name, gpus=gpu_list, gpu_type=gpu_type))
     typer.echo(f"Registered node {name} ({gpus} GPU)")
@@ -95,6 +163,43 @@ def server_preempt(
     typer.echo(f"Preemption result: {result}")
 
 
+@server_app.command("profile")
+def server_profile(
+    ticks: int = typer.Option(10, "--ticks", min=1),
+    policy: Optional[str] = typer.Option(None, "--policy"),
+    interval: float = typer.Option(0.0, "--interval", help="seconds between ticks"),
+    output: str = typer.Option("labgpu-profile.pstats", "--output", help="pstats dump"),
+    trace: Optional[str] = typer.Option(None, "--trace", help="also write spans as Chrome trace JSON"),
+    top: int = typer.Option(20, "--top"),
+) -> None:
+    import cProfile
+    import pstats
+    import tempfile
+
+    with tempfile.TemporaryDirectory(prefix="labgpu-profile-") as scratch:
+        master = _scratch_master(policy, scratch)
+        if trace:
+            TRACER.clear()
+            TRACER.enable()
+        profiler = cProfile.Profile()
+        assigned = 0
+        for tick in range(ticks):
+            if tick and interval:
+                time.sleep(interval)
+            profiler.enable()
+            assigned += len(master.schedule_once())
+            profiler.disable()
+        if master.journal is not None:
+            master.journal.close()
+    profiler.dump_stats(output)
+    typer.echo(f"Profiled {ticks} ticks ({assigned} assignments) -> {output}")
+    if trace:
+        TRACER.disable()
+        typer.echo(f"Wrote {TRACER.export(trace)} spans -> {trace}")
+    if top:
+        pstats.Stats(output).sort_stats("cumulative").print_stats(top)
+
+
 @app.command()
 def submit(
     cmd: str = typer.Argument(...),
@@ -103,11 +208,15 @@ def submit(
     env: Optional[str] = typer.Option(None, "--env"),
     gpu_type: Optional[str] = typer.Option(None, "--gpu-type"),
     time_limit: Optional[int] = typer.Option(None, "--time-limit"),
+    gpus: int = typer.Option(1, "--gpus", min=1),
     dry_run: bool = typer.Option(False, "--dry-run"),
+    idempotency_key: Optional[str] = typer.Option(
+        None, "--idempotency-key", help="resubmitting with the same key returns the original task"
+    ),
 ) -> None:
     mem_gb = _parse_mem_gb(mem)
     task = Task(
-        task_id=len(_master.scheduler.state.tasks) + 1,
+        task_id=_master.next_task_id,
         user="me",
         cmd=cmd,
         min_vram_gb=mem_gb,
@@ -115,16 +224,10 @@ def submit(
         env=env,
         gpu_type=gpu_type,
         time_limit_s=time_limit,
+        gpu_count=gpus,
     )
     if dry_run:
-        placement = None
-        for node in _master.state.nodes.values():
-            for gpu in node.gpus:
-                if gpu.free_vram_gb >= task.min_vram_gb:
-                    placement = {"node": node.name, "gpu": gpu.gpu_id}
-                    break
-            if placement:
-                break
+        placement = _dry_run_placement(task)
         typer.echo(
             json.dumps(
                 {
@@ -136,8 +239,11 @@ def submit(
             )
         )
         raise typer.Exit(code=0)
-    _master.submit(task)
-    typer.echo(f"Submitted task {task.task_id}")
+    try:
+        task, created = _master.submit_new(task, idempotency_key)
+    except IdempotencyConflict as exc:
+        raise typer.BadParameter(str(exc))
+    typer.echo(f"Submitted task {task.task_id}" if created else f"Task {task.task_id} already submitted")
 
 
 @app.command("submit-batch")
@@ -157,31 +263,28 @@ def submit_batch(
     if not isinstance(tasks_payload, list):
         raise typer.BadParameter("Batch file must be a list or contain a top-level 'tasks' list.")
 
-    results = []
     for entry in tasks_payload:
         if not isinstance(entry, dict):
             raise typer.BadParameter("Each task entry must be a JSON object.")
-        task = _task_from_payload(entry, task_id=len(_master.scheduler.state.tasks) + 1)
-        if dry_run:
-            placement = None
-            for node in _master.state.nodes.values():
-                for gpu in node.gpus:
-                    if gpu.free_vram_gb >= task.min_vram_gb:
-                        placement = {"node": node.name, "gpu": gpu.gpu_id}
-                        break
-                if placement:
-                    break
-            results.append(
-                {
-                    "task_id": task.task_id,
-                    "min_vram_gb": task.min_vram_gb,
-                    "priority": task.priority.value,
-                    "placement": placement,
-                }
-            )
-        else:
-            _master.submit(task)
-            results.append({"task_id": task.task_id, "status": "submitted"})
+    tasks = [_task_from_payload(entry, task_id=_master.next_task_id + i) for i, entry in enumerate(tasks_payload)]
+    if dry_run:
+        results = [
+            {
+                "task_id": task.task_id,
+                "min_vram_gb": task.min_vram_gb,
+                "priority": task.priority.value,
+                "placement": _dry_run_placement(task),
+            }
+            for task in tasks
+        ]
+    else:
+        try:
+            submitted = _master.submit_many(tasks, [entry.get("idempotency_key") for entry in tasks_payload])
+        except IdempotencyConflict as exc:
+            raise typer.BadParameter(str(exc))
+        results = [
+            {"task_id": task.task_id, "status": "submitted" if created else "duplicate"} for task, created in submitted
+        ]
 
     typer.echo(json.dumps(results))
 
@@ -199,9 +302,42 @@ def status(json_output: bool = typer.Option(False, "--json")) -> None:
         )
 
 
+@app.command()
+def tasks(
+    status: Optional[str] = typer.Option(None, "--status"),
+    user: Optional[str] = typer.Option(None, "--user"),
+    node: Optional[str] = typer.Option(None, "--node"),
+    limit: int = typer.Option(20, "--limit", min=1),
+    before: Optional[int] = typer.Option(None, "--before", help="cursor printed with the previous page"),
+    json_output: bool = typer.Option(False, "--json"),
+) -> None:
+    page, cursor = _master.query_tasks(status=status, user=user, node=node, limit=limit, before=before)
+    if json_output:
+        typer.echo(json.dumps({"tasks": [task_dict(task) for task in page], "next": cursor}))
+        return
+    for task in page:
+        typer.echo(f"{task.task_id}\t{task.status.value}\t{task.user}\t{task.assigned_node or '-'}\t{task.cmd[:60]}")
+    if cursor is not None:
+        typer.echo(f"More: --before {cursor}")
+
+
+@app.command()
+def usage(
+    hours: Optional[float] = typer.Option(None, "--hours", help="only runs that ended in the last N hours"),
+    json_output: bool = typer.Option(False, "--json"),
+) -> None:
+    since = time.time() - hours * 3600.0 if hours else None
+    totals = _master.usage(since=since)
+    if json_output:
+        typer.echo(json.dumps(totals))
+        return
+    for user, entry in sorted(totals.items()):
+        typer.echo(f"{user}\t{entry['tasks']} tasks\t{entry['failed']} failed\t{entry['gpu_hours']} GPU-h")
+
+
 @app.command()
 def logs(task_id: int, follow: bool = typer.Option(False, "-f")) -> None:
-    path = f"/nas/logs/{task_id}.log"
+    path = _master.log_path(task_id)
     try:
         with open(path, "r", encoding="utf-8") as f:
             if not follow:
@@ -218,6 +354,34 @@ def logs(task_id: int, follow: bool = typer.Option(False, "-f")) -> None:
         typer.echo("Log file not found. Task may not have started yet.")
 
 
+@app.command()
+def simulate(
+    trace: Optional[str] = typer.Option(None, "--trace", help="JSON-lines trace; synthetic when omitted"),
+    policy: List[str] = typer.Option([], "--policy", help="policy.yaml to evaluate, repeatable"),
+    tasks: int = typer.Option(1000, "--tasks"),
+    nodes: int = typer.Option(4, "--nodes"),
+    hours: float = typer.Option(12.0, "--hours"),
+    seed: int = typer.Option(0, "--seed"),
+    tick: float = typer.Option(60.0, "--tick", help="virtual seconds between scheduler ticks"),
+) -> None:
+    if trace:
+        workload = load_trace(trace)
+    else:
+        workload = synthetic_trace(tasks=tasks, nodes=nodes, hours=hours, seed=seed)
+    policies = {"default": SchedulerPolicy()}
+    if policy:
+        policies = {}
+        for path in policy:
+            config = load_policy(path)
+            if config is None:
+                raise typer.BadParameter(f"Policy file {path} not loaded.")
+            candidate = SchedulerPolicy()
+            for item in fields(config):
+                setattr(candidate, item.name, getattr(config, item.name))
+            policies[os.path.splitext(os.path.basename(path))[0]] = candidate
+    typer.echo(json.dumps(compare(workload, policies, tick_s=tick), indent=2))
+
+
 @app.command()
 def tui() -> None:
     LabTui(_master).run()
@@ -250,6 +414,7 @@ def agent_run(
             current_used_gb=mem_used,
             log_root=log_root,
             on_start=lambda pid, log_path: _master.register_runtime(task_id, pid, log_path),
+            cpus=_master.scheduler.state.tasks[task_id].cpu_affinity,
         )
     except PermissionError as exc:
         typer.echo(f"Log path error: {exc}")
@@ -272,12 +437,24 @@ if __name__ == "__main__":
 def server_http_start(
     host: str = typer.Option("127.0.0.1", "--host"),
     port: int = typer.Option(8000, "--port"),
+    policy: Optional[str] = typer.Option(None, "--policy"),
+    journal: Optional[str] = typer.Option(None, "--journal"),
+    store: Optional[str] = typer.Option(None, "--store", help="SQLite file for task queries"),
 ) -> None:
     try:
-        from .server_api import app as server_app_http
+        from .server_api import _master as http_master, app as server_app_http
     except Exception as exc:  # pragma: no cover - optional dependency
         typer.echo(f"HTTP server not available: {exc}")
         raise typer.Exit(code=1)
     import uvicorn
 
+    _load_policy_into(http_master, policy)
+    http_master.scheduler.policy.journal_path = journal or http_master.scheduler.policy.journal_path
+    http_master.scheduler.policy.store_path = store or http_master.scheduler.policy.store_path
+    _open_state(http_master)
+
     uvicorn.run(server_app_http, host=host, port=port)
+    if http_master.journal is not None:
+        http_master.journal.close()
+    if http_master.store is not None:
+        http_master.store.close()
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np  # type: ignore
+except Exception:  # pragma: no cover - optional dependency
+    np = None
+
+from .models import GPU, Node
+
+UNTYPED = 0
+
+
+# Struct-of-arrays mirror of the registered GPUs. Row i is the i-th GPU in node
+# registration order; the Node/GPU objects stay the source of truth and rows are
+# reloaded from them through load(). Placement and the O(1) totals stay on the
+# CapacityIndex trees; the columns serve whole-cluster scans such as stranded
+# VRAM, which the sorted pools can only answer by walking a slice.
+class ClusterArrays:
+    def __init__(self, nodes: List[Node]) -> None:
+        if np is None:
+            raise RuntimeError("numpy is required for the vectorized cluster view")
+        self.rows: List[Tuple[Node, GPU]] = [(node, gpu) for node in nodes for gpu in node.gpus]
+        self.type_codes: Dict[Optional[str], int] = {None: UNTYPED}
+        for node in nodes:
+            if node.gpu_type not in self.type_codes:
+                self.type_codes[node.gpu_type] = len(self.type_codes)
+        count = len(self.rows)
+        self.total = np.zeros(count, dtype=np.float64)
+        self.used = np.zeros(count, dtype=np.float64)
+        self.unmanaged = np.zeros(count, dtype=np.float64)
+        self.util = np.zeros(count, dtype=np.float64)
+        self.zombie = np.zeros(count, dtype=bool)
+        self.gpu_type = np.array([self.type_codes[node.gpu_type] for node, _ in self.rows], dtype=np.int32)
+        for row in range(count):
+            self.load(row)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def load(self, row: int) -> None:
+        gpu = self.rows[row][1]
+        self.total[row] = gpu.total_vram_gb
+        self.used[row] = gpu.used_vram_gb
+        self.unmanaged[row] = gpu.unmanaged_vram_gb
+        self.util[row] = gpu.util_pct
+        self.zombie[row] = gpu.zombie
+
+    def free_vram(self):
+        return np.maximum(0.0, self.total - self.used - self.unmanaged)
+
+    def stranded_gb(self, min_demand: float) -> float:
+        free = self.free_vram()
+        return float(free[(free > 0) & (free < min_demand) & ~self.zombie].sum())
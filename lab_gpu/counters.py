@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Deque, Dict
+
+from .models import Task, TaskStatus
+
+RECENT_TASKS = 5
+
+
+# Task totals kept up to date at every status transition, so status views
+# never scan the task history. observe() must see every task once after each
+# status change; repeated calls with an unchanged status are no-ops.
+class TaskCounters:
+    def __init__(self, recent: int = RECENT_TASKS) -> None:
+        self.total = 0
+        self.by_status: Dict[TaskStatus, int] = {status: 0 for status in TaskStatus}
+        self.running_by_user: Dict[str, int] = {}
+        self.running: Dict[int, Task] = {}
+        self.recent: Deque[Task] = deque(maxlen=recent)
+        self._status: Dict[int, TaskStatus] = {}
+
+    def observe(self, task: Task) -> None:
+        previous = self._status.get(task.task_id)
+        if previous == task.status:
+            return
+        if previous is None:
+            self.total += 1
+            self.recent.append(task)
+        else:
+            self.by_status[previous] -= 1
+            if previous == TaskStatus.RUNNING:
+                self.running.pop(task.task_id, None)
+                left = self.running_by_user.get(task.user, 1) - 1
+                if left:
+                    self.running_by_user[task.user] = left
+                else:
+                    self.running_by_user.pop(task.user, None)
+        self._status[task.task_id] = task.status
+        self.by_status[task.status] += 1
+        if task.status == TaskStatus.RUNNING:
+            self.running[task.task_id] = task
+            self.running_by_user[task.user] = self.running_by_user.get(task.user, 0) + 1
+
+    def forget(self, task_id: int) -> None:
+        # The task left the hot set (archived); totals keep counting it.
+        self._status.pop(task_id, None)
+
+    def adopt(self, task: Task) -> None:
+        # A forgotten task is back in the hot set with its old status.
+        self._status[task.task_id] = task.status
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from dataclasses import dataclass, field
+from enum import Enum
+import itertools
+import threading
+import time
+from typing import Callable, Deque, Iterable, Iterator, List, Optional, Set
+
+
+class EventType(str, Enum):
+    SUBMITTED = "submitted"
+    ASSIGNED = "assigned"
+    STARTED = "started"
+    OOM = "oom"
+    PREEMPTED = "preempted"
+    FINISHED = "finished"
+    NODE_REGISTERED = "node_registered"
+
+
+@dataclass
+class Event:
+    type: EventType
+    seq: int
+    ts: float
+    task_id: Optional[int] = None
+    user: Optional[str] = None
+    node: Optional[str] = None
+    data: dict = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return {
+            "type": self.type.value,
+            "seq": self.seq,
+            "ts": self.ts,
+            "task_id": self.task_id,
+            "user": self.user,
+            "node": self.node,
+            **self.data,
+        }
+
+
+# One consumer's bounded queue. A full queue either drops its oldest event
+# (`dropped` counts them; consumers re-read state to catch up) or, with
+# block=True, makes the publisher wait for room up to the bus's block timeout.
+class Subscription:
+    def __init__(
+        self,
+        bus: EventBus,
+        types: Optional[Set[EventType]],
+        task_id: Optional[int],
+        user: Optional[str],
+        node: Optional[str],
+        maxsize: int,
+        block: bool,
+    ) -> None:
+        self._bus = bus
+        self.types = types
+        self.task_id = task_id
+        self.user = user
+        self.node = node
+        self.maxsize = maxsize
+        self.block = block
+        self.dropped = 0
+        self.closed = False
+        self._queue: Deque[Event] = deque()
+        self._cond = threading.Condition()
+        self._wakeup: Optional[Callable[[], None]] = None
+
+    def matches(self, event: Event) -> bool:
+        return (
+            (self.types is None or event.type in self.types)
+            and (self.task_id is None or event.task_id == self.task_id)
+            and (self.user is None or event.user == self.user)
+            and (self.node is None or event.node == self.node)
+        )
+
+    def _offer(self, event: Event, block_timeout_s: float) -> None:
+        with self._cond:
+            if self.closed:
+                return
+            if len(self._queue) >= self.maxsize and self.block:
+                self._cond.wait_for(lambda: len(self._queue) < self.maxsize or self.closed, block_timeout_s)
+                if self.closed:
+                    return
+            if len(self._queue) >= self.maxsize:
+                self._queue.popleft()
+                self.dropped += 1
+            self._queue.append(event)
+            self._cond.notify_all()
+            wakeup = self._wakeup
+        if wakeup is not None:
+            wakeup()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Event]:
+        # Next event, or None on timeout or once closed and empty.
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._queue or self.closed, timeout) or not self._queue:
+                return None
+            event = self._queue.popleft()
+            self._cond.notify_all()
+            return event
+
+    async def aget(self, timeout: Optional[float] = None) -> Optional[Event]:
+        # get() for event loops: waits on the loop instead of parking a thread.
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+
+        def wakeup() -> None:
+            try:
+                loop.call_soon_threadsafe(ready.set)
+            except RuntimeError:  # loop already closed
+                pass
+
+        deadline = None if timeout is None else loop.time() + timeout
+        with self._cond:
+            self._wakeup = wakeup
+        try:
+            while True:
+                with self._cond:
+                    if self._queue:
+                        event = self._queue.popleft()
+                        self._cond.notify_all()
+                        return event
+                    if self.closed:
+                        return None
+                    ready.clear()
+                remaining = None if deadline is None else deadline - loop.time()
+                if remaining is not None and remaining <= 0:
+                    return None
+                try:
+                    await asyncio.wait_for(ready.wait(), remaining)
+                except asyncio.TimeoutError:
+                    return None
+        finally:
+            with self._cond:
+                self._wakeup = None
+
+    def drain(self) -> List[Event]:
+        with self._cond:
+            events = list(self._queue)
+            self._queue.clear()
+            self._cond.notify_all()
+            return events
+
+    def close(self) -> None:
+        self._bus._unsubscribe(self)
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+            wakeup = self._wakeup
+        if wakeup is not None:
+            wakeup()
+
+    def __iter__(self) -> Iterator[Event]:
+        while True:
+            event = self.get()
+            if event is None:
+                return
+            yield event
+
+    def __enter__(self) -> Subscription:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# In-process pub/sub for task and node state changes. Publishing with no
+# subscribers returns before building the event, so the scheduler pays one
+# attribute check per transition when nobody listens.
+class EventBus:
+    def __init__(self, block_timeout_s: float = 1.0) -> None:
+        self.block_timeout_s = block_timeout_s
+        self._subscriptions: List[Subscription] = []
+        self._lock = threading.Lock()
+        self._seq = itertools.count(1)
+
+    @property
+    def active(self) -> bool:
+        return bool(self._subscriptions)
+
+    def subscribe(
+        self,
+        types: Optional[Iterable[EventType]] = None,
+        task_id: Optional[int] = None,
+        user: Optional[str] = None,
+        node: Optional[str] = None,
+        maxsize: int = 1024,
+        block: bool = False,
+    ) -> Subscription:
+        subscription = Subscription(
+            self, None if types is None else set(types), task_id, user, node, max(1, maxsize), block
+        )
+        with self._lock:
+            # Copy on write: publish() iterates without taking the lock.
+            self._subscriptions = self._subscriptions + [subscription]
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions = [item for item in self._subscriptions if item is not subscription]
+
+    def publish(
+        self,
+        type: EventType,
+        task_id: Optional[int] = None,
+        user: Optional[str] = None,
+        node: Optional[str] = None,
+        **data,
+    ) -> Optional[Event]:
+        subscriptions = self._subscriptions
+        if not subscriptions:
+            return None
+        event = Event(type, next(self._seq), time.time(), task_id, user, node, data)
+        for subscription in subscriptions:
+            if subscription.matches(event):
+                subscription._offer(event, self.block_timeout_s)
+        return event
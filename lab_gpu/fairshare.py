@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+import math
+from typing import Dict, Optional, Tuple
+
+
+@dataclass
+class UserUsage:
+    usage: float = 0.0
+    rate: float = 0.0
+    ts: float = 0.0
+
+
+# Per-user GPU usage in VRAM-weighted GPU-seconds with exponential half-life
+# decay. Usage is advanced lazily: between events a user's running tasks add a
+# constant rate, so usage(t) = u*d + rate*tau*(1-d) with d = 2^(-dt/half_life)
+# and tau = half_life/ln 2. Nothing is ever recomputed from history.
+class FairShare:
+    def __init__(self, half_life_s: float = 86400.0) -> None:
+        self.half_life_s = half_life_s
+        self.users: Dict[str, UserUsage] = {}
+        self._running: Dict[int, Tuple[str, float]] = {}
+
+    @staticmethod
+    def charge(gpu_count: int, vram_gb: float) -> float:
+        return max(1, gpu_count) * max(vram_gb, 1.0)
+
+    def _advanced(self, entry: UserUsage, now: float) -> float:
+        dt = now - entry.ts
+        if dt <= 0 or self.half_life_s <= 0:
+            return entry.usage + entry.rate * max(dt, 0.0)
+        decay = 0.5 ** (dt / self.half_life_s)
+        tau = self.half_life_s / math.log(2)
+        return entry.usage * decay + entry.rate * tau * (1.0 - decay)
+
+    def _advance(self, user: str, now: float) -> UserUsage:
+        entry = self.users.get(user)
+        if entry is None:
+            entry = self.users[user] = UserUsage(ts=now)
+            return entry
+        entry.usage = self._advanced(entry, now)
+        entry.ts = now
+        return entry
+
+    def start(self, task_id: int, user: str, charge: float, now: float) -> bool:
+        if task_id in self._running:
+            return False
+        self._advance(user, now).rate += charge
+        self._running[task_id] = (user, charge)
+        return True
+
+    def stop(self, task_id: int, now: float) -> Optional[str]:
+        # Returns the user whose charge was dropped, None if the task wasn't charged.
+        running = self._running.pop(task_id, None)
+        if running is None:
+            return None
+        user, charge = running
+        entry = self._advance(user, now)
+        entry.rate = max(0.0, entry.rate - charge)
+        return user
+
+    def usage(self, user: str, now: float) -> float:
+        entry = self.users.get(user)
+        return 0.0 if entry is None else self._advanced(entry, now)
+
+    def factors(self, now: float, targets: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+        # 2^(-usage_share / target_share): 1.0 for an idle user, towards 0 for
+        # a user far above their target share.
+        targets = targets or {}
+        usage = {user: self._advanced(entry, now) for user, entry in self.users.items()}
+        total_usage = sum(usage.values())
+        total_target = sum(targets.get(user, 1.0) for user in usage)
+        if total_usage <= 0 or total_target <= 0:
+            return {}
+        result = {}
+        for user, value in usage.items():
+            target_share = targets.get(user, 1.0) / total_target
+            if target_share <= 0:
+                result[user] = 0.0
+                continue
+            result[user] = round(2.0 ** (-(value / total_usage) / target_share), 3)
+        return result
@@ -2,12 +2,47 @@ from __future__ import annotations
 
 from typing import Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
+
+from .topology import parse_topology
 
 
 class AgentRegister(BaseModel):
     node: str
     gpus: list[dict]
+    topology: Optional[dict] = None
+
+    @field_validator("topology")
+    @classmethod
+    def _parseable_topology(cls, value: Optional[dict]) -> Optional[dict]:
+        # A bad `nvidia-smi topo` capture is the agent's error (422), not a 500
+        # from the register handler.
+        if value:
+            try:
+                parse_topology(value)
+            except (TypeError, AttributeError) as exc:
+                raise ValueError(f"malformed topology: {exc}") from exc
+        return value
+
+
+class GpuTelemetry(BaseModel):
+    id: int
+    used_vram_gb: Optional[float] = None
+    unmanaged_vram_gb: Optional[float] = None
+    util_pct: Optional[float] = None
+    zombie: Optional[bool] = None
+
+
+class TaskTelemetry(BaseModel):
+    id: int
+    used_vram_gb: float
+    util_pct: Optional[float] = None
+
+
+class AgentTelemetry(BaseModel):
+    node: str
+    gpus: list[GpuTelemetry]
+    tasks: list[TaskTelemetry] = []
 
 
 class TaskSubmit(BaseModel):
@@ -16,3 +51,5 @@ class TaskSubmit(BaseModel):
     priority: str = "normal"
     time_limit: Optional[int] = None
     gpu_type: Optional[str] = None
+    gpus: int = Field(1, ge=1)
+    idempotency_key: Optional[str] = None
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+from dataclasses import fields
+import json
+import os
+import re
+import threading
+import time
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from .models import Priority, Task, TaskStatus
+
+TASK_FIELDS = [item.name for item in fields(Task)]
+_PRIORITY_AT = TASK_FIELDS.index("priority")
+_STATUS_AT = TASK_FIELDS.index("status")
+_PRIORITIES = {item.value: item for item in Priority}
+_STATUSES = {item.value: item for item in TaskStatus}
+_DEFAULT = Task(task_id=0, user="", cmd="", min_vram_gb=0.0, priority=Priority.NORMAL)
+_FILE = re.compile(r"(snapshot|wal)-(\d+)\.(json|log)$")
+
+
+def task_row(task: Task) -> list:
+    # Positional rows keep snapshots of millions of tasks compact; the field
+    # list is stored in the snapshot so rows survive added Task fields.
+    row = [getattr(task, name) for name in TASK_FIELDS]
+    row[_PRIORITY_AT] = task.priority.value
+    row[_STATUS_AT] = task.status.value
+    return row
+
+
+def task_from_row(row: list, names: Optional[List[str]] = None) -> Task:
+    # Decodes the enum columns in place: rows are consumed.
+    if names is not None and names != TASK_FIELDS:
+        # Written by another version: match columns by name, new fields
+        # keep their defaults.
+        values = dict(zip(names, row))
+        return task_from_row(
+            [values[name] if name in values else getattr(_DEFAULT, name) for name in TASK_FIELDS]
+        )
+    row[_PRIORITY_AT] = _PRIORITIES[row[_PRIORITY_AT]]
+    row[_STATUS_AT] = _STATUSES[row[_STATUS_AT]]
+    return Task(*row)
+
+
+# Append-only JSON-lines journal with periodic snapshots. Generation g is
+# snapshot-g.json (state when wal-g.log was started) plus wal-g.log. Records
+# are buffered and written with one fsync per batch: when `sync_every`
+# records are buffered, when the oldest buffered record is `sync_interval_s`
+# old at the next append, on flush(), or when a caller waits for its record
+# with sync(). Writers hold `_io` while the buffer stays open to append(), so
+# callers that sync() concurrently share the next fsync (group commit).
+class Journal:
+    def __init__(
+        self,
+        directory: str,
+        sync_every: int = 256,
+        sync_interval_s: float = 0.05,
+        snapshot_every: int = 100_000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.directory = directory
+        self.sync_every = sync_every
+        self.sync_interval_s = sync_interval_s
+        self.snapshot_every = snapshot_every
+        self.clock = clock
+        self.generation = 0
+        self.records = 0
+        self._buffer: List[str] = []
+        self._first_buffered = 0.0
+        self._lsn = 0
+        self._synced = 0
+        self._lock = threading.Lock()
+        self._io = threading.RLock()
+        self._valid_bytes = 0
+        self._file = None
+
+    def _path(self, kind: str, generation: int) -> str:
+        ext = "json" if kind == "snapshot" else "log"
+        return os.path.join(self.directory, f"{kind}-{generation}.{ext}")
+
+    def _generations(self, kind: str) -> List[int]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(int(m.group(2)) for name in names if (m := _FILE.match(name)) and m.group(1) == kind)
+
+    def load(self) -> Tuple[Optional[dict], Iterator[dict]]:
+        # The latest snapshot and the records written after it. A torn last
+        # line (crash mid-write) ends the replay.
+        snapshots = self._generations("snapshot")
+        self.generation = snapshots[-1] if snapshots else 0
+        snapshot = None
+        if snapshots:
+            with open(self._path("snapshot", self.generation), "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+        return snapshot, self._replay(self._path("wal", self.generation))
+
+    def _replay(self, path: str) -> Iterator[dict]:
+        self._valid_bytes = 0
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    return
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    return
+                self._valid_bytes += len(line)
+                self.records += 1
+                yield record
+
+    def open(self) -> None:
+        # Must follow a fully consumed load(): anything after the last good
+        # record is cut off before appending.
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path("wal", self.generation)
+        if os.path.exists(path) and os.path.getsize(path) > self._valid_bytes:
+            with open(path, "r+b") as f:
+                f.truncate(self._valid_bytes)
+        self._file = open(path, "a", encoding="utf-8")
+
+    @property
+    def lsn(self) -> int:
+        # Sequence number of the last appended record.
+        return self._lsn
+
+    def append(self, record: dict) -> int:
+        line = json.dumps(record, separators=(",", ":"))
+        with self._lock:
+            if not self._buffer:
+                self._first_buffered = self.clock()
+            self._buffer.append(line)
+            self.records += 1
+            self._lsn += 1
+            lsn = self._lsn
+            due = len(self._buffer) >= self.sync_every or self.clock() - self._first_buffered >= self.sync_interval_s
+        if due:
+            self.flush()
+        return lsn
+
+    def sync(self, lsn: int) -> None:
+        # Returns once record `lsn` is on disk. A caller that finds another
+        # fsync in progress waits for it and then writes everything buffered
+        # since, so concurrent callers need one fsync per batch, not each.
+        if self._synced >= lsn:
+            return
+        with self._io:
+            if self._synced < lsn:
+                self.flush()
+
+    def flush(self) -> None:
+        with self._io:
+            with self._lock:
+                if not self._buffer or self._file is None:
+                    return
+                lines, self._buffer = self._buffer, []
+                upto = self._lsn
+            self._file.write("\n".join(lines) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._synced = upto
+
+    def snapshot_due(self) -> bool:
+        return self.records >= self.snapshot_every
+
+    def snapshot(self, payload: dict) -> None:
+        with self._io:
+            self._snapshot(payload)
+
+    def _snapshot(self, payload: dict) -> None:
+        self.flush()
+        generation = self.generation + 1
+        path = self._path("snapshot", generation)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(payload, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        if self._file is not None:
+            self._file.close()
+        self.generation = generation
+        self.records = 0
+        self._valid_bytes = 0
+        self.open()
+        for kind in ("snapshot", "wal"):
+            for old in self._generations(kind):
+                if old < generation:
+                    os.remove(self._path(kind, old))
+
+    def close(self) -> None:
+        with self._io:
+            self.flush()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
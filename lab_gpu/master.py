@@ -1,12 +1,29 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, field
-from typing import Dict, List, Optional
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+import functools
+import gc
 import os
+import queue
+import threading
 import time
 
-from .models import Node, OOMSignal, Task, TaskStatus
+from .archive import TaskArchive
+from .events import EventBus, EventType
+from .journal import TASK_FIELDS, Journal, task_from_row, task_row
+from .models import GPU, Node, OOMSignal, Task, TaskStatus
+from .preemption import PreemptionPlan
+from .preemptor import PreemptionHandle, Preemptor
+from .profiles import TaskProfile
 from .scheduler import Scheduler
+from .store import TaskStore
+from .topology import Topology, load_topology_file
+from .tracing import traced
+
+# Extra time preempt_task waits past SIGKILL for the exit to be noticed.
+PREEMPT_WAIT_GRACE_S = 10.0
 
 
 @dataclass
@@ -16,6 +33,11 @@ class MasterState:
     oom_events: int = 0
     runtimes: Dict[int, "TaskRuntime"] = field(default_factory=dict)
     last_oom_task: Optional[int] = None
+    preemptions: int = 0
+    topologies: Dict[str, Topology] = field(default_factory=dict)
+    next_task_id: int = 1
+    # idempotency key -> (task_id, submitted at), oldest first
+    idempotency: "OrderedDict[str, Tuple[int, float]]" = field(default_factory=OrderedDict)
 
 
 @dataclass
@@ -26,115 +48,679 @@ class TaskRuntime:
     started_ts: float = field(default_factory=time.time)
 
 
+class IdempotencyConflict(ValueError):
+    pass
+
+
+def _serialized(fn):
+    # Master is the single writer of scheduler state: public entry points hold
+    # its re-entrant lock, so HTTP worker threads, the TUI and SDK callers can
+    # share one Master. Work under it is short but not I/O-free: batch journal
+    # fsyncs, the store commit in flush() and publishing to block=True event
+    # subscribers (up to EventBus.block_timeout_s) happen while it is held.
+    # Waits that need not hold it (preempt_task, submission durability) happen
+    # after it is released.
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return fn(self, *args, **kwargs)
+
+    return wrapper
+
+
 class Master:
     def __init__(self, scheduler: Optional[Scheduler] = None) -> None:
+        self.lock = threading.RLock()
         self.scheduler = scheduler or Scheduler()
         self.state = MasterState()
+        self._node_list: Optional[List[Node]] = None
+        self.journal: Optional[Journal] = None
+        self.store: Optional[TaskStore] = None
+        self.archive: Optional[TaskArchive] = None
+        self.preemptor: Optional[Preemptor] = None
+        self.events: EventBus = self.scheduler.events
+        self.metrics = self.scheduler.metrics
+        self.metrics.registry.collect(self._collect_metrics)
+        # task_id -> (handle, what to do on exit, head task it was preempted for)
+        self._preempting: Dict[int, tuple[PreemptionHandle, Optional[TaskStatus], Optional[int]]] = {}
 
+    @_serialized
     def register_node(self, node: Node) -> None:
+        # A topology sent with the registration wins over the static file.
+        if node.topology is None:
+            node.topology = self.state.topologies.get(node.name)
         self.state.nodes[node.name] = node
+        self._node_list = None
+        self._log(
+            {
+                "op": "node",
+                "name": node.name,
+                "gpu_type": node.gpu_type,
+                "gpus": [[gpu.gpu_id, gpu.total_vram_gb] for gpu in node.gpus],
+            }
+        )
+        self.events.publish(EventType.NODE_REGISTERED, node=node.name, gpus=len(node.gpus), gpu_type=node.gpu_type)
+
+    def _log(self, record: dict) -> None:
+        if self.journal is not None:
+            self.journal.append(record)
+
+    def _log_counters(self) -> None:
+        self._log(
+            {
+                "op": "counters",
+                "oom_events": self.state.oom_events,
+                "last_oom_task": self.state.last_oom_task,
+                "preemptions": self.state.preemptions,
+            }
+        )
+
+    @_serialized
+    def open_journal(self, directory: str, sync_every: int = 256, snapshot_every: int = 100_000) -> None:
+        # Recovers from the latest snapshot plus the journal tail, then logs
+        # every further mutation. Must be called before anything is submitted.
+        journal = Journal(directory, sync_every=sync_every, snapshot_every=snapshot_every)
+        # Recovery allocates millions of long-lived objects; cyclic GC passes
+        # over them would roughly double the load time.
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            snapshot, records = journal.load()
+            self._recover(snapshot or {}, records)
+        finally:
+            if enabled:
+                gc.enable()
+        journal.open()
+        self.journal = self.scheduler.journal = journal
+
+    def _recover(self, snapshot: dict, records) -> None:
+        names = snapshot.get("task_fields", TASK_FIELDS)
+        id_column = names.index("task_id")
+        tasks = {row[id_column]: task_from_row(row, names) for row in snapshot.get("tasks", [])}
+        nodes = {entry["name"]: entry for entry in snapshot.get("nodes", [])}
+        profiles = dict(snapshot.get("profiles", {}))
+        runtimes = {int(task_id): entry for task_id, entry in snapshot.get("runtimes", {}).items()}
+        fronted = list(snapshot.get("fronted", []))
+        history = list(snapshot.get("history", []))
+        counters = snapshot.get("counters", {})
+        top_id = max(snapshot.get("next_task_id", 1) - 1, max(tasks, default=0))
+        idempotency = OrderedDict((key, (task_id, ts)) for key, task_id, ts in snapshot.get("idempotency", []))
+        for record in records:
+            op = record["op"]
+            if op == "task":
+                task = task_from_row(record["row"])
+                tasks[task.task_id] = task
+                top_id = max(top_id, task.task_id)
+            elif op == "node":
+                nodes[record["name"]] = record
+            elif op == "profile":
+                profiles[record["key"]] = record["profile"]
+            elif op == "front":
+                fronted.append(record["id"])
+            elif op == "history":
+                history.append(record["id"])
+            elif op == "runtime":
+                runtimes[record["id"]] = record
+            elif op == "runtime_clear":
+                runtimes.pop(record["id"], None)
+            elif op == "counters":
+                counters = record
+            elif op == "archive":
+                for task_id in record["ids"]:
+                    tasks.pop(task_id, None)
+                top_id = max(top_id, max(record["ids"], default=0))
+            elif op == "idem":
+                idempotency[record["key"]] = (record["id"], record["ts"])
+        for entry in nodes.values():
+            gpus = [GPU(gpu_id=gpu_id, total_vram_gb=total) for gpu_id, total in entry["gpus"]]
+            self.register_node(Node(name=entry["name"], gpus=gpus, gpu_type=entry.get("gpu_type")))
+        self._sync_capacity()
+        for key, value in profiles.items():
+            self.scheduler.profiles[key] = TaskProfile(**value)
+        self.scheduler.restore(list(tasks.values()), fronted)
+        for task_id, entry in runtimes.items():
+            self.register_runtime(task_id, entry["pid"], entry["log_path"])
+        self.state.history = history
+        self._trim_history()
+        self.state.oom_events = counters.get("oom_events", 0)
+        self.state.last_oom_task = counters.get("last_oom_task")
+        self.state.preemptions = counters.get("preemptions", 0)
+        self._claim_id(top_id)
+        self.state.idempotency = idempotency
+
+    @_serialized
+    def snapshot(self) -> None:
+        if self.journal is None:
+            return
+        scheduler = self.scheduler
+        self.journal.snapshot(
+            {
+                "task_fields": TASK_FIELDS,
+                "tasks": [task_row(task) for task in scheduler.state.tasks.values()],
+                "nodes": [
+                    {
+                        "name": node.name,
+                        "gpu_type": node.gpu_type,
+                        "gpus": [[gpu.gpu_id, gpu.total_vram_gb] for gpu in node.gpus],
+                    }
+                    for node in self.state.nodes.values()
+                ],
+                "profiles": {key: asdict(profile) for key, profile in scheduler.profiles.items()},
+                "runtimes": {
+                    task_id: {"pid": runtime.pid, "log_path": runtime.log_path}
+                    for task_id, runtime in self.state.runtimes.items()
+                },
+                "fronted": scheduler.state.pending_index.fronted(),
+                "history": self.state.history,
+                "next_task_id": self.state.next_task_id,
+                "idempotency": [[key, task_id, ts] for key, (task_id, ts) in self.state.idempotency.items()],
+                "counters": {
+                    "oom_events": self.state.oom_events,
+                    "last_oom_task": self.state.last_oom_task,
+                    "preemptions": self.state.preemptions,
+                },
+            }
+        )
+
+    @_serialized
+    def open_store(self, path: str) -> None:
+        store = TaskStore(path)
+        for task in self.scheduler.state.tasks.values():
+            store.put(task)
+        for runtime in self.state.runtimes.values():
+            store.put_runtime(runtime.task_id, runtime.pid, runtime.log_path, runtime.started_ts)
+        store.flush()
+        self._claim_id(store.max_task_id())
+        self.store = self.scheduler.store = store
+
+    @_serialized
+    def open_archive(self, path: str) -> None:
+        self.archive = TaskArchive(path)
+        self._claim_id(self.archive.max_id)
 
+    @_serialized
+    def apply_retention(self) -> int:
+        # Moves tasks finished more than retention_hours ago to the archive.
+        hours = self.scheduler.policy.retention_hours
+        if not hours or self.archive is None:
+            return 0
+        tasks = self.scheduler.evict_finished(self.scheduler.clock() - hours * 3600.0)
+        if not tasks:
+            return 0
+        logs = {}
+        for task in tasks:
+            runtime = self.state.runtimes.pop(task.task_id, None)
+            if runtime is not None:
+                logs[task.task_id] = runtime.log_path
+        self.archive.append(tasks, logs)
+        self._log({"op": "archive", "ids": [task.task_id for task in tasks]})
+        self._trim_history()
+        return len(tasks)
+
+    def _trim_history(self) -> None:
+        # History is in finish order, so archived IDs collect at its head.
+        history = self.state.history
+        hot = self.scheduler.state.tasks
+        keep = 0
+        while keep < len(history) and history[keep] not in hot:
+            keep += 1
+        if keep:
+            del history[:keep]
+
+    @_serialized
+    def find_task(self, task_id: int) -> Optional[Task]:
+        task = self.scheduler.state.tasks.get(task_id)
+        if task is None and self.archive is not None:
+            found = self.archive.get(task_id)
+            task = found[0] if found else None
+        return task
+
+    @_serialized
+    def log_path(self, task_id: int, log_root: str = "/nas/logs") -> str:
+        runtime = self.state.runtimes.get(task_id)
+        if runtime is not None:
+            return runtime.log_path
+        if task_id not in self.scheduler.state.tasks and self.archive is not None:
+            found = self.archive.get(task_id)
+            if found and found[1]:
+                return found[1]
+        return os.path.join(log_root, f"{task_id}.log")
+
+    @_serialized
+    def usage(self, since: Optional[float] = None, until: Optional[float] = None) -> Dict[str, dict]:
+        # Per-user finished runs and GPU-hours, hot and archived alike; a task
+        # retried after archival counts once per archived run.
+        totals: Dict[str, dict] = {}
+        hot = [task for task in self.scheduler.state.tasks.values() if task.end_ts is not None]
+        archived = self.archive.scan() if self.archive is not None else iter(())
+        for task in [*hot, *archived]:
+            end = task.end_ts
+            if end is None or (since is not None and end < since) or (until is not None and end >= until):
+                continue
+            entry = totals.setdefault(task.user, {"tasks": 0, "failed": 0, "gpu_hours": 0.0})
+            entry["tasks"] += 1
+            entry["failed"] += task.status == TaskStatus.FAILED
+            if task.start_ts is not None:
+                entry["gpu_hours"] += max(1, task.gpu_count) * max(0.0, end - task.start_ts) / 3600.0
+        for entry in totals.values():
+            entry["gpu_hours"] = round(entry["gpu_hours"], 3)
+        return totals
+
+    @traced("master.flush")
+    @_serialized
+    def flush(self) -> None:
+        # Group commit point: fsyncs buffered journal records, compacts into a
+        # snapshot once enough have accumulated and writes the store batch.
+        if self.store is not None:
+            self.store.flush()
+        if self.journal is None:
+            return
+        self.journal.flush()
+        if self.journal.snapshot_due():
+            self.snapshot()
+
+    @_serialized
+    def query_tasks(
+        self,
+        status: Optional[str] = None,
+        user: Optional[str] = None,
+        node: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 50,
+        before: Optional[int] = None,
+    ) -> tuple[List[Task], Optional[int]]:
+        # Newest first, `before` is the cursor returned with the previous page.
+        if self.store is not None:
+            return self.store.query(status, user, node, since, until, limit, before)
+        # Insertion order is not id order (retry_task re-adopts archived
+        # tasks), so page by descending id.
+        tasks = self.scheduler.state.tasks
+        page: List[Task] = []
+        for task_id in sorted(tasks, reverse=True):
+            if before is not None and task_id >= before:
+                continue
+            task = tasks[task_id]
+            if status is not None and task.status.value != status:
+                continue
+            if user is not None and task.user != user:
+                continue
+            if node is not None and task.assigned_node != node:
+                continue
+            if (since is not None and task.submit_ts < since) or (until is not None and task.submit_ts >= until):
+                continue
+            if len(page) == limit:
+                return page, page[-1].task_id
+            page.append(task)
+        return page, None
+
+    @_serialized
+    def load_topology(self, path: str) -> None:
+        self.state.topologies.update(load_topology_file(path))
+        for name, topology in self.state.topologies.items():
+            node = self.state.nodes.get(name)
+            if node is not None and node.topology is None:
+                node.topology = topology
+
+    def _nodes(self) -> List[Node]:
+        if self._node_list is None:
+            self._node_list = list(self.state.nodes.values())
+        return self._node_list
+
+    def _sync_capacity(self) -> None:
+        self.scheduler.capacity.sync(self._nodes())
+
+    @_serialized
     def submit(self, task: Task) -> None:
+        # Queues a task that already has an ID; see submit_new() to allocate one.
+        self._claim_id(task.task_id)
         self.scheduler.submit(task)
 
+    def _claim_id(self, task_id: int) -> None:
+        if task_id >= self.state.next_task_id:
+            self.state.next_task_id = task_id + 1
+
+    @property
+    def next_task_id(self) -> int:
+        # The ID the next submit_new() would assign, for dry runs.
+        return self.state.next_task_id
+
+    def submit_new(self, task: Task, idempotency_key: Optional[str] = None) -> Tuple[Task, bool]:
+        # Assigns the next task ID and queues the task. Retrying with the same
+        # key within idempotency_ttl_hours returns the original task and False.
+        # Returns once the submission is journaled (see _durable).
+        with self.lock:
+            result = self._submit_new(task, idempotency_key)
+            lsn = self._journal_lsn()
+        self._durable(lsn)
+        return result
+
+    def _journal_lsn(self) -> int:
+        return self.journal.lsn if self.journal is not None else 0
+
+    def _durable(self, lsn: int) -> None:
+        # Called after releasing the lock: submitters waiting here at the same
+        # time share one journal fsync instead of queueing behind the lock.
+        if self.journal is not None:
+            self.journal.sync(lsn)
+
+    def _submit_new(self, task: Task, idempotency_key: Optional[str]) -> Tuple[Task, bool]:
+        if idempotency_key is not None:
+            task_id = self._idempotent(idempotency_key)
+            original = self.find_task(task_id) if task_id is not None else None
+            if original is not None:
+                if (original.user, original.cmd) != (task.user, task.cmd):
+                    raise IdempotencyConflict(
+                        f"Idempotency key {idempotency_key!r} already submitted task {task_id} with a different command"
+                    )
+                return original, False
+        task.task_id = self.state.next_task_id
+        self.submit(task)
+        if idempotency_key is not None:
+            now = self.scheduler.clock()
+            self.state.idempotency.pop(idempotency_key, None)
+            self.state.idempotency[idempotency_key] = (task.task_id, now)
+            self._log({"op": "idem", "key": idempotency_key, "id": task.task_id, "ts": now})
+        return task, True
+
+    def submit_many(
+        self, tasks: List[Task], idempotency_keys: Optional[List[Optional[str]]] = None
+    ) -> List[Tuple[Task, bool]]:
+        # One lock acquisition and one journal sync for the whole batch. Keys
+        # are checked before anything is queued, so a conflict rejects the
+        # batch as a whole.
+        keys = idempotency_keys or [None] * len(tasks)
+        with self.lock:
+            self._check_keys(tasks, keys)
+            results = [self._submit_new(task, key) for task, key in zip(tasks, keys)]
+            lsn = self._journal_lsn()
+        self._durable(lsn)
+        return results
+
+    def _check_keys(self, tasks: List[Task], keys: List[Optional[str]]) -> None:
+        seen: Dict[str, Task] = {}
+        for task, key in zip(tasks, keys):
+            if key is None:
+                continue
+            original = seen.get(key)
+            if original is None:
+                task_id = self._idempotent(key)
+                original = self.find_task(task_id) if task_id is not None else None
+            if original is not None and (original.user, original.cmd) != (task.user, task.cmd):
+                raise IdempotencyConflict(
+                    f"Idempotency key {key!r} already submitted task {original.task_id} with a different command"
+                )
+            seen.setdefault(key, original or task)
+
+    def _idempotent(self, key: str) -> Optional[int]:
+        keys = self.state.idempotency
+        cutoff = self.scheduler.clock() - self.scheduler.policy.idempotency_ttl_hours * 3600.0
+        while keys and next(iter(keys.values()))[1] < cutoff:
+            keys.popitem(last=False)
+        entry = keys.get(key)
+        return entry[0] if entry is not None else None
+
+    @_serialized
+    def find_placement(self, task: Task) -> Optional[tuple[Node, list[GPU]]]:
+        self._sync_capacity()
+        return self.scheduler.find_placement(task)
+
+    @_serialized
+    def update_gpu(self, node_name: str, gpu_id: int, **telemetry) -> bool:
+        self._sync_capacity()
+        return self.scheduler.update_gpu(node_name, gpu_id, **telemetry)
+
+    @_serialized
+    def observe_task_vram(self, task_id: int, used_vram_gb: float, util_pct: Optional[float] = None) -> None:
+        self.scheduler.observe_task_vram(task_id, used_vram_gb, util_pct)
+
+    @_serialized
     def on_oom(self, signal: OOMSignal) -> None:
         self.state.oom_events += 1
         self.state.last_oom_task = signal.task_id
         self.scheduler.apply_oom_recovery(signal.task_id, signal.missing_gb)
+        self._log_counters()
 
+    @traced("master.schedule_once")
+    @_serialized
     def schedule_once(self) -> List[tuple[int, str, int]]:
-        return self.scheduler.schedule(list(self.state.nodes.values()))
+        self.reap_preemptions()
+        assignments = self.scheduler.schedule(self._nodes())
+        plan = self.scheduler.preemption_plan
+        if plan is not None:
+            self.scheduler.preemption_plan = None
+            handles = self.preempt_for(plan)
+            if any(handle.done() for handle in handles.values()):
+                assignments += self.scheduler.schedule(self._nodes())
+        self.apply_retention()
+        self.flush()
+        return assignments
 
-    def mark_failed(self, task_id: int) -> None:
-        self.scheduler.update_task_status(task_id, TaskStatus.FAILED)
+    @_serialized
+    def preempt_for(self, plan: PreemptionPlan) -> Dict[int, PreemptionHandle]:
+        # Victims go through SIGUSR1 -> SIGTERM -> SIGKILL in the background
+        # and back to PENDING once they exit (see reap_preemptions). Victims
+        # without a process are requeued right away. Returns {} while an
+        # earlier preemption for the same head or victims is still running.
+        in_flight = self._preempting
+        if any(head == plan.task_id for _, _, head in in_flight.values()) or any(
+            task_id in in_flight for task_id in plan.victims
+        ):
+            return {}
+        policy = self.scheduler.policy
+        handles = {}
+        for task_id in plan.victims:
+            handles[task_id] = self.preempt_async(
+                task_id,
+                soft_timeout_s=policy.preempt_soft_timeout_s,
+                term_timeout_s=policy.preempt_term_timeout_s,
+                then=TaskStatus.PENDING,
+                head=plan.task_id,
+            )
+        self.reap_preemptions()
+        return handles
+
+    @_serialized
+    def reap_preemptions(self) -> int:
+        # Applies finished preemptions on the caller's thread; the preemptor
+        # thread never touches scheduler state.
+        if self.preemptor is None:
+            return 0
+        reaped = 0
+        requeued = False
+        while True:
+            try:
+                handle = self.preemptor.completed.get_nowait()
+            except queue.Empty:
+                break
+            entry = self._preempting.pop(handle.task_id, None)
+            if entry is None or entry[0] is not handle:
+                continue
+            reaped += 1
+            self.metrics.preemptions.labels(handle.result).inc()
+            if handle.result == "error":
+                # Signalling failed and the process may still hold its GPU:
+                # leave the task as it is so it can be preempted again.
+                continue
+            self.clear_runtime(handle.task_id)
+            if entry[1] == TaskStatus.PENDING:
+                self.scheduler.requeue_preempted(handle.task_id)
+                self.state.preemptions += 1
+                requeued = True
+            elif entry[1] is not None:
+                self._finish(handle.task_id, entry[1])
+        if requeued:
+            self._log_counters()
+        return reaped
+
+    def _finish(self, task_id: int, status: TaskStatus) -> None:
+        self.scheduler.update_task_status(task_id, status)
         self.state.history.append(task_id)
+        self._log({"op": "history", "id": task_id})
+
+    @_serialized
+    def mark_failed(self, task_id: int) -> None:
+        self._finish(task_id, TaskStatus.FAILED)
 
+    @_serialized
     def mark_succeeded(self, task_id: int) -> None:
-        self.scheduler.update_task_status(task_id, TaskStatus.SUCCEEDED)
-        self.state.history.append(task_id)
+        self._finish(task_id, TaskStatus.SUCCEEDED)
 
+    @traced("master.summary")
+    @_serialized
     def summary(self) -> dict:
-        tasks = list(self.scheduler.state.tasks.values())
-        pending = len([t for t in tasks if t.status == TaskStatus.PENDING])
-        running = [t for t in tasks if t.status == TaskStatus.RUNNING]
-        failed = len([t for t in tasks if t.status == TaskStatus.FAILED])
-        total_gpus = 0
-        busy_gpus = 0
-        for node in self.state.nodes.values():
-            for gpu in node.gpus:
-                total_gpus += 1
-                if gpu.used_vram_gb > 0:
-                    busy_gpus += 1
+        # O(1) in the task history: counters are maintained at each status
+        # transition and busy GPUs by the capacity index.
+        self.reap_preemptions()
+        self._sync_capacity()
+        counters = self.scheduler.counters
+        capacity = self.scheduler.capacity
+        last_tick = self.scheduler.last_tick
         return {
-            "tasks": len(tasks),
-            "pending": pending,
-            "running": len(running),
-            "failed": failed,
-            "busy": busy_gpus,
-            "total": total_gpus,
-            "my_running": len([t for t in running if t.user == "me"]),
+            "tasks": counters.total,
+            "pending": counters.by_status[TaskStatus.PENDING],
+            "running": counters.by_status[TaskStatus.RUNNING],
+            "failed": counters.by_status[TaskStatus.FAILED],
+            "busy": capacity.busy_gpus,
+            "total": capacity.total_gpus,
+            "my_running": counters.running_by_user.get("me", 0),
             "ooms": self.state.oom_events,
             "last_oom_task": self.state.last_oom_task,
-            "running_tasks": [{"id": t.task_id, "label": t.cmd[:60]} for t in running],
+            "preemptions": self.state.preemptions,
+            "last_tick": asdict(last_tick) if last_tick is not None else None,
+            "running_tasks": [{"id": t.task_id, "label": t.cmd[:60]} for t in counters.running.values()],
             "recent": [
                 {
                     "id": t.task_id,
                     "status": t.status.value,
                     "node": t.assigned_node,
                 }
-                for t in tasks[-5:]
+                for t in counters.recent
             ],
         }
 
+    def _collect_metrics(self):
+        # Scrape-time gauges: O(nodes + GPUs + queue buckets).
+        self._sync_capacity()
+        counters = self.scheduler.counters
+        depths = self.scheduler.state.pending_index.depths()
+        yield (
+            "labgpu_queue_depth",
+            "gauge",
+            "Pending tasks by priority and gpu_type.",
+            [
+                ({"priority": priority.value, "gpu_type": gpu_type or ""}, count)
+                for (gpu_type, priority), count in sorted(depths.items(), key=lambda item: (item[0][0] or "", item[0][1].value))
+            ],
+        )
+        yield (
+            "labgpu_tasks",
+            "gauge",
+            "Tasks by status.",
+            [({"status": status.value}, count) for status, count in counters.by_status.items()],
+        )
+        nodes = self._nodes()
+        yield (
+            "labgpu_node_free_vram_gb",
+            "gauge",
+            "Free VRAM per node (total - used - unmanaged).",
+            [({"node": node.name}, round(sum(gpu.free_vram_gb for gpu in node.gpus), 3)) for node in nodes],
+        )
+        capacity = self.scheduler.capacity
+        yield (
+            "labgpu_gpus",
+            "gauge",
+            "GPUs by state.",
+            [({"state": "busy"}, capacity.busy_gpus), ({"state": "total"}, capacity.total_gpus)],
+        )
+        # As of the last tick, so placement strategies can be compared.
+        last_tick = self.scheduler.last_tick
+        for name, field_name, help_text in (
+            ("labgpu_stranded_vram_gb", "stranded_vram_gb", "Free VRAM on GPUs too small for any pending task."),
+            ("labgpu_largest_free_vram_gb", "largest_free_gb", "Largest free VRAM on a single GPU."),
+            ("labgpu_vram_fragmentation", "fragmentation", "1 - largest free / total free VRAM."),
+        ):
+            yield name, "gauge", help_text, [] if last_tick is None else [({}, getattr(last_tick, field_name))]
+
+    @_serialized
+    def metrics_text(self) -> str:
+        return self.metrics.registry.render()
+
+    @_serialized
     def register_runtime(self, task_id: int, pid: int, log_path: str) -> None:
-        self.state.runtimes[task_id] = TaskRuntime(task_id=task_id, pid=pid, log_path=log_path)
+        runtime = self.state.runtimes[task_id] = TaskRuntime(task_id=task_id, pid=pid, log_path=log_path)
+        self._log({"op": "runtime", "id": task_id, "pid": pid, "log_path": log_path})
+        if self.store is not None:
+            self.store.put_runtime(task_id, pid, log_path, runtime.started_ts)
+        task = self.scheduler.state.tasks.get(task_id)
+        if task is not None:
+            self.events.publish(EventType.STARTED, task_id, task.user, task.assigned_node, pid=pid)
 
+    @_serialized
     def clear_runtime(self, task_id: int) -> None:
-        self.state.runtimes.pop(task_id, None)
+        if self.state.runtimes.pop(task_id, None) is not None:
+            self._log({"op": "runtime_clear", "id": task_id})
+            if self.store is not None:
+                self.store.drop_runtime(task_id)
 
-    def _pid_alive(self, pid: int) -> bool:
-        try:
-            os.kill(pid, 0)
-            return True
-        except OSError:
-            return False
+    @_serialized
+    def preempt_async(
+        self,
+        task_id: int,
+        soft_timeout_s: float = 300,
+        term_timeout_s: float = 30,
+        then: Optional[TaskStatus] = None,
+        head: Optional[int] = None,
+    ) -> PreemptionHandle:
+        # Starts SIGUSR1 -> SIGTERM -> SIGKILL and returns at once. `then` is
+        # applied to the task when the process is gone: PENDING requeues it as
+        # preempted, FAILED/SUCCEEDED finish it.
+        entry = self._preempting.get(task_id)
+        if entry is not None:
+            if then is not None:
+                self._preempting[task_id] = (entry[0], then, entry[2])
+            return entry[0]
+        runtime = self.state.runtimes.get(task_id)
+        if runtime is None:
+            self.metrics.preemptions.labels("not-running").inc()
+            if then == TaskStatus.PENDING:
+                self.scheduler.requeue_preempted(task_id)
+                self.state.preemptions += 1
+                self._log_counters()
+            elif then is not None:
+                self._finish(task_id, then)
+            return PreemptionHandle.finished(task_id, "not-running")
+        if self.preemptor is None:
+            self.preemptor = Preemptor()
+        handle = self.preemptor.start(task_id, runtime.pid, runtime.log_path, soft_timeout_s, term_timeout_s)
+        self._preempting[task_id] = (handle, then, head)
+        return handle
 
     def preempt_task(self, task_id: int, soft_timeout_s: int = 300, term_timeout_s: int = 30) -> str:
-        runtime = self.state.runtimes.get(task_id)
-        if not runtime:
-            return "not-running"
-        from .agent import Agent
-
-        agent = Agent()
-        agent.soft_preempt(runtime.pid, runtime.log_path)
-        deadline = time.time() + soft_timeout_s
-        while time.time() < deadline:
-            if not self._pid_alive(runtime.pid):
-                self.clear_runtime(task_id)
-                return "soft-exit"
-            time.sleep(1)
-        agent.hard_preempt(runtime.pid)
-        deadline = time.time() + term_timeout_s
-        while time.time() < deadline:
-            if not self._pid_alive(runtime.pid):
-                self.clear_runtime(task_id)
-                return "term-exit"
-            time.sleep(1)
-        agent.force_kill(runtime.pid)
-        self.clear_runtime(task_id)
-        return "killed"
+        # Blocking form for the CLI, bounded by the escalation deadlines.
+        handle = self.preempt_async(task_id, soft_timeout_s, term_timeout_s)
+        result = handle.wait(soft_timeout_s + term_timeout_s + PREEMPT_WAIT_GRACE_S)
+        self.reap_preemptions()
+        if result is None:
+            return "timeout"
+        if result == "error":
+            return f"error ({handle.error})"
+        return result
 
+    @_serialized
     def retry_task(self, task_id: int) -> None:
+        if task_id not in self.scheduler.state.tasks and self.archive is not None:
+            found = self.archive.get(task_id)
+            if found is not None:
+                self.scheduler.adopt(found[0])
         self.scheduler.reset_task(task_id)
+        self.metrics.retries.labels("manual").inc()
 
+    @_serialized
     def move_task_to_front(self, task_id: int) -> None:
         self.scheduler.move_to_front(task_id)
 
-    def kill_task(self, task_id: int) -> str:
-        if task_id in self.state.runtimes:
-            result = self.preempt_task(task_id, soft_timeout_s=5, term_timeout_s=5)
-        else:
-            result = "not-running"
-        self.scheduler.update_task_status(task_id, TaskStatus.FAILED)
-        self.state.history.append(task_id)
-        return result
+    @_serialized
+    def kill_task(self, task_id: int) -> PreemptionHandle:
+        # The task is marked FAILED once its process has exited.
+        return self.preempt_async(task_id, soft_timeout_s=5, term_timeout_s=5, then=TaskStatus.FAILED)
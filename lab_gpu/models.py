@@ -5,6 +5,8 @@ from enum import Enum
 from typing import Optional
 import time
 
+from .topology import Topology
+
 
 class Priority(str, Enum):
     HIGH = "high"
@@ -38,11 +40,16 @@ class Task:
     env: Optional[str] = None
     time_limit_s: Optional[int] = None
     profile_key: Optional[str] = None
+    gpu_count: int = 1
     submit_ts: float = field(default_factory=time.time)
     start_ts: Optional[float] = None
     retry_count: int = 0
+    preempt_count: int = 0
     assigned_node: Optional[str] = None
     assigned_gpu: Optional[int] = None
+    assigned_gpus: Optional[list[int]] = None
+    cpu_affinity: Optional[list[int]] = None
+    end_ts: Optional[float] = None
 
 
 @dataclass
@@ -64,6 +71,7 @@ class Node:
     name: str
     gpus: list[GPU]
     gpu_type: Optional[str] = None
+    topology: Optional[Topology] = None
 
 
 @dataclass
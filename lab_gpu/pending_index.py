@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from heapq import merge
+from typing import Callable, Collection, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .models import Priority, Task
+
+BucketKey = Tuple[Optional[str], Priority, str]
+Entry = Tuple[float, int, int]
+
+
+# Submission order of PENDING task IDs as an ordered set: membership, append,
+# removal and move-to-front are all O(1), and tasks leave as soon as they stop
+# pending so the queue never grows with history.
+class PendingQueue:
+    def __init__(self) -> None:
+        self._ids: "OrderedDict[int, None]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, task_id: object) -> bool:
+        return task_id in self._ids
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._ids)
+
+    def append(self, task_id: int) -> None:
+        self._ids.setdefault(task_id, None)
+
+    def discard(self, task_id: int) -> None:
+        self._ids.pop(task_id, None)
+
+    def move_to_front(self, task_id: int) -> None:
+        if task_id in self._ids:
+            self._ids.move_to_end(task_id, last=False)
+
+
+# Every task in a (gpu_type, priority, user) bucket shares one fair-share score,
+# so the full ordering is a merge of sorted buckets instead of a sort of the
+# queue. Keying on gpu_type as well lets a tick walk only the pools it needs.
+class PendingIndex:
+    def __init__(self) -> None:
+        self._buckets: Dict[BucketKey, List[Entry]] = {}
+        self._entries: Dict[int, Tuple[BucketKey, Entry, float]] = {}
+        self._seqs: Dict[int, int] = {}
+        self._demand: Dict[float, int] = {}
+        self._next_seq = 0
+        self._front_seq = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, task_id: object) -> bool:
+        return task_id in self._entries
+
+    def add(self, task: Task) -> None:
+        self.discard(task.task_id)
+        seq = self._seqs.get(task.task_id)
+        if seq is None:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._seqs[task.task_id] = seq
+        key = (task.gpu_type or None, task.priority, task.user)
+        entry = (task.submit_ts, seq, task.task_id)
+        insort(self._buckets.setdefault(key, []), entry)
+        self._entries[task.task_id] = (key, entry, task.min_vram_gb)
+        self._demand[task.min_vram_gb] = self._demand.get(task.min_vram_gb, 0) + 1
+
+    def discard(self, task_id: int) -> None:
+        located = self._entries.pop(task_id, None)
+        if located is None:
+            return
+        key, entry, demand = located
+        bucket = self._buckets[key]
+        del bucket[bisect_left(bucket, entry)]
+        if not bucket:
+            del self._buckets[key]
+        if self._demand[demand] == 1:
+            del self._demand[demand]
+        else:
+            self._demand[demand] -= 1
+
+    def move_to_front(self, task: Task) -> None:
+        self._front_seq -= 1
+        self._seqs[task.task_id] = self._front_seq
+        if task.task_id in self._entries:
+            self.add(task)
+
+    def forget(self, task_id: int) -> None:
+        self.discard(task_id)
+        self._seqs.pop(task_id, None)
+
+    def fronted(self) -> List[int]:
+        # Tasks moved to the front, in the order the moves happened.
+        return [task_id for _, task_id in sorted(((seq, task_id) for task_id, seq in self._seqs.items() if seq < 0), reverse=True)]
+
+    def depths(self) -> Dict[Tuple[Optional[str], Priority], int]:
+        # Pending tasks per (gpu_type, priority); O(buckets), not O(tasks).
+        depths: Dict[Tuple[Optional[str], Priority], int] = {}
+        for (gpu_type, priority, _), entries in self._buckets.items():
+            depths[(gpu_type, priority)] = depths.get((gpu_type, priority), 0) + len(entries)
+        return depths
+
+    def gpu_types(self) -> Set[Optional[str]]:
+        return {key[0] for key in self._buckets}
+
+    def min_demand(self) -> float:
+        return min((gb for gb in self._demand if gb > 0), default=0.0)
+
+    def rank(self, task_id: int, score: Callable[[Priority, str], float]) -> Tuple[float, Entry]:
+        # Sort key of a pending task in ordered(score): lower comes out first.
+        (_, priority, user), entry, _ = self._entries[task_id]
+        return -score(priority, user), entry
+
+    def ordered(
+        self,
+        score: Callable[[Priority, str], float],
+        gpu_types: Optional[Collection[Optional[str]]] = None,
+        include: Iterable[int] = (),
+    ) -> Iterator[int]:
+        groups: Dict[float, List[List[Entry]]] = {}
+        for (gpu_type, priority, user), entries in self._buckets.items():
+            if gpu_types is None or gpu_type in gpu_types:
+                groups.setdefault(score(priority, user), []).append(entries)
+        if gpu_types is not None:
+            extra: Dict[float, List[Entry]] = {}
+            for task_id in include:
+                located = self._entries.get(task_id)
+                if located is None or located[0][0] in gpu_types:
+                    continue
+                (_, priority, user), entry, _ = located
+                extra.setdefault(score(priority, user), []).append(entry)
+            for value, entries in extra.items():
+                groups.setdefault(value, []).append(sorted(entries))
+        for value in sorted(groups, reverse=True):
+            lists = groups[value]
+            source = lists[0] if len(lists) == 1 else merge(*lists)
+            for _, _, task_id in source:
+                yield task_id
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple, Type
+
+from .capacity import CapacityIndex
+from .models import GPU, Node, Task
+
+
+@dataclass
+class TickStats:
+    assignments: int
+    pending: int
+    free_vram_gb: float
+    largest_free_gb: float
+    stranded_vram_gb: float
+    fragmentation: float
+
+
+class PlacementStrategy:
+    name = ""
+
+    def begin_tick(self, min_demand: float) -> None:
+        pass
+
+    def choose(self, index: CapacityIndex, task: Task) -> Optional[Tuple[Node, GPU]]:
+        raise NotImplementedError
+
+
+class FirstFit(PlacementStrategy):
+    name = "first-fit"
+
+    def choose(self, index: CapacityIndex, task: Task) -> Optional[Tuple[Node, GPU]]:
+        return index.first_fit(task)
+
+
+class BestFit(PlacementStrategy):
+    name = "best-fit"
+
+    def choose(self, index: CapacityIndex, task: Task) -> Optional[Tuple[Node, GPU]]:
+        return index.best_fit(task)
+
+
+class WorstFit(PlacementStrategy):
+    name = "worst-fit"
+
+    def choose(self, index: CapacityIndex, task: Task) -> Optional[Tuple[Node, GPU]]:
+        return index.worst_fit(task)
+
+
+class Packing(PlacementStrategy):
+    # Best fit, unless the leftover would be too small for any pending request;
+    # then the tightest GPU that still leaves a usable remainder wins.
+    name = "packing"
+
+    def __init__(self) -> None:
+        self.min_demand = 0.0
+
+    def begin_tick(self, min_demand: float) -> None:
+        self.min_demand = min_demand
+
+    def choose(self, index: CapacityIndex, task: Task) -> Optional[Tuple[Node, GPU]]:
+        tightest = index.best_fit(task)
+        if tightest is None:
+            return None
+        leftover = tightest[1].free_vram_gb - task.min_vram_gb
+        if leftover <= 0 or leftover >= self.min_demand:
+            return tightest
+        return index.best_fit(task, need=task.min_vram_gb + self.min_demand) or tightest
+
+
+class CoLocate(PlacementStrategy):
+    # Shares GPUs by compute as well as VRAM. A GPU takes another tenant only
+    # below max_tenants and while its projected utilisation (telemetry or the
+    # expected load of its tenants, whichever is higher, plus this task's)
+    # stays within util_limit. Lowest projected load wins, then most headroom.
+    name = "co-locate"
+
+    def __init__(self) -> None:
+        self.max_tenants = 2
+        self.util_limit = 100.0
+        self.intensity: Callable[[Task], float] = lambda task: 50.0
+
+    def choose(self, index: CapacityIndex, task: Task) -> Optional[Tuple[Node, GPU]]:
+        expected = self.intensity(task)
+        best: Optional[Tuple[Tuple[float, float, int], Node, GPU]] = None
+        for order, node, gpu in index.fitting(task):
+            tenants, load = index.tenants(node.name, gpu.gpu_id)
+            if tenants >= self.max_tenants:
+                continue
+            projected = max(gpu.util_pct, load) + expected
+            if tenants and projected > self.util_limit:
+                continue
+            headroom = (gpu.free_vram_gb - task.min_vram_gb) / gpu.total_vram_gb if gpu.total_vram_gb > 0 else 0.0
+            key = (projected, -headroom, order)
+            if best is None or key < best[0]:
+                best = (key, node, gpu)
+        if best is None:
+            return None
+        return best[1], best[2]
+
+
+STRATEGIES: Dict[str, Type[PlacementStrategy]] = {
+    cls.name: cls for cls in (FirstFit, BestFit, WorstFit, Packing, CoLocate)
+}
+
+
+def make_strategy(name: str) -> PlacementStrategy:
+    try:
+        return STRATEGIES[name]()
+    except KeyError:
+        raise ValueError(f"Unknown placement strategy: {name}") from None
+
+
+def tick_stats(index: CapacityIndex, assignments: int, pending: int, min_demand: float) -> TickStats:
+    free = index.total_free_gb
+    largest = index.largest_free_gb()
+    return TickStats(
+        assignments=assignments,
+        pending=pending,
+        free_vram_gb=round(free, 2),
+        largest_free_gb=round(largest, 2),
+        stranded_vram_gb=round(index.stranded_gb(min_demand), 2),
+        fragmentation=round(1.0 - largest / free, 4) if free > 0 else 0.0,
+    )
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import Dict, Optional
 
 try:
     import yaml  # type: ignore
@@ -17,6 +17,34 @@ class PolicyConfig:
     night_idle_util_threshold: float = 0.20
     backfill_time_limit_s: int = 3600
     night_low_bonus: float = 0.5
+    placement: str = "first-fit"
+    vectorized_state: bool = False
+    backfill_mode: str = "limit"
+    backfill_reservations: int = 16
+    fair_share_weight: float = 0.0
+    fair_share_half_life_s: float = 86400.0
+    fair_share_refresh_s: float = 60.0
+    fair_share_targets: Dict[str, float] = field(default_factory=dict)
+    profile_percentile: float = 95.0
+    profile_window: int = 100
+    profile_path: Optional[str] = None
+    partitioned: bool = False
+    pool_workers: int = 4
+    preemption: bool = False
+    preempt_soft_timeout_s: int = 300
+    preempt_term_timeout_s: int = 30
+    colocate_max_tenants: int = 2
+    colocate_util_limit: float = 100.0
+    colocate_default_util: float = 50.0
+    topology_aware: bool = False
+    topology_path: Optional[str] = None
+    journal_path: Optional[str] = None
+    journal_sync_every: int = 256
+    journal_snapshot_every: int = 100000
+    store_path: Optional[str] = None
+    retention_hours: float = 0.0
+    archive_path: Optional[str] = None
+    idempotency_ttl_hours: float = 24.0
 
 
 def _parse_simple_yaml(text: str) -> dict:
@@ -30,6 +58,18 @@ def _parse_simple_yaml(text: str) -> dict:
     return data
 
 
+def _parse_shares(value) -> Dict[str, float]:
+    if isinstance(value, dict):
+        return {str(k): float(v) for k, v in value.items()}
+    shares: Dict[str, float] = {}
+    for item in str(value).split(","):
+        if "=" not in item:
+            continue
+        user, share = item.split("=", 1)
+        shares[user.strip()] = float(share)
+    return shares
+
+
 def load_policy(path: str) -> Optional[PolicyConfig]:
     try:
         with open(path, "r", encoding="utf-8") as f:
@@ -53,10 +93,14 @@ def load_policy(path: str) -> Optional[PolicyConfig]:
     for key, value in payload.items():
         if not hasattr(config, key):
             continue
-        field = getattr(config, key)
-        if isinstance(field, float):
+        current = getattr(config, key)
+        if isinstance(current, bool):
+            setattr(config, key, value if isinstance(value, bool) else str(value).lower() in {"1", "true", "yes", "on"})
+        elif isinstance(current, dict):
+            setattr(config, key, _parse_shares(value))
+        elif isinstance(current, float):
             setattr(config, key, float(value))
-        elif isinstance(field, int):
+        elif isinstance(current, int):
             setattr(config, key, int(value))
         else:
             setattr(config, key, str(value))
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .models import Node, Task, PRIORITY_WEIGHT
+
+RUNTIME_WEIGHT = 1.0  # per hour of work thrown away
+RETRY_WEIGHT = 0.5  # per earlier OOM retry or preemption
+EXACT_LIMIT = 12  # victims per GPU searched exhaustively; greedy above
+
+
+@dataclass
+class PreemptionPlan:
+    task_id: int
+    node: str
+    gpu_ids: List[int]
+    victims: List[int]
+    cost: float
+
+
+def victim_cost(task: Task, now: float) -> float:
+    runtime_h = max(0.0, now - task.start_ts) / 3600.0 if task.start_ts is not None else 0.0
+    return PRIORITY_WEIGHT[task.priority] + RUNTIME_WEIGHT * runtime_h + RETRY_WEIGHT * (task.retry_count + task.preempt_count)
+
+
+def _cheapest_cover(candidates: List[Tuple[float, float, int]], need: float) -> Optional[Tuple[float, List[int]]]:
+    # Min-cost subset of (cost, vram_gb, task_id) freeing at least `need` GB.
+    if need <= 0:
+        return 0.0, []
+    if sum(vram for _, vram, _ in candidates) < need:
+        return None
+    if len(candidates) > EXACT_LIMIT:
+        chosen, freed, cost = [], 0.0, 0.0
+        for c, vram, task_id in sorted(candidates, key=lambda item: item[0] / max(item[1], 1e-9)):
+            chosen.append(task_id)
+            freed += vram
+            cost += c
+            if freed >= need:
+                return cost, sorted(chosen)
+        return None
+    best: Optional[Tuple[float, List[int]]] = None
+    for size in range(1, len(candidates) + 1):
+        for subset in combinations(candidates, size):
+            if sum(vram for _, vram, _ in subset) < need:
+                continue
+            cost = sum(c for c, _, _ in subset)
+            victims = sorted(task_id for _, _, task_id in subset)
+            if best is None or (cost, victims) < best:
+                best = (cost, victims)
+    return best
+
+
+# Finds the cheapest set of strictly lower-priority running tasks whose VRAM,
+# once released, lets `task` start on one node. Unmanaged VRAM and zombie GPUs
+# are never counted as reclaimable.
+class PreemptionPlanner:
+    def __init__(
+        self,
+        tasks: Dict[int, Task],
+        running: Dict[int, Tuple[str, List[int], float]],
+        nodes: Iterable[Node],
+        now: float,
+    ) -> None:
+        self.tasks = tasks
+        self.now = now
+        self._nodes = list(nodes)
+        self._on_gpu: Dict[Tuple[str, int], List[Tuple[int, float]]] = {}
+        for task_id, (node_name, gpu_ids, vram_gb) in running.items():
+            for gpu_id in gpu_ids:
+                self._on_gpu.setdefault((node_name, gpu_id), []).append((task_id, vram_gb))
+
+    def plan(self, task: Task) -> Optional[PreemptionPlan]:
+        rank = PRIORITY_WEIGHT[task.priority]
+        k = max(1, task.gpu_count)
+        best: Optional[PreemptionPlan] = None
+        for node in self._nodes:
+            if task.gpu_type and node.gpu_type and task.gpu_type != node.gpu_type:
+                continue
+            options = []
+            for gpu in node.gpus:
+                if gpu.zombie or gpu.total_vram_gb - gpu.unmanaged_vram_gb < task.min_vram_gb:
+                    continue
+                candidates = []
+                for task_id, vram_gb in self._on_gpu.get((node.name, gpu.gpu_id), []):
+                    victim = self.tasks[task_id]
+                    if PRIORITY_WEIGHT[victim.priority] < rank:
+                        candidates.append((victim_cost(victim, self.now), vram_gb, task_id))
+                cover = _cheapest_cover(candidates, task.min_vram_gb - gpu.free_vram_gb)
+                if cover is not None:
+                    options.append((cover[0], gpu.gpu_id, cover[1]))
+            if len(options) < k:
+                continue
+            options.sort()
+            chosen = options[:k]
+            victims = sorted({task_id for _, _, ids in chosen for task_id in ids})
+            if not victims:
+                continue
+            cost = sum(victim_cost(self.tasks[task_id], self.now) for task_id in victims)
+            if best is None or (cost, len(victims)) < (best.cost, len(best.victims)):
+                best = PreemptionPlan(
+                    task_id=task.task_id,
+                    node=node.name,
+                    gpu_ids=sorted(gpu_id for _, gpu_id, _ in chosen),
+                    victims=victims,
+                    cost=round(cost, 4),
+                )
+        return best
@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import queue
+import selectors
+import threading
+import time
+import traceback
+from typing import Callable, Dict, List, Optional
+
+
+class _Timer:
+    __slots__ = ("rounds", "callback", "cancelled")
+
+    def __init__(self, rounds: int, callback: Callable[[], None]) -> None:
+        self.rounds = rounds
+        self.callback = callback
+        self.cancelled = False
+
+
+# Hashed timing wheel: scheduling and cancelling are O(1), advance() touches
+# one slot per elapsed tick. Timers more than one rotation away wait out
+# `rounds` passes of the cursor.
+class TimerWheel:
+    def __init__(self, tick_s: float = 0.1, slots: int = 512, now: float = 0.0) -> None:
+        self.tick_s = tick_s
+        self._slots: List[List[_Timer]] = [[] for _ in range(slots)]
+        self._cursor = 0
+        self._time = now
+        self.active = 0
+
+    def schedule(self, delay_s: float, callback: Callable[[], None], now: Optional[float] = None) -> _Timer:
+        # `now` moves an idle wheel up to the caller's clock first; otherwise
+        # delays count from the last advance() and a long idle gap would be
+        # replayed at once on the next one.
+        if now is not None and not self.active:
+            self._skip_to(now)
+        ticks = max(1, int(-(-delay_s // self.tick_s)))
+        rounds, offset = divmod(ticks, len(self._slots))
+        timer = _Timer(rounds, callback)
+        self._slots[(self._cursor + offset) % len(self._slots)].append(timer)
+        self.active += 1
+        return timer
+
+    def cancel(self, timer: _Timer) -> None:
+        if not timer.cancelled:
+            timer.cancelled = True
+            self.active -= 1
+
+    def _skip_to(self, now: float) -> None:
+        if now < self._time + self.tick_s:
+            return
+        ticks = int((now - self._time) // self.tick_s)
+        self._time += ticks * self.tick_s
+        self._cursor = (self._cursor + ticks) % len(self._slots)
+        # Only cancelled timers are left behind on an idle wheel.
+        self._slots = [[] for _ in self._slots]
+
+    def advance(self, now: float) -> None:
+        if not self.active:
+            self._skip_to(now)
+            return
+        while self._time + self.tick_s <= now:
+            self._time += self.tick_s
+            self._cursor = (self._cursor + 1) % len(self._slots)
+            slot = self._slots[self._cursor]
+            if not slot:
+                continue
+            due, waiting = [], []
+            for timer in slot:
+                if timer.cancelled:
+                    continue
+                if timer.rounds:
+                    timer.rounds -= 1
+                    waiting.append(timer)
+                else:
+                    due.append(timer)
+            self._slots[self._cursor] = waiting
+            for timer in due:
+                timer.cancelled = True
+                self.active -= 1
+                timer.callback()
+
+
+class PreemptionHandle:
+    def __init__(self, task_id: int, pid: Optional[int] = None) -> None:
+        self.task_id = task_id
+        self.pid = pid
+        self.state = "soft"
+        self.result: Optional[str] = None
+        self.error: Optional[str] = None
+        self._event = threading.Event()
+        self._callbacks: List[Callable[[PreemptionHandle], None]] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def finished(cls, task_id: int, result: str) -> PreemptionHandle:
+        handle = cls(task_id)
+        handle._finish(result)
+        return handle
+
+    def done(self) -> bool:
+        return self._event.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[str]:
+        self._event.wait(timeout)
+        return self.result
+
+    def add_done_callback(self, callback: Callable[[PreemptionHandle], None]) -> None:
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def _finish(self, result: str) -> None:
+        with self._lock:
+            self.state = "done"
+            self.result = result
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception:  # pragma: no cover - a callback's bug is its own
+                traceback.print_exc()
+
+    def __await__(self):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.add_done_callback(lambda handle: loop.call_soon_threadsafe(future.set_result, handle.result))
+        return future.__await__()
+
+
+class _Job:
+    __slots__ = ("handle", "term_timeout_s", "timer", "pidfd", "child")
+
+    def __init__(self, handle: PreemptionHandle, term_timeout_s: float) -> None:
+        self.handle = handle
+        self.term_timeout_s = term_timeout_s
+        self.timer: Optional[_Timer] = None
+        self.pidfd: Optional[int] = None
+        self.child = True
+
+
+def _exited(job: _Job) -> bool:
+    pid = job.handle.pid
+    if job.child:
+        try:
+            # WNOWAIT leaves the exit status for whoever owns the child.
+            return os.waitid(os.P_PID, pid, os.WEXITED | os.WNOHANG | os.WNOWAIT) is not None
+        except ChildProcessError:
+            job.child = False
+        except (AttributeError, OSError):  # pragma: no cover - platform dependent
+            job.child = False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        return False
+    return False
+
+
+# Runs SIGUSR1 -> SIGTERM -> SIGKILL escalations for any number of tasks on one
+# background thread. Exits are noticed through pidfds where the platform has
+# them and by polling on wheel ticks otherwise; escalations are wheel timers.
+# Finished handles are also queued on `completed` for the owner to reap.
+class Preemptor:
+    def __init__(self, tick_s: float = 0.1, clock: Callable[[], float] = time.monotonic) -> None:
+        self.clock = clock
+        self.completed: "queue.SimpleQueue[PreemptionHandle]" = queue.SimpleQueue()
+        self._wheel = TimerWheel(tick_s, now=clock())
+        self._selector = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+        self._commands: "queue.SimpleQueue[Callable[[], None]]" = queue.SimpleQueue()
+        self._polled: Dict[int, _Job] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def start(
+        self,
+        task_id: int,
+        pid: int,
+        log_path: str,
+        soft_timeout_s: float = 300,
+        term_timeout_s: float = 30,
+    ) -> PreemptionHandle:
+        handle = PreemptionHandle(task_id, pid)
+        job = _Job(handle, term_timeout_s)
+        self._call(lambda: self._begin(job, log_path, soft_timeout_s))
+        return handle
+
+    def _call(self, command: Callable[[], None]) -> None:
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="lab-gpu-preemptor", daemon=True)
+                self._thread.start()
+        self._commands.put(command)
+        try:
+            os.write(self._wake_w, b"x")
+        except BlockingIOError:
+            pass
+
+    def _begin(self, job: _Job, log_path: str, soft_timeout_s: float) -> None:
+        from .agent import Agent
+
+        try:
+            Agent().soft_preempt(job.handle.pid, log_path)
+        except ProcessLookupError:
+            self._finish(job, "soft-exit")
+            return
+        except OSError as exc:
+            self._fail(job, exc)
+            return
+        try:
+            job.pidfd = os.pidfd_open(job.handle.pid)
+            self._selector.register(job.pidfd, selectors.EVENT_READ, job)
+        except ProcessLookupError:
+            self._finish(job, "soft-exit")
+            return
+        except (AttributeError, OSError):
+            self._polled[job.handle.pid] = job
+        job.timer = self._wheel.schedule(soft_timeout_s, lambda: self._escalate(job), self.clock())
+
+    def _escalate(self, job: _Job) -> None:
+        if job.handle.done():
+            return
+        from .agent import Agent
+
+        try:
+            if job.handle.state == "soft":
+                job.handle.state = "term"
+                Agent().hard_preempt(job.handle.pid)
+                job.timer = self._wheel.schedule(job.term_timeout_s, lambda: self._escalate(job), self.clock())
+                return
+            Agent().force_kill(job.handle.pid)
+        except ProcessLookupError:
+            self._finish(job, f"{job.handle.state}-exit")
+            return
+        except OSError as exc:
+            self._fail(job, exc)
+            return
+        self._finish(job, "killed")
+
+    def _fail(self, job: _Job, exc: BaseException) -> None:
+        # The process may still be running; the owner keeps its runtime.
+        job.handle.error = f"{type(exc).__name__}: {exc}"
+        self._finish(job, "error")
+
+    def _finish(self, job: _Job, result: str) -> None:
+        if job.handle.done():
+            return
+        if job.timer is not None:
+            self._wheel.cancel(job.timer)
+        if job.pidfd is not None:
+            self._selector.unregister(job.pidfd)
+            os.close(job.pidfd)
+            job.pidfd = None
+        self._polled.pop(job.handle.pid, None)
+        job.handle._finish(result)
+        self.completed.put(job.handle)
+
+    def _run(self) -> None:
+        while True:
+            timeout = self._wheel.tick_s if self._wheel.active or self._polled else None
+            for key, _ in self._selector.select(timeout):
+                if key.data is None:
+                    try:
+                        while os.read(self._wake_r, 4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    while True:
+                        try:
+                            command = self._commands.get_nowait()
+                        except queue.Empty:
+                            break
+                        self._guarded(command)
+                else:
+                    job = key.data
+                    self._finish(job, f"{job.handle.state}-exit")
+            for job in list(self._polled.values()):
+                if _exited(job):
+                    self._finish(job, f"{job.handle.state}-exit")
+            self._guarded(lambda: self._wheel.advance(self.clock()))
+
+    def _guarded(self, command: Callable[[], None]) -> None:
+        # Jobs fail through _fail(); anything that still escapes must not
+        # take the thread (and every queued preemption) down with it.
+        try:
+            command()
+        except Exception:  # pragma: no cover - defensive
+            traceback.print_exc()
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, field
+import json
+import math
+import os
+from typing import Dict, List, Optional
+
+
+@dataclass
+class TaskProfile:
+    peak_vram_gb: float
+    success_count: int = 0
+    oom_count: int = 0
+    samples: List[float] = field(default_factory=list)
+    util_pct: Optional[float] = None
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    # Nearest-rank, so the prediction is always a VRAM size that was observed.
+    ordered = sorted(samples)
+    rank = math.ceil(max(0.0, min(100.0, pct)) / 100.0 * len(ordered))
+    return ordered[max(0, rank - 1)]
+
+
+# Peak-VRAM distribution per profile_key, fed by agent telemetry (observed
+# peaks of successful runs) and OOM signals (the VRAM the failed run needed at
+# least). Only the most recent `window` samples are kept per key.
+class ProfileStore:
+    def __init__(self, profiles: Optional[Dict[str, TaskProfile]] = None, window: int = 100) -> None:
+        self.profiles: Dict[str, TaskProfile] = profiles if profiles is not None else {}
+        self.window = window
+        self.path: Optional[str] = None
+        self.dirty = False
+
+    def _profile(self, key: str) -> TaskProfile:
+        profile = self.profiles.get(key)
+        if profile is None:
+            profile = self.profiles[key] = TaskProfile(peak_vram_gb=0.0)
+        return profile
+
+    def _add_sample(self, profile: TaskProfile, vram_gb: float) -> None:
+        profile.samples.append(round(vram_gb, 2))
+        if len(profile.samples) > self.window:
+            del profile.samples[: len(profile.samples) - self.window]
+        profile.peak_vram_gb = max(profile.peak_vram_gb, round(vram_gb, 2))
+        self.dirty = True
+
+    def record_success(self, key: str, peak_vram_gb: Optional[float], util_pct: Optional[float] = None) -> None:
+        profile = self._profile(key)
+        profile.success_count += 1
+        self.dirty = True
+        if util_pct is not None:
+            # Smoothed mean GPU utilisation, the task's expected intensity.
+            old = profile.util_pct
+            profile.util_pct = round(util_pct if old is None else 0.7 * old + 0.3 * util_pct, 2)
+        if peak_vram_gb is not None and peak_vram_gb > 0:
+            self._add_sample(profile, peak_vram_gb)
+
+    def record_oom(self, key: str, needed_gb: float) -> None:
+        profile = self._profile(key)
+        profile.oom_count += 1
+        self._add_sample(profile, needed_gb)
+
+    def predict(self, key: str, pct: float) -> Optional[float]:
+        profile = self.profiles.get(key)
+        if profile is None:
+            return None
+        if profile.samples:
+            return percentile(profile.samples, pct)
+        return profile.peak_vram_gb or None
+
+    def load(self, path: str) -> None:
+        self.path = path
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        for key, value in payload.items():
+            self.profiles[key] = TaskProfile(
+                peak_vram_gb=float(value.get("peak_vram_gb", 0.0)),
+                success_count=int(value.get("success_count", 0)),
+                oom_count=int(value.get("oom_count", 0)),
+                samples=[float(s) for s in value.get("samples", [])][-self.window :],
+                util_pct=value.get("util_pct"),
+            )
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({key: asdict(profile) for key, profile in self.profiles.items()}, f)
+        os.replace(tmp, self.path)
+        self.dirty = False
+
+    def sync(self, path: Optional[str]) -> None:
+        # Loads when the configured path changes, writes back when dirty.
+        if path != self.path:
+            if path:
+                self.load(path)
+            else:
+                self.path = None
+            return
+        if self.dirty:
+            self.save()
@@ -1,17 +1,27 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, field
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
 from datetime import datetime, time as dt_time
-from typing import Dict, List, Optional, Tuple
+from itertools import takewhile
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
 import time
 
-from .models import Node, Priority, Task, TaskStatus, PRIORITY_WEIGHT
-
-
-@dataclass
-class TaskProfile:
-    peak_vram_gb: float
-    success_count: int = 0
+from .backfill import BACKFILL_MODES, BackfillPlanner, Reservation
+from .capacity import NO_FIT, CapacityIndex
+from .counters import TaskCounters
+from .events import EventBus, EventType
+from .fairshare import FairShare
+from .journal import Journal, task_row
+from .metrics import SchedulerMetrics
+from .models import GPU, Node, Priority, Task, TaskStatus, PRIORITY_WEIGHT
+from .pending_index import PendingIndex, PendingQueue
+from .placement import CoLocate, PlacementStrategy, TickStats, make_strategy, tick_stats
+from .preemption import PreemptionPlan, PreemptionPlanner
+from .profiles import ProfileStore, TaskProfile
+from .store import TaskStore
+from .tracing import traced
 
 
 @dataclass
@@ -22,43 +32,284 @@ class SchedulerPolicy:
     night_idle_util_threshold: float = 0.20
     backfill_time_limit_s: int = 3600
     night_low_bonus: float = 0.5
+    placement: str = "first-fit"
+    vectorized_state: bool = False
+    backfill_mode: str = "limit"
+    backfill_reservations: int = 16
+    fair_share_weight: float = 0.0
+    fair_share_half_life_s: float = 86400.0
+    fair_share_refresh_s: float = 60.0
+    fair_share_targets: Dict[str, float] = field(default_factory=dict)
+    profile_percentile: float = 95.0
+    profile_window: int = 100
+    profile_path: Optional[str] = None
+    partitioned: bool = False
+    pool_workers: int = 4
+    preemption: bool = False
+    preempt_soft_timeout_s: int = 300
+    preempt_term_timeout_s: int = 30
+    colocate_max_tenants: int = 2
+    colocate_util_limit: float = 100.0
+    colocate_default_util: float = 50.0
+    topology_aware: bool = False
+    topology_path: Optional[str] = None
+    journal_path: Optional[str] = None
+    journal_sync_every: int = 256
+    journal_snapshot_every: int = 100000
+    store_path: Optional[str] = None
+    retention_hours: float = 0.0
+    archive_path: Optional[str] = None
+    idempotency_ttl_hours: float = 24.0
 
 
 @dataclass
 class SchedulerState:
     tasks: Dict[int, Task] = field(default_factory=dict)
-    pending_queue: List[int] = field(default_factory=list)
+    pending_queue: PendingQueue = field(default_factory=PendingQueue)
     active_counts: Dict[str, int] = field(default_factory=dict)
     profiles: Dict[str, TaskProfile] = field(default_factory=dict)
+    pending_index: PendingIndex = field(default_factory=PendingIndex)
+    reservations: Dict[int, Tuple[str, List[int], float]] = field(default_factory=dict)
+
+
+Placement = Tuple[Task, Node, List[GPU]]
+FINISHED = (TaskStatus.SUCCEEDED, TaskStatus.FAILED)
+
+
+def _finished_at(task: Task) -> float:
+    # Journals written before end_ts existed fall back to the start time.
+    if task.end_ts is not None:
+        return task.end_ts
+    return task.start_ts if task.start_ts is not None else task.submit_ts
+
+
+@dataclass
+class _PoolPass:
+    head: Optional[Tuple[int, bool]] = None
+    reservation: Optional[Tuple[str, Tuple[int, ...], float]] = None
+    placements: List[Placement] = field(default_factory=list)
+    resized: List[Task] = field(default_factory=list)
+    reservations: List[Reservation] = field(default_factory=list)
+    skipped: bool = False
 
 
 class Scheduler:
-    def __init__(self, policy: Optional[SchedulerPolicy] = None) -> None:
+    def __init__(self, policy: Optional[SchedulerPolicy] = None, clock: Optional[Callable[[], float]] = None) -> None:
         self.policy = policy or SchedulerPolicy()
+        self.clock = clock or time.time
         self.state = SchedulerState()
         self.profiles = self.state.profiles
+        self.capacity = CapacityIndex()
+        self._strategy: Optional[PlacementStrategy] = None
+        self.last_tick: Optional[TickStats] = None
+        self._dirty_tasks: Set[int] = set()
+        self._order_dirty = True
+        self._last_night: Optional[bool] = None
+        self._last_policy: tuple = ()
+        self._last_head: Optional[Tuple[int, bool]] = None
+        self._last_reservation: Optional[Tuple[str, Tuple[int, ...], float]] = None
+        self.last_reservations: List[Reservation] = []
+        self.fair_share = FairShare(self.policy.fair_share_half_life_s)
+        self._fair_factors: Dict[str, float] = {}
+        self._fair_refresh_ts: Optional[float] = None
+        self.profile_store = ProfileStore(self.profiles, self.policy.profile_window)
+        self._vram_peaks: Dict[int, float] = {}
+        self._util_samples: Dict[int, Tuple[float, int]] = {}
+        self._loads: Dict[int, float] = {}
+        self._pool_marks: Dict[
+            Optional[str], Tuple[Optional[Tuple[int, bool]], Optional[Tuple[str, Tuple[int, ...], float]]]
+        ] = {}
+        self._pool_reserved: Dict[Optional[str], List[Reservation]] = {}
+        self._shared_bar: Optional[Tuple[float, Tuple[float, int, int]]] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_workers = 0
+        self.preemption_plan: Optional[PreemptionPlan] = None
+        self.counters = TaskCounters()
+        self.journal: Optional[Journal] = None
+        self.store: Optional[TaskStore] = None
+        self.events = EventBus()
+        self.metrics = SchedulerMetrics()
+        self._finished: Deque[Tuple[float, int]] = deque()
 
     def submit(self, task: Task) -> None:
         self.state.tasks[task.task_id] = task
-        self.state.pending_queue.append(task.task_id)
+        self._sync_pending_index(task)
+        self.events.publish(EventType.SUBMITTED, task.task_id, task.user, priority=task.priority.value)
+
+    def _sync_pending_index(self, task: Task) -> None:
+        self.counters.observe(task)
+        if self.journal is not None:
+            self.journal.append({"op": "task", "row": task_row(task)})
+        if self.store is not None:
+            self.store.put(task)
+        if task.status == TaskStatus.PENDING:
+            self.state.pending_queue.append(task.task_id)
+            self.state.pending_index.add(task)
+            self._dirty_tasks.add(task.task_id)
+        else:
+            self.state.pending_queue.discard(task.task_id)
+            self.state.pending_index.discard(task.task_id)
+        self._order_dirty = True
+
+    def _occupy(self, task: Task, now: float) -> None:
+        charge = self.fair_share.charge(task.gpu_count, task.min_vram_gb)
+        if self.fair_share.start(task.task_id, task.user, charge, now):
+            self.state.active_counts[task.user] = self.state.active_counts.get(task.user, 0) + 1
+
+    def _release(self, task_id: int) -> None:
+        # Every way out of RUNNING (finish, preemption, OOM requeue, reset)
+        # comes through here, so this is where the user's slot is handed back.
+        user = self.fair_share.stop(task_id, self.clock())
+        if user is not None:
+            self.state.active_counts[user] = max(0, self.state.active_counts.get(user, 1) - 1)
+        reservation = self.state.reservations.pop(task_id, None)
+        if reservation is None:
+            return
+        node_name, gpu_ids, vram_gb = reservation
+        load = self._loads.pop(task_id, 0.0)
+        for gpu_id in gpu_ids:
+            self.capacity.add_tenant(node_name, gpu_id, load, count=-1)
+            gpu = self.capacity.gpu(node_name, gpu_id)
+            if gpu is None:
+                continue
+            gpu.used_vram_gb = max(0.0, gpu.used_vram_gb - vram_gb)
+            self.capacity.refresh(node_name, gpu_id)
+
+    def update_gpu(
+        self,
+        node_name: str,
+        gpu_id: int,
+        *,
+        used_vram_gb: Optional[float] = None,
+        unmanaged_vram_gb: Optional[float] = None,
+        util_pct: Optional[float] = None,
+        zombie: Optional[bool] = None,
+    ) -> bool:
+        gpu = self.capacity.gpu(node_name, gpu_id)
+        if gpu is None:
+            return False
+        if used_vram_gb is not None:
+            gpu.used_vram_gb = used_vram_gb
+        if unmanaged_vram_gb is not None:
+            gpu.unmanaged_vram_gb = unmanaged_vram_gb
+        if util_pct is not None:
+            if util_pct < gpu.util_pct:
+                self.capacity.mark_grown(node_name, gpu_id)
+            gpu.util_pct = util_pct
+        if zombie is not None:
+            gpu.zombie = zombie
+        self.capacity.refresh(node_name, gpu_id)
+        return True
 
     def update_task_status(self, task_id: int, status: TaskStatus) -> None:
         task = self.state.tasks[task_id]
         task.status = status
+        if status in FINISHED:
+            task.end_ts = self.clock()
+            self._finished.append((task.end_ts, task_id))
+        else:
+            task.end_ts = None
+        self._sync_pending_index(task)
+        if status != TaskStatus.RUNNING:
+            self._release(task_id)
         if status == TaskStatus.RUNNING:
-            self.state.active_counts[task.user] = self.state.active_counts.get(task.user, 0) + 1
+            self._occupy(task, self.clock())
         if status in {TaskStatus.FAILED, TaskStatus.SUCCEEDED}:
-            self.state.active_counts[task.user] = max(0, self.state.active_counts.get(task.user, 1) - 1)
+            peak, util = self._forget_usage(task_id)
+            if status == TaskStatus.SUCCEEDED and task.profile_key:
+                self.profile_store.record_success(task.profile_key, peak, util)
+                self._journal_profile(task.profile_key)
+        if status in FINISHED:
+            self.events.publish(EventType.FINISHED, task_id, task.user, task.assigned_node, status=status.value)
+
+    def _journal_profile(self, key: str) -> None:
+        if self.journal is not None:
+            self.journal.append({"op": "profile", "key": key, "profile": asdict(self.profiles[key])})
+
+    def restore(self, tasks: List[Task], fronted: List[int]) -> None:
+        # Rebuilds queues, counters and GPU reservations from recovered tasks;
+        # the capacity index must already be synced to the recovered nodes.
+        now = self.clock()
+        finished = []
+        for task in tasks:
+            self.state.tasks[task.task_id] = task
+            if task.status in FINISHED:
+                self.counters.observe(task)
+                finished.append((_finished_at(task), task.task_id))
+                continue
+            self._sync_pending_index(task)
+            if task.status != TaskStatus.RUNNING or task.assigned_node is None:
+                continue
+            gpu_ids = list(task.assigned_gpus or [task.assigned_gpu])
+            self.state.reservations[task.task_id] = (task.assigned_node, gpu_ids, task.min_vram_gb)
+            self._occupy(task, now)
+            load = self._loads[task.task_id] = self._task_intensity(task)
+            for gpu_id in gpu_ids:
+                gpu = self.capacity.gpu(task.assigned_node, gpu_id)
+                if gpu is None:
+                    continue
+                gpu.used_vram_gb += task.min_vram_gb
+                self.capacity.refresh(task.assigned_node, gpu_id)
+                self.capacity.add_tenant(task.assigned_node, gpu_id, load)
+        for task_id in fronted:
+            if task_id in self.state.tasks:
+                self.move_to_front(task_id)
+        self._finished = deque(sorted(finished))
+
+    def evict_finished(self, cutoff: float) -> List[Task]:
+        # Drops tasks that finished before `cutoff` from every hot structure,
+        # oldest first; O(evicted) because _finished is in finish order.
+        evicted = []
+        while self._finished and self._finished[0][0] < cutoff:
+            finished_at, task_id = self._finished.popleft()
+            task = self.state.tasks.get(task_id)
+            if task is None or task.status not in FINISHED or _finished_at(task) != finished_at:
+                continue
+            del self.state.tasks[task_id]
+            self.state.pending_index.forget(task_id)
+            self.counters.forget(task_id)
+            evicted.append(task)
+        return evicted
+
+    def adopt(self, task: Task) -> None:
+        # Brings an archived task back, e.g. to retry it.
+        self.state.tasks[task.task_id] = task
+        self.counters.adopt(task)
+
+    def observe_task_vram(self, task_id: int, used_vram_gb: float, util_pct: Optional[float] = None) -> None:
+        task = self.state.tasks.get(task_id)
+        if task is None or task.status != TaskStatus.RUNNING:
+            return
+        self._vram_peaks[task_id] = max(self._vram_peaks.get(task_id, 0.0), used_vram_gb)
+        if util_pct is not None:
+            total, count = self._util_samples.get(task_id, (0.0, 0))
+            self._util_samples[task_id] = (total + util_pct, count + 1)
+
+    def _forget_usage(self, task_id: int) -> Tuple[Optional[float], Optional[float]]:
+        peak = self._vram_peaks.pop(task_id, None)
+        util = self._util_samples.pop(task_id, None)
+        return peak, None if util is None else util[0] / util[1]
+
+    def _task_intensity(self, task: Task) -> float:
+        profile = self.profiles.get(task.profile_key) if task.profile_key else None
+        if profile is not None and profile.util_pct is not None:
+            return profile.util_pct
+        return self.policy.colocate_default_util
 
     def _fair_share_score(self, task: Task) -> float:
-        active = self.state.active_counts.get(task.user, 0)
-        score = PRIORITY_WEIGHT[task.priority] - (active * 0.1)
-        if self._is_night() and task.priority == Priority.LOW:
+        return self._bucket_score(task.priority, task.user, self._is_night())
+
+    def _bucket_score(self, priority: Priority, user: str, night: bool) -> float:
+        active = self.state.active_counts.get(user, 0)
+        score = PRIORITY_WEIGHT[priority] - (active * 0.1)
+        if self.policy.fair_share_weight:
+            score -= self.policy.fair_share_weight * (1.0 - self._fair_factors.get(user, 1.0))
+        if night and priority == Priority.LOW:
             score += self.policy.night_low_bonus
         return score
 
     def _is_night(self, now: Optional[datetime] = None) -> bool:
-        now = now or datetime.now()
+        now = now or datetime.fromtimestamp(self.clock())
         start = self._parse_time(self.policy.night_start)
         end = self._parse_time(self.policy.night_end)
         if start <= end:
@@ -72,89 +323,495 @@ class Scheduler:
         minute = int(parts[1]) if len(parts) > 1 else 0
         return dt_time(hour=hour, minute=minute)
 
+    @traced("scheduler.ordered_pending")
     def _ordered_pending(self) -> List[Task]:
-        pending = [self.state.tasks[tid] for tid in self.state.pending_queue]
-        pending = [t for t in pending if t.status == TaskStatus.PENDING]
-        return sorted(pending, key=lambda t: (-self._fair_share_score(t), t.submit_ts))
+        night = self._is_night()
+        tasks = self.state.tasks
+        ordered = self.state.pending_index.ordered(lambda priority, user: self._bucket_score(priority, user, night))
+        return [tasks[tid] for tid in ordered]
 
     def _apply_profile(self, task: Task) -> None:
-        if task.min_vram_gb > 0:
+        # An explicit request is trusted until it has OOMed once.
+        if task.min_vram_gb > 0 and task.retry_count == 0:
             return
         if not task.profile_key:
             return
-        profile = self.profiles.get(task.profile_key)
-        if not profile:
+        predicted = self.profile_store.predict(task.profile_key, self.policy.profile_percentile)
+        if predicted is None:
             return
-        task.min_vram_gb = max(task.min_vram_gb, profile.peak_vram_gb)
+        task.min_vram_gb = max(task.min_vram_gb, predicted)
 
-    def _node_fits(self, task: Task, node: Node, gpu) -> bool:
-        if task.gpu_type and node.gpu_type and task.gpu_type != node.gpu_type:
-            return False
-        return gpu.free_vram_gb >= task.min_vram_gb and not gpu.zombie
-
-    def _head_schedulable(self, head: Task, nodes: List[Node]) -> bool:
-        for node in nodes:
-            for gpu in node.gpus:
-                if self._node_fits(head, node, gpu):
-                    return True
-        return False
+    def _placement_strategy(self) -> PlacementStrategy:
+        if self._strategy is None or self._strategy.name != self.policy.placement:
+            self._strategy = make_strategy(self.policy.placement)
+        if isinstance(self._strategy, CoLocate):
+            self._strategy.max_tenants = self.policy.colocate_max_tenants
+            self._strategy.util_limit = self.policy.colocate_util_limit
+            self._strategy.intensity = self._task_intensity
+        return self._strategy
 
     def _backfill_ok(self, task: Task) -> bool:
         if task.time_limit_s is None:
             return False
         return task.time_limit_s <= self.policy.backfill_time_limit_s
 
-    def schedule(self, nodes: List[Node]) -> List[Tuple[int, str, int]]:
-        assignments: List[Tuple[int, str, int]] = []
-        ordered = self._ordered_pending()
-        if not ordered:
-            return assignments
+    def find_placement(
+        self,
+        task: Task,
+        strategy: Optional[PlacementStrategy] = None,
+        index: Optional[CapacityIndex] = None,
+    ) -> Optional[Tuple[Node, List[GPU]]]:
+        index = self.capacity if index is None else index
+        if task.gpu_count > 1:
+            if self.policy.topology_aware:
+                return self._topology_gang_fit(task, index)
+            return index.gang_fit(task)
+        placement = (strategy or self._placement_strategy()).choose(index, task)
+        if placement is None:
+            return None
+        return placement[0], [placement[1]]
 
-        head = ordered[0]
-        head_schedulable = self._head_schedulable(head, nodes)
+    def _topology_gang_fit(self, task: Task, index: CapacityIndex) -> Optional[Tuple[Node, List[GPU]]]:
+        # Every node that can host the gang is scored by its best k-subset;
+        # nodes without a registered topology score lowest, ties keep
+        # registration order.
+        k = task.gpu_count
+        best: Optional[Tuple[Tuple[float, float], Node, List[GPU]]] = None
+        for node, gpus in index.gang_nodes(task):
+            if node.topology is None:
+                chosen, score = gpus[:k], (0.0, 0.0)
+            else:
+                by_id = {gpu.gpu_id: gpu for gpu in gpus}
+                ids = node.topology.best_set(list(by_id), k)
+                chosen, score = [by_id[gpu_id] for gpu_id in ids], node.topology.score(ids)
+            if best is None or score > best[0]:
+                best = (score, node, chosen)
+        if best is None:
+            return None
+        return best[1], best[2]
 
-        for task in ordered:
+    def _prepare(self, task: Task) -> bool:
+        # True when the profile resized the request and the task must be
+        # re-indexed; left to the caller so pool workers never touch the index.
+        before = task.min_vram_gb
+        self._apply_profile(task)
+        return task.min_vram_gb != before
+
+    def _backfill_planner(self, head: Task, now: float, index: Optional[CapacityIndex] = None) -> BackfillPlanner:
+        if self.policy.backfill_mode not in BACKFILL_MODES:
+            raise ValueError(f"Unknown backfill mode: {self.policy.backfill_mode}")
+        index = self.capacity if index is None else index
+        planner = BackfillPlanner(self.state.tasks, self.state.reservations, index.nodes, now)
+        planner.reserve(head)
+        return planner
+
+    def _backfill_placement(
+        self, task: Task, strategy: PlacementStrategy, planner: BackfillPlanner, index: CapacityIndex
+    ) -> Optional[Tuple[Node, List[GPU]]]:
+        index.hold(planner.blocking(task))
+        try:
+            placement = self.find_placement(task, strategy, index)
+        finally:
+            index.unhold()
+        if (
+            placement is None
+            and self.policy.backfill_mode == "conservative"
+            and len(planner.reservations) < self.policy.backfill_reservations
+        ):
+            planner.reserve(task)
+        return placement
+
+    def _refresh_fair_share(self, now: float) -> bool:
+        # Decayed usage drifts continuously; re-rank on a fixed cadence so the
+        # order only changes at known points (and idle ticks stay idle).
+        if not self.policy.fair_share_weight:
+            changed = bool(self._fair_factors)
+            self._fair_factors = {}
+            return changed
+        if self._fair_refresh_ts is not None and now - self._fair_refresh_ts < self.policy.fair_share_refresh_s:
+            return False
+        self._fair_refresh_ts = now
+        self.fair_share.half_life_s = self.policy.fair_share_half_life_s
+        factors = self.fair_share.factors(now, self.policy.fair_share_targets)
+        changed = factors != self._fair_factors
+        self._fair_factors = factors
+        return changed
+
+    def _take_changes(self, night: bool, now: float) -> Optional[Tuple[bool, Set[Optional[str]], Set[int], bool]]:
+        # What happened since the last tick: (full, grown pools, dirty tasks,
+        # order changed), or None when nothing did and the tick can be skipped.
+        grown = self.capacity.take_grown()
+        dirty, self._dirty_tasks = self._dirty_tasks, set()
+        order_dirty, self._order_dirty = self._order_dirty, False
+        order_dirty = self._refresh_fair_share(now) or order_dirty
+        policy_key = tuple(vars(self.policy).values())
+        full = grown is None or night != self._last_night or policy_key != self._last_policy
+        self._last_night = night
+        self._last_policy = policy_key
+        if not full and not grown and not dirty and not order_dirty:
+            return None
+        return full, grown or set(), dirty, order_dirty
+
+    @traced("scheduler.candidates")
+    def _tick_candidates(
+        self, night: bool, now: float
+    ) -> Tuple[Optional[Task], bool, Optional[BackfillPlanner], List[Task]]:
+        # A pending task that neither fit nor passed the backfill gate last tick
+        # can only be placed now if its pools gained capacity, the head or its
+        # schedulability changed, or the night window / policy flipped.
+        changes = self._take_changes(night, now)
+        if changes is None:
+            return None, False, None, []
+        full, grown, dirty, _ = changes
+
+        tasks = self.state.tasks
+        index = self.state.pending_index
+        score = lambda priority, user: self._bucket_score(priority, user, night)
+        head_id = next(index.ordered(score), None)
+        if head_id is None:
+            self._last_head = None
+            return None, False, None, []
+        head = tasks[head_id]
+        if self._prepare(head):
+            index.add(head)
+        head_schedulable = self.find_placement(head) is not None
+        if (head_id, head_schedulable) != self._last_head:
+            full = True
+        self._last_head = (head_id, head_schedulable)
+
+        # A moved head reservation can unblock tasks in pools that did not grow.
+        planner = None
+        if not head_schedulable and self.policy.backfill_mode != "limit":
+            planner = self._backfill_planner(head, now)
+            target = None
+            if planner.reservations:
+                first = planner.reservations[0]
+                target = (first.node, tuple(first.gpu_ids), first.start_ts)
+            if target != self._last_reservation or self.policy.backfill_mode == "conservative":
+                full = True
+            self._last_reservation = target
+
+        if full or None in grown:
+            ordered = index.ordered(score)
+        else:
+            ordered = index.ordered(score, gpu_types=grown | {None}, include=dirty)
+        return head, head_schedulable, planner, [tasks[tid] for tid in ordered]
+
+    @traced("scheduler.place")
+    def _place(
+        self,
+        index: CapacityIndex,
+        candidates: List[Task],
+        head: Optional[Task],
+        head_schedulable: bool,
+        planner: Optional[BackfillPlanner],
+        night: bool,
+        strategy: PlacementStrategy,
+    ) -> Tuple[List[Placement], List[Task]]:
+        # Reserves VRAM on the GPU objects and in `index` only; the caller
+        # commits the placements and re-indexes the resized tasks.
+        placements: List[Placement] = []
+        resized: List[Task] = []
+        attempts = 0
+        for task in candidates:
             if task.status != TaskStatus.PENDING:
                 continue
-            self._apply_profile(task)
-            if task != head and not head_schedulable:
-                if not self._backfill_ok(task) and not (self._is_night() and task.priority == Priority.LOW):
-                    continue
-            assigned = False
-            for node in nodes:
-                for gpu in node.gpus:
-                    if self._node_fits(task, node, gpu):
-                        assignments.append((task.task_id, node.name, gpu.gpu_id))
-                        gpu.used_vram_gb += task.min_vram_gb
-                        task.assigned_node = node.name
-                        task.assigned_gpu = gpu.gpu_id
-                        task.start_ts = time.time()
-                        self.update_task_status(task.task_id, TaskStatus.RUNNING)
-                        assigned = True
-                        break
-                if assigned:
-                    break
+            if self._prepare(task):
+                resized.append(task)
+            if task is head or head_schedulable or (night and task.priority == Priority.LOW):
+                placement = self.find_placement(task, strategy, index)
+            elif planner is not None:
+                placement = self._backfill_placement(task, strategy, planner, index)
+            elif self._backfill_ok(task):
+                placement = self.find_placement(task, strategy, index)
+            else:
+                continue
+            attempts += 1
+            if placement is None:
+                continue
+            node, gpus = placement
+            load = self._task_intensity(task)
+            for gpu in gpus:
+                gpu.used_vram_gb += task.min_vram_gb
+                index.refresh(node.name, gpu.gpu_id)
+                index.add_tenant(node.name, gpu.gpu_id, load)
+            placements.append((task, node, gpus))
+        self.metrics.placed.inc(len(placements))
+        self.metrics.no_fit.inc(attempts - len(placements))
+        return placements, resized
+
+    @traced("scheduler.commit")
+    def _commit(self, placements: List[Placement], resized: List[Task], now: float) -> List[Tuple[int, str, int]]:
+        assignments: List[Tuple[int, str, int]] = []
+        for task in resized:
+            if task.status == TaskStatus.PENDING:
+                self.state.pending_index.add(task)
+        for task, node, gpus in placements:
+            gpu_ids = [gpu.gpu_id for gpu in gpus]
+            for gpu_id in gpu_ids:
+                assignments.append((task.task_id, node.name, gpu_id))
+            self.state.reservations[task.task_id] = (node.name, gpu_ids, task.min_vram_gb)
+            self._loads[task.task_id] = self._task_intensity(task)
+            task.assigned_node = node.name
+            task.assigned_gpu = gpu_ids[0]
+            task.assigned_gpus = gpu_ids
+            task.cpu_affinity = node.topology.cpu_affinity(gpu_ids) if node.topology else None
+            task.start_ts = now
+            self.update_task_status(task.task_id, TaskStatus.RUNNING)
+            self.events.publish(EventType.ASSIGNED, task.task_id, task.user, node.name, gpu_ids=gpu_ids)
         return assignments
 
+    @traced("scheduler.pool_pass")
+    def _pool_pass(
+        self,
+        key: Optional[str],
+        index: CapacityIndex,
+        gpu_types: Set[Optional[str]],
+        forced: bool,
+        night: bool,
+        score: Callable[[Priority, str], float],
+        now: float,
+        strategy: PlacementStrategy,
+        before: Optional[Tuple[float, Tuple[float, int, int]]] = None,
+        keep: Optional[Callable[[int], bool]] = None,
+    ) -> _PoolPass:
+        # One pool's tick. Reads shared scheduler state and places only into
+        # `index`, so disjoint typed pools can run on worker threads. Only
+        # tasks ranked ahead of `before` and accepted by `keep` are walked.
+        result = _PoolPass()
+        tasks = self.state.tasks
+        pending = self.state.pending_index
+        ordered = pending.ordered(score, gpu_types=gpu_types)
+        if before is not None:
+            ordered = takewhile(lambda task_id: pending.rank(task_id, score) < before, ordered)
+        if keep is not None:
+            ordered = filter(keep, ordered)
+        head_id = next(ordered, None)
+        if head_id is None:
+            return result
+        head = tasks[head_id]
+        if self._prepare(head):
+            result.resized.append(head)
+        head_schedulable = self.find_placement(head, index=index) is not None
+        result.head = (head_id, head_schedulable)
+        planner = None
+        if not head_schedulable and self.policy.backfill_mode != "limit":
+            planner = self._backfill_planner(head, now, index)
+            if planner.reservations:
+                first = planner.reservations[0]
+                result.reservation = (first.node, tuple(first.gpu_ids), first.start_ts)
+            forced = forced or self.policy.backfill_mode == "conservative"
+        if not forced and (result.head, result.reservation) == self._pool_marks.get(key):
+            result.skipped = True
+            return result
+        candidates = [head] + [tasks[tid] for tid in ordered]
+        placements, resized = self._place(index, candidates, head, head_schedulable, planner, night, strategy)
+        result.placements = placements
+        result.resized.extend(resized)
+        result.reservations = planner.reservations if planner is not None else []
+        return result
+
+    def _pool_executor(self) -> ThreadPoolExecutor:
+        workers = max(1, self.policy.pool_workers)
+        if self._executor is None or self._executor_workers != workers:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lab-gpu-pool")
+            self._executor_workers = workers
+        return self._executor
+
+    def _schedule_partitioned(self, night: bool, now: float, strategy: PlacementStrategy) -> List[Tuple[int, str, int]]:
+        # Each typed pool is placed independently (and concurrently) against a
+        # view of its own nodes. Untyped tasks, and typed tasks with no matching
+        # nodes, form the shared pool. Its tasks can take any GPU, so a typed
+        # pool only places the tasks that rank ahead of the shared pool's head;
+        # the rest are walked in priority order with the shared pool, against
+        # whatever is left anywhere, as the serial pass would.
+        changes = self._take_changes(night, now)
+        if changes is None:
+            return []
+        full, grown, dirty, order_dirty = changes
+        tasks = self.state.tasks
+        index = self.state.pending_index
+        strategy.begin_tick(index.min_demand())
+        scores: Dict[Tuple[Priority, str], float] = {}
+
+        def score(priority: Priority, user: str) -> float:
+            key = (priority, user)
+            if key not in scores:
+                scores[key] = self._bucket_score(priority, user, night)
+            return scores[key]
+
+        # Frozen for the tick, like the serial pass's single ordering, so the
+        # typed pools' commits don't reorder the shared pass. ordered() scores
+        # every bucket before yielding.
+        next(index.ordered(score), None)
+        pending_types = index.gpu_types()
+        typed = sorted(t for t in self.capacity.pool_types() & pending_types if t is not None)
+        untyped_nodes = None in self.capacity.pool_types()
+        shared_head = next(index.ordered(score, gpu_types=pending_types - set(typed)), None)
+        bar = None if shared_head is None else index.rank(shared_head, score)
+        moved, self._shared_bar = bar != self._shared_bar, bar
+        dirty_types = {tasks[tid].gpu_type or None for tid in dirty if tid in tasks}
+        for key in set(self._pool_marks) - set(typed) - {None}:
+            del self._pool_marks[key]
+            self._pool_reserved.pop(key, None)
+
+        def run(key: str) -> _PoolPass:
+            forced = full or moved or key in grown or key in dirty_types
+            return self._pool_pass(key, views[key], {key}, forced, night, score, now, strategy, before=bar)
+
+        keys = [key for key in typed if full or order_dirty or moved or key in grown or key in dirty_types]
+        views = {key: self.capacity.view(key) for key in keys}
+        if len(keys) > 1 and self.policy.pool_workers > 1:
+            results = list(self._pool_executor().map(run, keys))
+        else:
+            results = [run(key) for key in keys]
+
+        assignments: List[Tuple[int, str, int]] = []
+        for key, result in zip(keys, results):
+            self.capacity.absorb(views[key])
+            self._merge_pool(key, result)
+            if self.capacity.arrays is not None:
+                for _, node, gpus in result.placements:
+                    for gpu in gpus:
+                        self.capacity.refresh(node.name, gpu.gpu_id)
+            assignments.extend(self._commit(result.placements, result.resized, now))
+
+        if bar is not None or untyped_nodes:
+            # Up to the shared head the walk only meets typed tasks, which had
+            # their own pool this tick: they come back only if they might fit
+            # on an untyped node. Everything from the shared head on is new.
+            fallback_gb = self.capacity.largest_free_gb([None]) if untyped_nodes else NO_FIT
+            behind_bar = False
+
+            def keep(task_id: int) -> bool:
+                nonlocal behind_bar
+                behind_bar = behind_bar or task_id == shared_head
+                return behind_bar or tasks[task_id].min_vram_gb <= fallback_gb
+
+            forced = full or moved or bool(grown) or bool(dirty_types)
+            result = self._pool_pass(
+                None, self.capacity, pending_types, forced, night, score, now, strategy, keep=keep
+            )
+            self._merge_pool(None, result)
+            # Placements onto typed nodes move those pools' reservations.
+            for _, node, _ in result.placements:
+                if node.gpu_type is not None:
+                    self._pool_marks.pop(node.gpu_type, None)
+            assignments.extend(self._commit(result.placements, result.resized, now))
+        else:
+            self._pool_marks.pop(None, None)
+            self._pool_reserved.pop(None, None)
+        order = sorted(self._pool_reserved, key=lambda key: (key is None, key or ""))
+        self.last_reservations = [r for key in order for r in self._pool_reserved[key]]
+        return assignments
+
+    def _merge_pool(self, key: Optional[str], result: _PoolPass) -> None:
+        if result.head is None:
+            self._pool_marks.pop(key, None)
+            self._pool_reserved.pop(key, None)
+            return
+        self._pool_marks[key] = (result.head, result.reservation)
+        if not result.skipped:
+            self._pool_reserved[key] = result.reservations
+
+    @traced("scheduler.schedule")
+    def schedule(self, nodes: List[Node]) -> List[Tuple[int, str, int]]:
+        started = time.perf_counter()
+        try:
+            return self._schedule(nodes)
+        finally:
+            self.metrics.tick_seconds.observe(time.perf_counter() - started)
+
+    def _schedule(self, nodes: List[Node]) -> List[Tuple[int, str, int]]:
+        self.capacity.sync(nodes)
+        self.capacity.use_arrays(self.policy.vectorized_state)
+        self.profile_store.window = self.policy.profile_window
+        self.profile_store.sync(self.policy.profile_path)
+        strategy = self._placement_strategy()
+        now = self.clock()
+        night = self._is_night(datetime.fromtimestamp(now))
+        index = self.state.pending_index
+        if self.policy.partitioned:
+            assignments = self._schedule_partitioned(night, now, strategy)
+        else:
+            head, head_schedulable, planner, candidates = self._tick_candidates(night, now)
+            if not candidates:
+                self.last_tick = tick_stats(self.capacity, 0, len(index), index.min_demand())
+                return []
+            strategy.begin_tick(index.min_demand())
+            placements, resized = self._place(
+                self.capacity, candidates, head, head_schedulable, planner, night, strategy
+            )
+            assignments = self._commit(placements, resized, now)
+            self.last_reservations = planner.reservations if planner is not None else []
+        self._order_dirty = bool(assignments)
+        self.preemption_plan = self._plan_preemption(night, now) if self.policy.preemption else None
+        self.last_tick = tick_stats(self.capacity, len(assignments), len(index), index.min_demand())
+        return assignments
+
+    @traced("scheduler.preemption_plan")
+    def _plan_preemption(self, night: bool, now: float) -> Optional[PreemptionPlan]:
+        score = lambda priority, user: self._bucket_score(priority, user, night)
+        head_id = next(self.state.pending_index.ordered(score), None)
+        if head_id is None:
+            return None
+        head = self.state.tasks[head_id]
+        if self.find_placement(head) is not None:
+            return None
+        planner = PreemptionPlanner(self.state.tasks, self.state.reservations, self.capacity.nodes, now)
+        return planner.plan(head)
+
     def apply_oom_recovery(self, task_id: int, missing_gb: float) -> None:
         task = self.state.tasks[task_id]
-        new_min = task.min_vram_gb + missing_gb + 1.0
+        self._release(task_id)
+        self._forget_usage(task_id)
+        needed = task.min_vram_gb + missing_gb
+        new_min = needed + 1.0
+        if task.profile_key:
+            # Retry at the learned percentile instead of climbing 1 GB at a time.
+            self.profile_store.record_oom(task.profile_key, needed)
+            self._journal_profile(task.profile_key)
+            predicted = self.profile_store.predict(task.profile_key, self.policy.profile_percentile)
+            new_min = max(new_min, predicted or 0.0)
         task.min_vram_gb = round(new_min, 2)
         task.retry_count += 1
         task.status = TaskStatus.PENDING
-        if task_id not in self.state.pending_queue:
-            self.state.pending_queue.append(task_id)
+        self._sync_pending_index(task)
+        self.metrics.ooms.inc()
+        self.metrics.retries.labels("oom").inc()
+        self.events.publish(
+            EventType.OOM, task_id, task.user, missing_gb=missing_gb, min_vram_gb=task.min_vram_gb, retry_count=task.retry_count
+        )
 
     def move_to_front(self, task_id: int) -> None:
-        if task_id in self.state.pending_queue:
-            self.state.pending_queue.remove(task_id)
-        self.state.pending_queue.insert(0, task_id)
+        self.state.pending_queue.move_to_front(task_id)
+        task = self.state.tasks.get(task_id)
+        if task is not None:
+            if self.journal is not None:
+                self.journal.append({"op": "front", "id": task_id})
+            self.state.pending_index.move_to_front(task)
+            self._dirty_tasks.add(task_id)
+            self._order_dirty = True
+
+    def requeue_preempted(self, task_id: int) -> None:
+        task = self.state.tasks[task_id]
+        task.preempt_count += 1
+        node = task.assigned_node
+        self.reset_task(task_id)
+        self.metrics.retries.labels("preempted").inc()
+        self.events.publish(EventType.PREEMPTED, task_id, task.user, node, preempt_count=task.preempt_count)
 
     def reset_task(self, task_id: int) -> None:
         task = self.state.tasks[task_id]
+        self._release(task_id)
+        self._forget_usage(task_id)
         task.status = TaskStatus.PENDING
         task.assigned_node = None
         task.assigned_gpu = None
+        task.assigned_gpus = None
+        task.cpu_affinity = None
         task.start_ts = None
-        if task_id not in self.state.pending_queue:
-            self.state.pending_queue.append(task_id)
+        task.end_ts = None
+        self._sync_pending_index(task)
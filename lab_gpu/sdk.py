@@ -1,11 +1,12 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import os
 import time
 from typing import Optional
 
-from .agent import Agent
+from .agent import Agent, pin_cpus
+from .events import EventType
 from .master import Master
 from .models import GPU, Node, Priority, Task
 
@@ -19,6 +20,8 @@ class Placement:
     task_id: int
     node: str
     gpu_id: int
+    gpu_ids: list[int] = field(default_factory=list)
+    cpus: list[int] = field(default_factory=list)
 
 
 @dataclass
@@ -40,9 +43,8 @@ class LocalBackend:
             )
 
     def request_device(self, spec: dict, timeout: Optional[float]) -> Placement:
-        task_id = len(self.master.scheduler.state.tasks) + 1
         task = Task(
-            task_id=task_id,
+            task_id=0,
             user=spec.get("user", "me"),
             cmd=spec.get("cmd", ""),
             min_vram_gb=spec["min_vram_gb"],
@@ -50,21 +52,42 @@ class LocalBackend:
             env=spec.get("env"),
             gpu_type=spec.get("gpu_type"),
             time_limit_s=spec.get("time_limit"),
+            gpu_count=spec.get("gpu_count", 1),
         )
-        self.master.submit(task)
-
-        start_ts = time.time()
-        while True:
-            self.master.schedule_once()
-            task_state = self.master.scheduler.state.tasks[task_id]
-            if task_state.assigned_node is not None and task_state.assigned_gpu is not None:
-                return Placement(task_id=task_id, node=task_state.assigned_node, gpu_id=task_state.assigned_gpu)
-
-            if timeout == 0:
-                raise LabGpuTimeoutError("No available GPU for request.")
-            if timeout is not None and (time.time() - start_ts) >= timeout:
-                raise LabGpuTimeoutError("Timed out waiting for GPU allocation.")
-            time.sleep(0.1)
+        # Wake on anything that can free or add capacity instead of ticking
+        # every 100 ms; GPU telemetry is not an event, hence the 1 s fallback.
+        subscription = self.master.events.subscribe(
+            types=(EventType.ASSIGNED, EventType.FINISHED, EventType.PREEMPTED, EventType.OOM, EventType.NODE_REGISTERED),
+            maxsize=64,
+        )
+        try:
+            task, _ = self.master.submit_new(task, spec.get("idempotency_key"))
+            task_id = task.task_id
+            start_ts = time.time()
+            while True:
+                self.master.schedule_once()
+                task_state = self.master.scheduler.state.tasks[task_id]
+                if task_state.assigned_node is not None and task_state.assigned_gpu is not None:
+                    return Placement(
+                        task_id=task_id,
+                        node=task_state.assigned_node,
+                        gpu_id=task_state.assigned_gpu,
+                        gpu_ids=list(task_state.assigned_gpus or [task_state.assigned_gpu]),
+                        cpus=list(task_state.cpu_affinity or []),
+                    )
+
+                if timeout == 0:
+                    raise LabGpuTimeoutError("No available GPU for request.")
+                wait_s = 1.0
+                if timeout is not None:
+                    remaining = timeout - (time.time() - start_ts)
+                    if remaining <= 0:
+                        raise LabGpuTimeoutError("Timed out waiting for GPU allocation.")
+                    wait_s = min(wait_s, remaining)
+                subscription.get(timeout=wait_s)
+                subscription.drain()
+        finally:
+            subscription.close()
 
 
 class HttpBackend:
@@ -84,21 +107,33 @@ class Client:
         timeout: Optional[float] = None,
         gpu_type: Optional[str] = None,
         time_limit: Optional[int] = None,
+        gpus: int = 1,
+        idempotency_key: Optional[str] = None,
     ) -> Placement:
+        # A retry with the same idempotency_key waits on the original request
+        # instead of queueing a second one.
         min_vram_gb = _parse_mem_gb(mem)
         spec = {
             "min_vram_gb": min_vram_gb,
             "priority": Priority(priority),
             "gpu_type": gpu_type,
             "time_limit": time_limit,
+            "gpu_count": gpus,
+            "idempotency_key": idempotency_key,
         }
         return self.backend.request_device(spec, timeout)
 
     def acquire(self, **kwargs) -> Placement:
         placement = self.request_device(**kwargs)
-        os.environ["CUDA_VISIBLE_DEVICES"] = str(placement.gpu_id)
+        gpu_list = ",".join(str(gpu_id) for gpu_id in placement.gpu_ids or [placement.gpu_id])
+        os.environ["CUDA_VISIBLE_DEVICES"] = gpu_list
         os.environ["LABGPU_ASSIGNED_NODE"] = placement.node
         os.environ["LABGPU_ASSIGNED_GPU"] = str(placement.gpu_id)
+        os.environ["LABGPU_ASSIGNED_GPUS"] = gpu_list
+        if placement.cpus:
+            # Keep host threads (data loading, NCCL proxies) on the GPUs' NUMA node.
+            os.environ["LABGPU_CPU_AFFINITY"] = ",".join(str(cpu) for cpu in placement.cpus)
+            pin_cpus(placement.cpus)
         return placement
 
     def run(
@@ -110,9 +145,11 @@ class Client:
         timeout: Optional[float] = None,
         gpu_type: Optional[str] = None,
         time_limit: Optional[int] = None,
+        gpus: int = 1,
         env: Optional[str] = None,
         log_root: str = "/nas/logs",
         mem_used: float = 0.0,
+        idempotency_key: Optional[str] = None,
     ) -> RunResult:
         placement = self.acquire(
             mem=mem,
@@ -120,6 +157,8 @@ class Client:
             timeout=timeout,
             gpu_type=gpu_type,
             time_limit=time_limit,
+            gpus=gpus,
+            idempotency_key=idempotency_key,
         )
         agent = Agent()
         exit_code, oom = agent.run_task(
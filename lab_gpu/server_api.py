@@ -1,10 +1,18 @@
 from __future__ import annotations
 
-from fastapi import FastAPI
+import json
+from typing import Annotated, AsyncIterator, Optional
 
-from .http_models import AgentRegister, TaskSubmit
-from .master import Master
+from fastapi import FastAPI, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse, StreamingResponse
+
+from .events import EventType, Subscription
+from .http_models import AgentRegister, AgentTelemetry, TaskSubmit
+from .master import IdempotencyConflict, Master
 from .models import GPU, Node, Priority, Task
+from .store import task_dict
+from .topology import parse_topology
+from .tracing import TRACER
 
 app = FastAPI()
 _master = Master()
@@ -28,24 +36,71 @@ def register(req: AgentRegister) -> dict:
                 used_vram_gb=float(gpu.get("used_vram_gb", 0.0)),
             )
         )
-    _master.register_node(Node(name=req.node, gpus=gpu_list, gpu_type=node_gpu_type))
+    topology = parse_topology(req.topology) if req.topology else None
+    _master.register_node(Node(name=req.node, gpus=gpu_list, gpu_type=node_gpu_type, topology=topology))
     return {"ok": True}
 
 
+@app.post("/agents/telemetry")
+def telemetry(req: AgentTelemetry) -> dict:
+    updated = 0
+    for gpu in req.gpus:
+        if _master.update_gpu(req.node, gpu.id, **gpu.model_dump(exclude={"id"}, exclude_none=True)):
+            updated += 1
+    for task in req.tasks:
+        _master.observe_task_vram(task.id, task.used_vram_gb, task.util_pct)
+    return {"ok": True, "updated": updated}
+
+
 @app.post("/tasks")
-def submit(req: TaskSubmit) -> dict:
+def submit(req: TaskSubmit, idempotency_key: Annotated[Optional[str], Header()] = None) -> dict:
+    # The Idempotency-Key header wins over the body field.
     mem_gb = _parse_mem_gb(req.mem)
     task = Task(
-        task_id=len(_master.scheduler.state.tasks) + 1,
+        task_id=0,
         user="me",
         cmd=req.cmd,
         min_vram_gb=mem_gb,
         priority=Priority(req.priority),
         gpu_type=req.gpu_type,
         time_limit_s=req.time_limit,
+        gpu_count=req.gpus,
     )
-    _master.submit(task)
-    return {"ok": True, "task_id": task.task_id}
+    try:
+        task, created = _master.submit_new(task, idempotency_key or req.idempotency_key)
+    except IdempotencyConflict as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from exc
+    return {"ok": True, "task_id": task.task_id, "duplicate": not created}
+
+
+@app.get("/tasks")
+def list_tasks(
+    status: Optional[str] = None,
+    user: Optional[str] = None,
+    node: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    limit: int = Query(50, ge=1, le=1000),
+    before: Optional[int] = None,
+) -> dict:
+    tasks, cursor = _master.query_tasks(status, user, node, since, until, limit, before)
+    return {"tasks": [task_dict(task) for task in tasks], "next": cursor}
+
+
+@app.get("/usage")
+def usage(since: Optional[float] = None, until: Optional[float] = None) -> dict:
+    return _master.usage(since, until)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    return PlainTextResponse(_master.metrics_text(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/debug/trace")
+def debug_trace() -> dict:
+    # Chrome trace JSON of the span ring buffer; empty unless LABGPU_TRACE=1.
+    return TRACER.chrome_trace()
 
 
 @app.post("/schedule/tick")
@@ -57,3 +112,32 @@ def tick() -> dict:
 @app.get("/status")
 def status() -> dict:
     return _master.summary()
+
+
+async def _stream(subscription: Subscription, heartbeat_s: float) -> AsyncIterator[str]:
+    # Waits on the event loop, not a threadpool worker, so open streams don't
+    # starve the sync endpoints. Blank lines keep idle connections alive; a
+    # disconnect cancels the generator and closes the subscription.
+    try:
+        while True:
+            event = await subscription.aget(timeout=heartbeat_s)
+            if subscription.closed:
+                return
+            yield "\n" if event is None else json.dumps(event.to_dict()) + "\n"
+    finally:
+        subscription.close()
+
+
+@app.get("/events")
+def events(
+    types: Optional[str] = Query(None, description="comma-separated event types"),
+    task_id: Optional[int] = None,
+    user: Optional[str] = None,
+    node: Optional[str] = None,
+) -> StreamingResponse:
+    try:
+        kinds = [EventType(name) for name in types.split(",")] if types else None
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    subscription = _master.events.subscribe(kinds, task_id, user, node, maxsize=256)
+    return StreamingResponse(_stream(subscription, 15.0), media_type="application/x-ndjson")
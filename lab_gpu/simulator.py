@@ -0,0 +1,316 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+import heapq
+import json
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .master import Master
+from .models import GPU, Node, OOMSignal, Priority, Task, TaskStatus
+from .scheduler import Scheduler, SchedulerPolicy
+
+
+@dataclass
+class TraceNode:
+    name: str
+    gpus: int
+    vram_gb: float
+    gpu_type: Optional[str] = None
+
+
+@dataclass
+class TraceTask:
+    task_id: int
+    submit_ts: float
+    user: str
+    min_vram_gb: float
+    duration_s: float
+    priority: Priority = Priority.NORMAL
+    gpu_type: Optional[str] = None
+    gpu_count: int = 1
+    time_limit_s: Optional[int] = None
+    profile_key: Optional[str] = None
+    peak_vram_gb: Optional[float] = None
+    oom_after_s: float = 60.0
+
+
+@dataclass
+class Trace:
+    nodes: List[TraceNode]
+    tasks: List[TraceTask]
+
+
+class VirtualClock:
+    def __init__(self, now: float = 0.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def load_trace(path: str) -> Trace:
+    # JSON lines: {"event": "node", "name", "gpus", "vram", "gpu_type"} and
+    # {"event": "submit", "ts", "task_id", "user", "mem", "duration", ...}.
+    # A submit whose peak_vram_gb exceeds its request OOMs oom_after_s into
+    # every attempt that is still too small.
+    nodes: List[TraceNode] = []
+    tasks: List[TraceTask] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if entry.get("event") == "node":
+                nodes.append(
+                    TraceNode(
+                        name=entry["name"],
+                        gpus=int(entry.get("gpus", 1)),
+                        vram_gb=float(entry.get("vram", 24.0)),
+                        gpu_type=entry.get("gpu_type"),
+                    )
+                )
+            elif entry.get("event", "submit") == "submit":
+                tasks.append(
+                    TraceTask(
+                        task_id=int(entry.get("task_id", len(tasks) + 1)),
+                        submit_ts=float(entry["ts"]),
+                        user=entry.get("user", "me"),
+                        min_vram_gb=float(entry.get("mem", 0.0)),
+                        duration_s=float(entry["duration"]),
+                        priority=Priority(entry.get("priority", Priority.NORMAL)),
+                        gpu_type=entry.get("gpu_type"),
+                        gpu_count=int(entry.get("gpus", 1)),
+                        time_limit_s=entry.get("time_limit"),
+                        profile_key=entry.get("profile_key"),
+                        peak_vram_gb=entry.get("peak_vram_gb"),
+                        oom_after_s=float(entry.get("oom_after", 60.0)),
+                    )
+                )
+    tasks.sort(key=lambda task: (task.submit_ts, task.task_id))
+    return Trace(nodes=nodes, tasks=tasks)
+
+
+def synthetic_trace(
+    tasks: int = 1000,
+    nodes: int = 8,
+    gpus_per_node: int = 8,
+    users: int = 10,
+    hours: float = 24.0,
+    oom_fraction: float = 0.05,
+    seed: int = 0,
+    start_ts: float = 1_700_000_000.0,
+) -> Trace:
+    rng = random.Random(seed)
+    types = [("A100", 80.0), ("3090", 24.0), (None, 48.0)]
+    trace_nodes = []
+    for i in range(nodes):
+        gpu_type, vram = types[i % len(types)]
+        trace_nodes.append(TraceNode(name=f"sim-{i:03d}", gpus=gpus_per_node, vram_gb=vram, gpu_type=gpu_type))
+    trace_tasks = []
+    for i in range(tasks):
+        vram = rng.choice([4.0, 8.0, 12.0, 16.0, 20.0, 40.0])
+        gpu_type = rng.choice(["A100", "3090"]) if rng.random() < 0.3 else None
+        if gpu_type == "3090":
+            vram = min(vram, 20.0)
+        duration = rng.expovariate(1.0 / 3600.0) + 60.0
+        has_limit = rng.random() < 0.6
+        trace_tasks.append(
+            TraceTask(
+                task_id=i + 1,
+                submit_ts=start_ts + rng.uniform(0.0, hours * 3600.0),
+                user=f"user-{rng.randrange(users)}",
+                min_vram_gb=vram,
+                duration_s=round(duration, 1),
+                priority=rng.choice([Priority.HIGH, Priority.NORMAL, Priority.NORMAL, Priority.LOW, Priority.LOW]),
+                gpu_type=gpu_type,
+                gpu_count=2 if rng.random() < 0.05 else 1,
+                time_limit_s=int(duration * 1.5) if has_limit else None,
+                peak_vram_gb=vram + rng.choice([2.0, 6.0]) if rng.random() < oom_fraction else None,
+            )
+        )
+    trace_tasks.sort(key=lambda task: (task.submit_ts, task.task_id))
+    return Trace(nodes=trace_nodes, tasks=trace_tasks)
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def _jain(values: List[float]) -> float:
+    if not values:
+        return 1.0
+    total = sum(values)
+    squares = sum(v * v for v in values)
+    return round(total * total / (len(values) * squares), 4) if squares > 0 else 1.0
+
+
+# Each event is (ts, seq, kind, task_id, attempt); an attempt number that no
+# longer matches the task's current one marks an event made stale by an OOM
+# retry or a preemption.
+def simulate(trace: Trace, policy: SchedulerPolicy, tick_s: float = 60.0) -> dict:
+    start_wall = time.perf_counter()
+    specs = {spec.task_id: spec for spec in trace.tasks}
+    start_ts = min((spec.submit_ts for spec in trace.tasks), default=0.0)
+    clock = VirtualClock(start_ts)
+    # A replay is a what-if: it must not learn into the live profile store or
+    # write the journal, store and archive a running server uses.
+    config = replace(policy, profile_path=None, journal_path=None, store_path=None, archive_path=None)
+    master = Master(Scheduler(config, clock=clock))
+    total_gpus = 0
+    total_vram = 0.0
+    for node in trace.nodes:
+        gpus = [GPU(gpu_id=i, total_vram_gb=node.vram_gb) for i in range(node.gpus)]
+        master.register_node(Node(name=node.name, gpus=gpus, gpu_type=node.gpu_type))
+        total_gpus += node.gpus
+        total_vram += node.gpus * node.vram_gb
+
+    events: List[Tuple[float, int, str, int, int]] = []
+    seq = 0
+    for spec in trace.tasks:
+        events.append((spec.submit_ts, seq, "submit", spec.task_id, 0))
+        seq += 1
+    heapq.heapify(events)
+    attempts: Dict[int, int] = {}
+    first_start: Dict[int, float] = {}
+    finished_at: Dict[int, float] = {}
+    busy: Dict[Tuple[str, int], int] = {}
+    running: Dict[int, Tuple[List[Tuple[str, int]], float]] = {}
+    busy_gpu_s = 0.0
+    used_vram_gb_s = 0.0
+    used_vram = 0.0
+    stranded_gb_s = 0.0
+    fragmentation_s = 0.0
+    ooms = 0
+    last_ts = start_ts
+    tasks = master.scheduler.state.tasks
+
+    def stop(task_id: int) -> None:
+        nonlocal used_vram
+        slots, vram = running.pop(task_id, ([], 0.0))
+        used_vram -= vram
+        for key in slots:
+            busy[key] -= 1
+            if not busy[key]:
+                del busy[key]
+
+    def tick() -> int:
+        nonlocal seq, used_vram
+        placed: Dict[int, List[Tuple[str, int]]] = {}
+        for task_id, node_name, gpu_id in master.schedule_once():
+            placed.setdefault(task_id, []).append((node_name, gpu_id))
+        # Victims requeued by a preemption during the tick are no longer running.
+        for task_id in [tid for tid in running if tasks[tid].status != TaskStatus.RUNNING]:
+            stop(task_id)
+            attempts[task_id] += 1
+        for task_id, slots in placed.items():
+            task = tasks[task_id]
+            spec = specs[task_id]
+            attempt = attempts.get(task_id, 0) + 1
+            attempts[task_id] = attempt
+            first_start.setdefault(task_id, clock.now)
+            vram = task.min_vram_gb * len(slots)
+            running[task_id] = (slots, vram)
+            used_vram += vram
+            for key in slots:
+                busy[key] = busy.get(key, 0) + 1
+            if spec.peak_vram_gb is not None and spec.peak_vram_gb > task.min_vram_gb:
+                kind, delay = "oom", min(spec.oom_after_s, spec.duration_s)
+            else:
+                kind, delay = "finish", spec.duration_s
+            heapq.heappush(events, (clock.now + delay, seq, kind, task_id, attempt))
+            seq += 1
+        return len(placed)
+
+    # Ticks happen at every event and, while tasks wait, every tick_s so the
+    # night window and backfill deadlines move with the virtual clock. Tasks
+    # that can never be placed are reported as unfinished.
+    pending = master.scheduler.state.pending_index
+    next_tick = start_ts
+    while True:
+        due = [events[0][0]] if events else []
+        if len(pending):
+            due.append(next_tick)
+        if not due:
+            break
+        ts = max(min(due), last_ts)
+        busy_gpu_s += len(busy) * (ts - last_ts)
+        used_vram_gb_s += used_vram * (ts - last_ts)
+        stats = master.scheduler.last_tick
+        if stats is not None:
+            stranded_gb_s += stats.stranded_vram_gb * (ts - last_ts)
+            fragmentation_s += stats.fragmentation * (ts - last_ts)
+        last_ts = clock.now = ts
+        while events and events[0][0] <= ts:
+            _, _, kind, task_id, attempt = heapq.heappop(events)
+            spec = specs[task_id]
+            if kind == "submit":
+                master.submit(
+                    Task(
+                        task_id=task_id,
+                        user=spec.user,
+                        cmd=f"sim {task_id}",
+                        min_vram_gb=spec.min_vram_gb,
+                        priority=spec.priority,
+                        gpu_type=spec.gpu_type,
+                        time_limit_s=spec.time_limit_s,
+                        profile_key=spec.profile_key,
+                        gpu_count=spec.gpu_count,
+                        submit_ts=spec.submit_ts,
+                    )
+                )
+                continue
+            if attempts.get(task_id) != attempt or task_id not in running:
+                continue
+            stop(task_id)
+            if kind == "finish":
+                master.mark_succeeded(task_id)
+                finished_at[task_id] = ts
+            else:
+                ooms += 1
+                missing = spec.peak_vram_gb - tasks[task_id].min_vram_gb
+                master.on_oom(OOMSignal(task_id=task_id, missing_gb=missing, new_min_vram_gb=spec.peak_vram_gb))
+        placed = tick()
+        next_tick = ts + tick_s
+        if not events and not running and not placed:
+            break
+
+    makespan = max(last_ts - start_ts, 1e-9)
+    waits = [first_start[tid] - specs[tid].submit_ts for tid in first_start]
+    per_user: Dict[str, List[float]] = {}
+    for task_id, end in finished_at.items():
+        spec = specs[task_id]
+        slowdown = (end - spec.submit_ts) / max(spec.duration_s, 1.0)
+        per_user.setdefault(spec.user, []).append(slowdown)
+    user_slowdown = {user: sum(v) / len(v) for user, v in per_user.items()}
+    wall = time.perf_counter() - start_wall
+    return {
+        "tasks": len(specs),
+        "completed": len(finished_at),
+        "unfinished": len(specs) - len(finished_at),
+        "ooms": ooms,
+        "preemptions": master.state.preemptions,
+        "makespan_h": round(makespan / 3600.0, 3),
+        "gpu_utilisation": round(busy_gpu_s / (total_gpus * makespan), 4) if total_gpus else 0.0,
+        "vram_utilisation": round(used_vram_gb_s / (total_vram * makespan), 4) if total_vram else 0.0,
+        "stranded_vram_gb": round(stranded_gb_s / makespan, 2),
+        "fragmentation": round(fragmentation_s / makespan, 4),
+        "wait_p50_s": round(_percentile(waits, 50), 1),
+        "wait_p90_s": round(_percentile(waits, 90), 1),
+        "wait_p99_s": round(_percentile(waits, 99), 1),
+        "wait_mean_s": round(sum(waits) / len(waits), 1) if waits else 0.0,
+        "fairness_jain": _jain(list(user_slowdown.values())),
+        "max_user_slowdown": round(max(user_slowdown.values(), default=0.0), 2),
+        "wall_s": round(wall, 3),
+        "speedup": round(makespan / wall, 1) if wall > 0 else 0.0,
+    }
+
+
+def compare(trace: Trace, policies: Dict[str, SchedulerPolicy], tick_s: float = 60.0) -> Dict[str, dict]:
+    return {name: simulate(trace, policy, tick_s) for name, policy in policies.items()}
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from .journal import task_from_row, task_row
+from .models import Task
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id INTEGER PRIMARY KEY,
+    user TEXT NOT NULL,
+    status TEXT NOT NULL,
+    submit_ts REAL NOT NULL,
+    assigned_node TEXT,
+    row TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status);
+CREATE INDEX IF NOT EXISTS tasks_user ON tasks (user);
+CREATE INDEX IF NOT EXISTS tasks_submit_ts ON tasks (submit_ts);
+CREATE INDEX IF NOT EXISTS tasks_node ON tasks (assigned_node);
+CREATE TABLE IF NOT EXISTS runtimes (
+    task_id INTEGER PRIMARY KEY,
+    pid INTEGER NOT NULL,
+    log_path TEXT NOT NULL,
+    started_ts REAL NOT NULL
+);
+"""
+
+
+def task_dict(task: Task) -> dict:
+    return {
+        "id": task.task_id,
+        "user": task.user,
+        "status": task.status.value,
+        "priority": task.priority.value,
+        "cmd": task.cmd,
+        "min_vram_gb": task.min_vram_gb,
+        "gpus": task.gpu_count,
+        "gpu_type": task.gpu_type,
+        "node": task.assigned_node,
+        "gpu_ids": task.assigned_gpus,
+        "submit_ts": task.submit_ts,
+        "start_ts": task.start_ts,
+        "retry_count": task.retry_count,
+    }
+
+
+# Queryable copy of every task and runtime in SQLite (WAL mode). Writes are
+# coalesced per task and committed in one transaction by flush(); the
+# scheduler keeps working from its in-memory dicts. Pages are newest first and
+# keyed on task_id, so deep pages cost the same as the first one.
+class TaskStore:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._tasks: Dict[int, Task] = {}
+        self._runtimes: Dict[int, Optional[Tuple[int, str, float]]] = {}
+
+    def put(self, task: Task) -> None:
+        self._tasks[task.task_id] = task
+
+    def put_runtime(self, task_id: int, pid: int, log_path: str, started_ts: float) -> None:
+        self._runtimes[task_id] = (pid, log_path, started_ts)
+
+    def drop_runtime(self, task_id: int) -> None:
+        self._runtimes[task_id] = None
+
+    def flush(self) -> None:
+        with self._lock:
+            tasks, self._tasks = self._tasks, {}
+            runtimes, self._runtimes = self._runtimes, {}
+            if not tasks and not runtimes:
+                return
+            with self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO tasks (task_id, user, status, submit_ts, assigned_node, row) VALUES (?, ?, ?, ?, ?, ?)",
+                    [
+                        (t.task_id, t.user, t.status.value, t.submit_ts, t.assigned_node, json.dumps(task_row(t)))
+                        for t in tasks.values()
+                    ],
+                )
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO runtimes (task_id, pid, log_path, started_ts) VALUES (?, ?, ?, ?)",
+                    [(task_id, *runtime) for task_id, runtime in runtimes.items() if runtime is not None],
+                )
+                self._db.executemany(
+                    "DELETE FROM runtimes WHERE task_id = ?",
+                    [(task_id,) for task_id, runtime in runtimes.items() if runtime is None],
+                )
+
+    def query(
+        self,
+        status: Optional[str] = None,
+        user: Optional[str] = None,
+        node: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 50,
+        before: Optional[int] = None,
+    ) -> Tuple[List[Task], Optional[int]]:
+        # Returns one page and the cursor for the next (None on the last page).
+        self.flush()
+        clauses, params = [], []
+        for column, value in (("status", status), ("user", user), ("assigned_node", node)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append("submit_ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("submit_ts < ?")
+            params.append(until)
+        if before is not None:
+            clauses.append("task_id < ?")
+            params.append(before)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT row FROM tasks {where} ORDER BY task_id DESC LIMIT ?", (*params, limit + 1)
+            ).fetchall()
+        tasks = [task_from_row(json.loads(row)) for row, in rows[:limit]]
+        return tasks, tasks[-1].task_id if len(rows) > limit else None
+
+    def get(self, task_id: int) -> Optional[Task]:
+        self.flush()
+        with self._lock:
+            found = self._db.execute("SELECT row FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+        return task_from_row(json.loads(found[0])) if found else None
+
+    def max_task_id(self) -> int:
+        self.flush()
+        with self._lock:
+            found = self._db.execute("SELECT MAX(task_id) FROM tasks").fetchone()
+        return found[0] or 0
+
+    def runtime(self, task_id: int) -> Optional[Tuple[int, str, float]]:
+        self.flush()
+        with self._lock:
+            found = self._db.execute(
+                "SELECT pid, log_path, started_ts FROM runtimes WHERE task_id = ?", (task_id,)
+            ).fetchone()
+        return tuple(found) if found else None
+
+    def close(self) -> None:
+        self.flush()
+        self._db.close()
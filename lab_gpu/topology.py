@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from itertools import combinations
+import json
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import yaml  # type: ignore
+except Exception:  # pragma: no cover - optional dependency
+    yaml = None
+
+# Link classes as printed by `nvidia-smi topo -m`, worst to best. NV<k> means
+# k bonded NVLinks and scores 10 per link.
+LINK_SCORES = {"SYS": 1.0, "NODE": 2.0, "PHB": 3.0, "PXB": 4.0, "PIX": 5.0}
+EXACT_GPUS = 16  # nodes up to this size are searched exhaustively
+
+
+def link_score(value) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).strip().upper()
+    match = re.fullmatch(r"NV(\d+)", text)
+    if match:
+        return 10.0 * int(match.group(1))
+    if text in LINK_SCORES:
+        return LINK_SCORES[text]
+    try:
+        return float(text)
+    except ValueError:
+        raise ValueError(f"unknown link class {value!r}") from None
+
+
+def _parse_cpus(value) -> List[int]:
+    if isinstance(value, list):
+        return [int(cpu) for cpu in value]
+    cpus: List[int] = []
+    for part in str(value).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            low, high = part.split("-", 1)
+            cpus.extend(range(int(low), int(high) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+@dataclass
+class Topology:
+    links: Dict[Tuple[int, int], float] = field(default_factory=dict)
+    numa: Dict[int, int] = field(default_factory=dict)
+    cpus: Dict[int, List[int]] = field(default_factory=dict)
+
+    def link(self, a: int, b: int) -> float:
+        return self.links.get((a, b), self.links.get((b, a), 0.0))
+
+    def score(self, gpu_ids: Sequence[int]) -> Tuple[float, float]:
+        # (bottleneck link, total bandwidth): collectives run at the speed of
+        # the slowest pair, the total breaks ties.
+        pairs = [self.link(a, b) for a, b in combinations(gpu_ids, 2)]
+        if not pairs:
+            return 0.0, 0.0
+        return min(pairs), sum(pairs)
+
+    def cpu_affinity(self, gpu_ids: Sequence[int]) -> List[int]:
+        cpus = set()
+        for gpu_id in gpu_ids:
+            numa = self.numa.get(gpu_id)
+            if numa is not None:
+                cpus.update(self.cpus.get(numa, []))
+        return sorted(cpus)
+
+    def best_set(self, gpu_ids: Sequence[int], k: int) -> List[int]:
+        candidates = sorted(gpu_ids)
+        if k <= 1 or len(candidates) <= k:
+            return candidates[:k]
+        if len(candidates) <= EXACT_GPUS:
+            best = max(combinations(candidates, k), key=lambda ids: (self.score(ids), [-i for i in ids]))
+            return list(best)
+        # Greedy: seed with the best pair, then add the GPU with the best
+        # bottleneck to the chosen set.
+        pair = max(combinations(candidates, 2), key=lambda ids: (self.link(*ids), [-i for i in ids]))
+        chosen = list(pair)
+        while len(chosen) < k:
+            rest = [gpu for gpu in candidates if gpu not in chosen]
+            chosen.append(max(rest, key=lambda gpu: (min(self.link(gpu, c) for c in chosen), -gpu)))
+        return sorted(chosen)
+
+
+def parse_topology(payload: dict) -> Topology:
+    # {"gpus": [0, 1, ...], "matrix": [["X", "NV2"], ["NV2", "X"]],
+    #  "numa": {"0": 0, "1": 0} or [0, 0], "cpus": {"0": "0-15"}}
+    # Raises ValueError on a malformed payload.
+    matrix = payload.get("matrix", [])
+    gpu_ids = [int(gpu) for gpu in payload.get("gpus", range(len(matrix)))]
+    if matrix and (len(matrix) != len(gpu_ids) or any(len(row) != len(gpu_ids) for row in matrix)):
+        raise ValueError(f"topology matrix must be {len(gpu_ids)}x{len(gpu_ids)}, one row and column per GPU")
+    links: Dict[Tuple[int, int], float] = {}
+    for i, row in enumerate(matrix):
+        for j, value in enumerate(row):
+            if i != j and str(value).upper() != "X":
+                links[(gpu_ids[i], gpu_ids[j])] = link_score(value)
+    numa_value = payload.get("numa", {})
+    if isinstance(numa_value, list):
+        if len(numa_value) != len(gpu_ids):
+            raise ValueError(f"topology numa list has {len(numa_value)} entries for {len(gpu_ids)} GPUs")
+        numa = {gpu_ids[i]: int(node) for i, node in enumerate(numa_value)}
+    else:
+        numa = {int(gpu): int(node) for gpu, node in numa_value.items()}
+    cpus = {int(node): _parse_cpus(value) for node, value in payload.get("cpus", {}).items()}
+    return Topology(links=links, numa=numa, cpus=cpus)
+
+
+def load_topology_file(path: str) -> Dict[str, Topology]:
+    # A mapping of node name to topology payload, as JSON or YAML.
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read()
+    payload: Optional[dict] = None
+    if yaml is not None:
+        payload = yaml.safe_load(content)
+    else:
+        payload = json.loads(content)
+    return {str(name): parse_topology(entry) for name, entry in (payload or {}).items()}
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+from collections import deque
+import functools
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Deque, Optional, Tuple, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+# (name, start_ns, duration_ns, thread id, args)
+SpanRecord = Tuple[str, int, int, int, Optional[dict]]
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "args", "start")
+
+    def __init__(self, tracer: Tracer, name: str, args: Optional[dict]) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter_ns()
+
+    def __exit__(self, *exc) -> None:
+        self.tracer.record(self.name, self.start, time.perf_counter_ns(), self.args)
+
+
+# Span recorder for the scheduling hot path. Disabled, span() returns a shared
+# no-op context and @traced functions pay one attribute check. Enabled, spans
+# go to a ring buffer (deque appends are thread-safe) that exports as Chrome
+# trace JSON for chrome://tracing or Perfetto.
+class Tracer:
+    def __init__(self, capacity: int = 100_000) -> None:
+        self.enabled = False
+        self._spans: Deque[SpanRecord] = deque(maxlen=capacity)
+        self._origin_ns = time.perf_counter_ns()
+
+    def enable(self, capacity: Optional[int] = None) -> None:
+        if capacity is not None and capacity != self._spans.maxlen:
+            self._spans = deque(self._spans, maxlen=capacity)
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def clear(self) -> None:
+        self._spans.clear()
+
+    def __len__(self) -> int:
+        return len(self._spans)
+
+    def span(self, name: str, **args: Any):
+        if not self.enabled:
+            return _NOOP
+        return _Span(self, name, args or None)
+
+    def record(self, name: str, start_ns: int, end_ns: int, args: Optional[dict] = None) -> None:
+        self._spans.append((name, start_ns, end_ns - start_ns, threading.get_ident(), args))
+
+    def chrome_trace(self) -> dict:
+        pid = os.getpid()
+        events = []
+        for name, start_ns, duration_ns, tid, args in list(self._spans):
+            event = {
+                "name": name,
+                "ph": "X",
+                "ts": (start_ns - self._origin_ns) / 1000,
+                "dur": duration_ns / 1000,
+                "pid": pid,
+                "tid": tid,
+            }
+            if args:
+                event["args"] = args
+            events.append(event)
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export(self, path: str) -> int:
+        trace = self.chrome_trace()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(trace, f)
+        return len(trace["traceEvents"])
+
+
+TRACER = Tracer()
+if os.environ.get("LABGPU_TRACE", "") not in ("", "0"):
+    TRACER.enable(int(os.environ.get("LABGPU_TRACE_BUFFER", "100000")))
+
+
+def span(name: str, **args: Any):
+    return TRACER.span(name, **args)
+
+
+def traced(name: str) -> Callable[[F], F]:
+    def decorate(fn: F) -> F:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not TRACER.enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                TRACER.record(name, start, time.perf_counter_ns())
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorate
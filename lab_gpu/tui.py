@@ -2,12 +2,16 @@ from __future__ import annotations
 
 from textual.app import App, ComposeResult
 from textual.containers import Vertical
+from textual.message import Message
 from textual.widgets import DataTable, Footer, Header, Input, Static
 
 from .master import Master
 
 
 class LabTui(App):
+    class KillDone(Message):
+        pass
+
     CSS = """
     Screen { layout: vertical; }
     #summary { height: 3; padding: 1; }
@@ -40,7 +44,17 @@ class LabTui(App):
     def on_mount(self) -> None:
         self.table.add_columns("ID", "User", "Status", "Mem", "Node", "Cmd")
         self.refresh_view()
-        self.set_interval(2.0, self.refresh_view)
+        self.subscription = self.master.events.subscribe(maxsize=256)
+        self.run_worker(self._watch_events, thread=True, exclusive=True)
+
+    def on_unmount(self) -> None:
+        self.subscription.close()
+
+    def _watch_events(self) -> None:
+        # One redraw per burst: the whole backlog is drained before refreshing.
+        while self.subscription.get() is not None:
+            self.subscription.drain()
+            self.call_from_thread(self.refresh_view)
 
     def refresh_view(self) -> None:
         data = self.master.summary()
@@ -76,7 +90,12 @@ class LabTui(App):
         task_id = self._selected_task_id()
         if task_id is None:
             return
-        self.master.kill_task(task_id)
+        # The preemptor publishes nothing; redraw once the process is gone so
+        # the task shows as failed. post_message is safe from its thread.
+        self.master.kill_task(task_id).add_done_callback(lambda _: self.post_message(self.KillDone()))
+        self.refresh_view()
+
+    def on_lab_tui_kill_done(self, message: KillDone) -> None:
         self.refresh_view()
 
     def action_retry(self) -> None:
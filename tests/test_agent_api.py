@@ -4,3 +4,27 @@ from lab_gpu.agent_api import run
 def test_agent_run_endpoint():
     resp = run({"task_id": 1, "cmd": "python -c 'print(1)'", "mem_used": 0, "log_root": "/tmp"})
     assert "exit_code" in resp
+
+
+def test_run_task_pins_cpus_without_preexec_fn(tmp_path, monkeypatch):
+    import os
+    import subprocess
+
+    import pytest
+
+    from lab_gpu.agent import Agent
+
+    if not hasattr(os, "sched_getaffinity"):
+        pytest.skip("no CPU affinity on this platform")
+    cpu = min(os.sched_getaffinity(0))
+    real_popen = subprocess.Popen
+
+    def popen(*args, **kwargs):
+        assert kwargs.get("preexec_fn") is None
+        return real_popen(*args, **kwargs)
+
+    monkeypatch.setattr(subprocess, "Popen", popen)
+    cmd = "python -c 'import os; print(sorted(os.sched_getaffinity(0)))'"
+    exit_code, _ = Agent().run_task(1, cmd, None, 0, log_root=str(tmp_path), cpus=[cpu])
+    assert exit_code == 0
+    assert (tmp_path / "1.log").read_text().splitlines()[-1] == str([cpu])
@@ -0,0 +1,95 @@
+import os
+
+from lab_gpu.archive import TaskArchive
+from lab_gpu.master import Master
+from lab_gpu.models import GPU, Node, Priority, Task, TaskStatus
+from lab_gpu.scheduler import Scheduler, SchedulerPolicy
+from lab_gpu.simulator import VirtualClock
+
+
+def _master(tmp_path, clock):
+    master = Master(Scheduler(SchedulerPolicy(retention_hours=1.0), clock=clock))
+    master.open_archive(str(tmp_path / "archive.jsonl"))
+    master.register_node(Node(name="n", gpus=[GPU(gpu_id=i, total_vram_gb=24) for i in range(2)]))
+    return master
+
+
+def _task(task_id, user="me"):
+    return Task(task_id=task_id, user=user, cmd=f"run {task_id}", min_vram_gb=20, priority=Priority.NORMAL, submit_ts=0.0)
+
+
+def test_retention_archives_old_finished_tasks(tmp_path):
+    clock = VirtualClock(0.0)
+    master = _master(tmp_path, clock)
+    for task_id in (1, 2, 3):
+        master.submit(_task(task_id, user="alice" if task_id < 3 else "bob"))
+    master.schedule_once()
+    master.register_runtime(1, 123, "/logs/1.log")
+    clock.now = 1800.0
+    master.mark_succeeded(1)
+    master.mark_failed(2)
+    master.schedule_once()  # starts 3
+    assert set(master.scheduler.state.tasks) == {1, 2, 3}
+
+    clock.now = 1800.0 + 3601.0
+    master.schedule_once()
+    assert set(master.scheduler.state.tasks) == {3}
+    assert master.state.history == []
+    assert master.archive.count == 2
+    assert master.summary()["tasks"] == 3
+    assert master.find_task(2).status == TaskStatus.FAILED
+    assert master.log_path(1) == "/logs/1.log"
+    assert master.log_path(2) == "/nas/logs/2.log"
+    assert master.usage() == {"alice": {"tasks": 2, "failed": 1, "gpu_hours": 1.0}}
+
+    master.retry_task(2)
+    assert master.scheduler.state.tasks[2].status == TaskStatus.PENDING
+    assert master.summary()["pending"] == 1
+
+
+def test_archive_headers_skip_payloads_and_drop_torn_batches(tmp_path):
+    path = str(tmp_path / "archive.jsonl")
+    archive = TaskArchive(path)
+    archive.append([_task(i) for i in range(1, 4)], {2: "/logs/2.log"})
+    archive.append([_task(i) for i in range(10, 12)])
+    with open(path, "ab") as f:
+        f.write(b'{"min":20,"max":21,"count":2,"bytes":500}\n{"fields"')
+    reopened = TaskArchive(path)
+    assert reopened.count == 5
+    assert reopened.get(2)[1] == "/logs/2.log"
+    assert reopened.get(11)[0].task_id == 11
+    assert reopened.get(5) is None and reopened.get(20) is None
+    assert [task.task_id for task in reopened.scan()] == [1, 2, 3, 10, 11]
+    reopened.append([_task(30)])
+    assert TaskArchive(path).get(30)[0].task_id == 30
+    assert os.path.getsize(path) > 0
+
+
+def test_archived_tasks_stay_out_of_recovered_state(tmp_path):
+    clock = VirtualClock(0.0)
+    master = _master(tmp_path, clock)
+    master.open_journal(str(tmp_path / "wal"))
+    for task_id in (1, 2):
+        master.submit(_task(task_id))
+    master.schedule_once()
+    master.mark_succeeded(1)
+    clock.now = 7200.0
+    master.schedule_once()
+    master.journal.close()
+
+    recovered = Master(Scheduler(SchedulerPolicy(retention_hours=1.0), clock=clock))
+    recovered.open_journal(str(tmp_path / "wal"))
+    assert list(recovered.scheduler.state.tasks) == [2]
+
+
+def test_finish_time_of_zero_is_not_treated_as_missing(tmp_path):
+    clock = VirtualClock(0.0)
+    master = _master(tmp_path, clock)
+    task = _task(1)
+    task.submit_ts = 10_000.0
+    master.submit(task)
+    master.schedule_once()
+    master.mark_succeeded(1)
+    clock.now = 3601.0
+    master.schedule_once()
+    assert master.scheduler.state.tasks == {} and master.archive.count == 1
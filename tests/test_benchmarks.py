@@ -0,0 +1,21 @@
+import json
+
+from benchmarks.run import main
+from benchmarks.workload import WorkloadSpec, make_cluster, make_tasks
+
+
+def test_workload_generator_is_deterministic():
+    spec = WorkloadSpec(gpus=20, tasks=50, gpus_per_node=8, seed=7)
+    nodes = make_cluster(spec)
+    assert [len(n.gpus) for n in nodes] == [8, 8, 4]
+    assert make_tasks(spec) == make_tasks(spec)
+    assert {t.priority for t in make_tasks(spec)} == {"high", "normal", "low"}
+
+
+def test_benchmark_reports_json(tmp_path):
+    out = tmp_path / "bench.json"
+    assert main(["--gpus", "16", "--tasks", "100", "--ticks", "3", "--iterations", "3", "--output", str(out)]) == 0
+    report = json.loads(out.read_text())
+    for name in ("schedule", "summary", "oom_recovery"):
+        assert {"per_sec", "p50_ms", "p99_ms"} <= set(report["results"][name])
+    assert report["peak_memory_mb"] > 0
@@ -0,0 +1,38 @@
+from lab_gpu.capacity import CapacityIndex
+from lab_gpu.models import GPU, Node, Priority, Task
+
+
+def _task(mem, gpu_type=None):
+    return Task(task_id=1, user="u", cmd="run", min_vram_gb=mem, priority=Priority.NORMAL, gpu_type=gpu_type)
+
+
+def test_capacity_index_first_fit_in_registration_order():
+    nodes = [
+        Node(name="A", gpus=[GPU(gpu_id=0, total_vram_gb=24, used_vram_gb=20), GPU(gpu_id=1, total_vram_gb=24)], gpu_type="3090"),
+        Node(name="B", gpus=[GPU(gpu_id=0, total_vram_gb=80, zombie=True), GPU(gpu_id=1, total_vram_gb=80)], gpu_type="A100"),
+        Node(name="C", gpus=[GPU(gpu_id=0, total_vram_gb=48)]),
+    ]
+    index = CapacityIndex()
+    index.sync(nodes)
+
+    node, gpu = index.first_fit(_task(10))
+    assert (node.name, gpu.gpu_id) == ("A", 1)
+    node, gpu = index.first_fit(_task(30))
+    assert (node.name, gpu.gpu_id) == ("B", 1)
+    node, gpu = index.first_fit(_task(30, gpu_type="3090"))
+    assert (node.name, gpu.gpu_id) == ("C", 0)
+    assert index.first_fit(_task(90)) is None
+
+
+def test_capacity_index_refresh_tracks_telemetry():
+    nodes = [Node(name="A", gpus=[GPU(gpu_id=0, total_vram_gb=24)])]
+    index = CapacityIndex()
+    index.sync(nodes)
+
+    nodes[0].gpus[0].unmanaged_vram_gb = 20
+    index.refresh("A", 0)
+    assert index.first_fit(_task(8)) is None
+
+    nodes[0].gpus[0].unmanaged_vram_gb = 0
+    index.refresh("A", 0)
+    assert index.first_fit(_task(8)) is not None
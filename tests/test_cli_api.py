@@ -7,3 +7,13 @@ def test_cli_server_api_command():
     runner = CliRunner()
     result = runner.invoke(app, ["server", "start", "--role", "master"])
     assert result.exit_code == 0
+
+
+def test_submit_batch_rejects_non_positive_gpu_counts(tmp_path):
+    import json
+
+    batch = tmp_path / "batch.json"
+    batch.write_text(json.dumps([{"cmd": "train", "mem": "4G", "gpus": 0}]))
+    result = CliRunner().invoke(app, ["submit-batch", "--file", str(batch)])
+    assert result.exit_code != 0
+    assert "'gpus' must be a positive integer" in result.output
@@ -0,0 +1,40 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from lab_gpu.cluster_array import ClusterArrays
+from lab_gpu.master import Master
+from lab_gpu.models import GPU, Node, Priority, Task
+
+
+def _nodes():
+    return [
+        Node(name="A", gpus=[GPU(gpu_id=0, total_vram_gb=24, used_vram_gb=20), GPU(gpu_id=1, total_vram_gb=24)], gpu_type="3090"),
+        Node(name="B", gpus=[GPU(gpu_id=0, total_vram_gb=80, zombie=True), GPU(gpu_id=1, total_vram_gb=80)], gpu_type="A100"),
+        Node(name="C", gpus=[GPU(gpu_id=0, total_vram_gb=48, unmanaged_vram_gb=8)]),
+    ]
+
+
+def test_cluster_arrays_columns_and_stranded_vram():
+    arrays = ClusterArrays(_nodes())
+    assert arrays.free_vram().tolist() == [4, 24, 80, 80, 40]
+    assert arrays.gpu_type.tolist() == [1, 1, 2, 2, 0]
+    assert arrays.stranded_gb(30) == 28
+
+
+def test_vectorized_state_stays_in_sync():
+    master = Master()
+    master.scheduler.policy.vectorized_state = True
+    for node in _nodes():
+        master.register_node(node)
+    master.submit(Task(task_id=1, user="me", cmd="run", min_vram_gb=30, priority=Priority.NORMAL))
+    assert master.schedule_once() == [(1, "B", 1)]
+
+    capacity = master.scheduler.capacity
+    arrays = capacity.arrays
+    assert arrays.used.tolist() == [20, 0, 0, 30, 0]
+    assert capacity.stranded_gb(48) == 28 + 40
+    master.mark_succeeded(1)
+    assert arrays.used.tolist() == [20, 0, 0, 0, 0]
+    capacity.use_arrays(False)
+    assert capacity.stranded_gb(48) == 28 + 40
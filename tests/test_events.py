@@ -0,0 +1,96 @@
+import asyncio
+import threading
+import time
+
+from lab_gpu.events import EventBus, EventType
+from lab_gpu.master import Master
+from lab_gpu.models import GPU, Node, OOMSignal, Priority, Task
+
+
+def test_subscriptions_filter_and_drop_oldest_when_full():
+    bus = EventBus()
+    assert bus.publish(EventType.SUBMITTED, 1) is None
+    everything = bus.subscribe(maxsize=2)
+    only_task_2 = bus.subscribe(types=[EventType.ASSIGNED], task_id=2)
+    for task_id in (1, 2, 3):
+        bus.publish(EventType.ASSIGNED, task_id, node="n")
+    assert [e.task_id for e in everything.drain()] == [2, 3] and everything.dropped == 1
+    assert only_task_2.get(timeout=0).task_id == 2
+    assert only_task_2.get(timeout=0) is None
+    only_task_2.close()
+    everything.close()
+    assert not bus.active and only_task_2.get() is None
+
+
+def test_blocking_subscription_holds_back_the_publisher():
+    bus = EventBus(block_timeout_s=5)
+    subscription = bus.subscribe(maxsize=1, block=True)
+    bus.publish(EventType.SUBMITTED, 1)
+    published = threading.Event()
+    threading.Thread(target=lambda: (bus.publish(EventType.SUBMITTED, 2), published.set())).start()
+    assert not published.wait(0.1)
+    assert subscription.get().task_id == 1
+    assert published.wait(1)
+    assert subscription.get().task_id == 2 and subscription.dropped == 0
+
+
+def test_master_publishes_task_lifecycle(tmp_path):
+    master = Master()
+    subscription = master.events.subscribe()
+    master.register_node(Node(name="n", gpus=[GPU(gpu_id=0, total_vram_gb=24)]))
+    master.submit(Task(task_id=1, user="me", cmd="run", min_vram_gb=10, priority=Priority.NORMAL))
+    master.schedule_once()
+    master.register_runtime(1, 4242, str(tmp_path / "1.log"))
+    master.on_oom(OOMSignal(task_id=1, missing_gb=2.0, new_min_vram_gb=13.0))
+    master.schedule_once()
+    master.mark_succeeded(1)
+    events = subscription.drain()
+    assert [e.type for e in events] == [
+        EventType.NODE_REGISTERED,
+        EventType.SUBMITTED,
+        EventType.ASSIGNED,
+        EventType.STARTED,
+        EventType.OOM,
+        EventType.ASSIGNED,
+        EventType.FINISHED,
+    ]
+    assert events[2].to_dict()["gpu_ids"] == [0] and events[2].node == "n"
+    assert events[4].data["min_vram_gb"] == 13.0
+    assert events[-1].data["status"] == "succeeded"
+    assert [e.seq for e in events] == sorted(e.seq for e in events)
+
+
+def test_event_stream_waits_on_the_loop_and_closes_on_cancel():
+    from lab_gpu.server_api import _stream
+
+    bus = EventBus()
+    subscription = bus.subscribe()
+
+    async def consume():
+        stream = _stream(subscription, 5.0)
+        threading.Timer(0.05, bus.publish, args=(EventType.SUBMITTED, 7)).start()
+        line = await asyncio.wait_for(stream.__anext__(), 2)
+        pending = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0.05)
+        pending.cancel()
+        try:
+            await pending
+        except asyncio.CancelledError:
+            pass
+        return line
+
+    assert '"task_id": 7' in asyncio.run(consume())
+    assert subscription.closed and not bus.active
+
+
+def test_local_backend_wakes_when_capacity_frees():
+    from lab_gpu.sdk import LocalBackend
+
+    backend = LocalBackend()
+    first = backend.request_device({"min_vram_gb": 20, "priority": Priority.NORMAL}, timeout=0)
+    threading.Timer(0.2, backend.master.mark_succeeded, args=(first.task_id,)).start()
+    started = time.monotonic()
+    second = backend.request_device({"min_vram_gb": 20, "priority": Priority.NORMAL}, timeout=5)
+    assert second.task_id != first.task_id
+    assert time.monotonic() - started < 0.9
+    assert not backend.master.events.active
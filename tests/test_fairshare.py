@@ -0,0 +1,65 @@
+import time
+
+import pytest
+
+from lab_gpu.fairshare import FairShare
+from lab_gpu.models import Priority, Task, TaskStatus
+from lab_gpu.policy import load_policy
+from lab_gpu.scheduler import Scheduler, SchedulerPolicy
+
+
+def test_usage_decays_with_half_life():
+    shares = FairShare(half_life_s=100.0)
+    shares.start(1, "a", charge=2.0, now=0.0)
+    shares.stop(1, now=10.0)
+    used = shares.usage("a", 10.0)
+    assert used == pytest.approx(2.0 * 100.0 / 0.6931471805599453 * (1 - 0.5 ** 0.1))
+    assert shares.usage("a", 110.0) == pytest.approx(used / 2)
+
+
+def test_heavy_user_ranks_below_newcomer():
+    scheduler = Scheduler(SchedulerPolicy(fair_share_weight=1.0, fair_share_half_life_s=3600.0))
+    now = time.time()
+    scheduler.fair_share.start(99, "heavy", charge=FairShare.charge(8, 80), now=now - 7200.0)
+    scheduler.fair_share.stop(99, now=now)
+    heavy = Task(task_id=1, user="heavy", cmd="run", min_vram_gb=4, priority=Priority.NORMAL, submit_ts=1.0)
+    fresh = Task(task_id=2, user="fresh", cmd="run", min_vram_gb=4, priority=Priority.NORMAL, submit_ts=2.0)
+    scheduler.submit(heavy)
+    scheduler.submit(fresh)
+
+    scheduler.schedule([])
+    assert [t.task_id for t in scheduler._ordered_pending()] == [2, 1]
+    assert scheduler._fair_share_score(heavy) < scheduler._fair_share_score(fresh)
+
+
+def test_running_tasks_accrue_usage():
+    scheduler = Scheduler()
+    scheduler.submit(Task(task_id=1, user="a", cmd="run", min_vram_gb=10, priority=Priority.NORMAL))
+    scheduler.update_task_status(1, TaskStatus.RUNNING)
+    assert scheduler.fair_share.users["a"].rate == 10.0
+    scheduler.update_task_status(1, TaskStatus.SUCCEEDED)
+    assert scheduler.fair_share.users["a"].rate == 0.0
+
+
+def test_every_exit_from_running_releases_the_active_slot():
+    scheduler = Scheduler()
+    for task_id in (1, 2, 3):
+        scheduler.submit(Task(task_id=task_id, user="a", cmd="run", min_vram_gb=10, priority=Priority.NORMAL))
+        scheduler.update_task_status(task_id, TaskStatus.RUNNING)
+    scheduler.update_task_status(1, TaskStatus.RUNNING)
+    assert scheduler.state.active_counts["a"] == 3
+    scheduler.requeue_preempted(1)
+    scheduler.apply_oom_recovery(2, 4.0)
+    scheduler.reset_task(3)
+    assert scheduler.state.active_counts["a"] == 0
+    assert scheduler.fair_share.users["a"].rate == 0.0
+    scheduler.update_task_status(1, TaskStatus.FAILED)
+    assert scheduler.state.active_counts["a"] == 0
+
+
+def test_policy_parses_fair_share_targets(tmp_path):
+    path = tmp_path / "policy.yaml"
+    path.write_text("fair_share_weight: 0.5\nfair_share_targets: alice=2,bob=1\n")
+    config = load_policy(str(path))
+    assert config.fair_share_weight == 0.5
+    assert config.fair_share_targets == {"alice": 2.0, "bob": 1.0}
@@ -1,6 +1,29 @@
-from lab_gpu.http_models import AgentRegister, TaskSubmit
+import pytest
+from pydantic import ValidationError
+
+from lab_gpu.http_models import AgentRegister, AgentTelemetry, TaskSubmit
 
 
 def test_http_models_validate():
     AgentRegister(node="node-1", gpus=[{"id": 0, "total_vram_gb": 24.0, "type": "3090"}])
     TaskSubmit(cmd="python train.py", mem="10G", priority="normal")
+
+
+@pytest.mark.parametrize("gpus", [0, -2])
+def test_task_submit_rejects_non_positive_gpu_counts(gpus):
+    with pytest.raises(ValidationError):
+        TaskSubmit(cmd="python train.py", mem="10G", gpus=gpus)
+
+
+def test_agent_telemetry_requires_ids_and_numeric_readings():
+    report = AgentTelemetry(node="n", gpus=[{"id": "0", "util_pct": 55}], tasks=[{"id": 3, "used_vram_gb": 18.5}])
+    assert report.gpus[0].id == 0 and report.gpus[0].used_vram_gb is None
+    assert report.tasks[0].util_pct is None
+    for bad in (
+        {"gpus": [{"used_vram_gb": 4.0}]},
+        {"gpus": [{"id": 0, "util_pct": "busy"}]},
+        {"gpus": [], "tasks": [{"id": 3}]},
+        {"gpus": [], "tasks": [{"used_vram_gb": 1.0}]},
+    ):
+        with pytest.raises(ValidationError):
+            AgentTelemetry(node="n", **bad)
@@ -1,4 +1,5 @@
 from lab_gpu.http_models import AgentRegister, TaskSubmit
+from lab_gpu.models import Priority, Task
 from lab_gpu.server_api import register, submit, tick
 
 
@@ -9,3 +10,147 @@ def test_master_register_and_submit():
     assert resp["ok"] is True
     resp = tick()
     assert "assignments" in resp
+
+
+def test_summary_counters_follow_transitions():
+    from lab_gpu.master import Master
+    from lab_gpu.models import GPU, Node, OOMSignal, Priority, Task
+
+    master = Master()
+    master.register_node(Node(name="n", gpus=[GPU(gpu_id=0, total_vram_gb=24), GPU(gpu_id=1, total_vram_gb=24, used_vram_gb=2)]))
+    for task_id in range(1, 9):
+        master.submit(Task(task_id=task_id, user="me" if task_id % 2 else "bob", cmd=f"run {task_id}", min_vram_gb=10, priority=Priority.NORMAL))
+    master.schedule_once()
+    summary = master.summary()
+    assert (summary["tasks"], summary["pending"], summary["running"]) == (8, 4, 4)
+    assert summary["busy"] == 2 and summary["total"] == 2
+    assert summary["my_running"] == 2
+    assert [t["id"] for t in summary["recent"]] == [4, 5, 6, 7, 8]
+
+    master.mark_succeeded(1)
+    master.mark_failed(2)
+    master.on_oom(OOMSignal(task_id=3, missing_gb=1.0, new_min_vram_gb=11.0))
+    summary = master.summary()
+    assert (summary["pending"], summary["running"], summary["failed"]) == (5, 1, 1)
+    assert summary["my_running"] == 0
+    assert [t["id"] for t in summary["running_tasks"]] == [4]
+    master.mark_succeeded(4)
+    master.update_gpu("n", 1, used_vram_gb=0.0)
+    assert master.summary()["busy"] == 0
+
+
+def test_list_tasks_endpoint_paginates():
+    from lab_gpu.server_api import list_tasks
+
+    for _ in range(3):
+        submit(TaskSubmit(cmd="python eval.py", mem="1G"))
+    page = list_tasks(status="pending", limit=2)
+    assert len(page["tasks"]) == 2 and page["next"] == page["tasks"][-1]["id"]
+    rest = list_tasks(status="pending", limit=1000, before=page["next"])
+    assert all(task["id"] < page["next"] for task in rest["tasks"])
+
+
+def _new(cmd="run", user="me"):
+    from lab_gpu.models import Priority, Task
+
+    return Task(task_id=0, user=user, cmd=cmd, min_vram_gb=1, priority=Priority.NORMAL)
+
+
+def test_concurrent_submissions_get_unique_ids():
+    import threading
+
+    from lab_gpu.master import Master
+    from lab_gpu.models import GPU, Node
+
+    master = Master()
+    master.register_node(Node(name="n", gpus=[GPU(gpu_id=i, total_vram_gb=24) for i in range(4)]))
+    master.submit(Task(task_id=7, user="me", cmd="seed", min_vram_gb=1, priority=Priority.NORMAL))
+    ids = []
+    stop = threading.Event()
+
+    def client(n):
+        ids.extend(master.submit_new(_new(f"job {n}.{i}"))[0].task_id for i in range(300))
+
+    def ticker():
+        while not stop.is_set():
+            master.schedule_once()
+            master.summary()
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(8)]
+    tick_thread = threading.Thread(target=ticker)
+    tick_thread.start()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stop.set()
+    tick_thread.join()
+    assert sorted(ids) == list(range(8, 8 + 8 * 300))
+    assert master.summary()["tasks"] == 1 + 8 * 300
+
+
+def test_idempotency_keys_return_the_original_task():
+    import pytest
+
+    from lab_gpu.master import IdempotencyConflict, Master
+    from lab_gpu.scheduler import Scheduler, SchedulerPolicy
+    from lab_gpu.simulator import VirtualClock
+
+    clock = VirtualClock(0.0)
+    master = Master(Scheduler(SchedulerPolicy(idempotency_ttl_hours=1.0), clock=clock))
+    first, created = master.submit_new(_new("train"), idempotency_key="abc")
+    again, created_again = master.submit_new(_new("train"), idempotency_key="abc")
+    assert created and not created_again and again is first
+    with pytest.raises(IdempotencyConflict):
+        master.submit_new(_new("eval"), idempotency_key="abc")
+    clock.now = 3601.0
+    later, created = master.submit_new(_new("train"), idempotency_key="abc")
+    assert created and later.task_id == first.task_id + 1
+
+
+def test_ids_and_keys_survive_recovery_and_archival(tmp_path):
+    from lab_gpu.master import Master
+    from lab_gpu.models import GPU, Node
+    from lab_gpu.scheduler import Scheduler, SchedulerPolicy
+    from lab_gpu.simulator import VirtualClock
+
+    clock = VirtualClock(1.0)
+    master = Master(Scheduler(SchedulerPolicy(retention_hours=1.0), clock=clock))
+    master.open_journal(str(tmp_path / "wal"))
+    master.open_archive(str(tmp_path / "archive.jsonl"))
+    master.register_node(Node(name="n", gpus=[GPU(gpu_id=0, total_vram_gb=24)]))
+    for i in range(3):
+        master.submit_new(_new(f"job {i}"), idempotency_key=f"k{i}")
+    for task_id in (1, 2, 3):
+        master.schedule_once()
+        master.mark_succeeded(task_id)
+    clock.now = 7200.0
+    master.schedule_once()
+    assert master.scheduler.state.tasks == {}
+    assert master.submit_new(_new("job 3"))[0].task_id == 4
+    master.journal.close()
+
+    recovered = Master(Scheduler(clock=clock))
+    recovered.open_journal(str(tmp_path / "wal"))
+    recovered.open_archive(str(tmp_path / "archive.jsonl"))
+    assert recovered.next_task_id == 5
+    original, created = recovered.submit_new(_new("job 1"), idempotency_key="k1")
+    assert not created and original.task_id == 2
+
+
+def test_submit_many_rejects_conflicting_keys_before_queueing():
+    import pytest
+
+    from lab_gpu.master import IdempotencyConflict, Master
+
+    master = Master()
+    master.submit_new(_new("train"), idempotency_key="a")
+    for batch, keys in (
+        ([_new("eval"), _new("other")], [None, "a"]),
+        ([_new("x"), _new("y")], ["b", "b"]),
+    ):
+        with pytest.raises(IdempotencyConflict):
+            master.submit_many(batch, keys)
+        assert master.summary()["tasks"] == 1 and master.next_task_id == 2
+    results = master.submit_many([_new("train"), _new("z"), _new("z")], ["a", "c", "c"])
+    assert [(task.task_id, created) for task, created in results] == [(1, False), (2, True), (2, False)]
@@ -0,0 +1,38 @@
+from lab_gpu.master import Master
+from lab_gpu.metrics import Registry
+from lab_gpu.models import GPU, Node, OOMSignal, Priority, Task
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    latency = registry.histogram("tick_seconds", "Tick time.", [0.1, 1.0])
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value)
+    hits = registry.counter("hits_total", "Hits.", ("path",))
+    hits.labels('a"b').inc(2)
+    text = registry.render()
+    assert 'tick_seconds_bucket{le="0.1"} 2' in text
+    assert 'tick_seconds_bucket{le="1"} 3' in text
+    assert 'tick_seconds_bucket{le="+Inf"} 4' in text
+    assert "tick_seconds_sum 3.65" in text and "tick_seconds_count 4" in text
+    assert 'hits_total{path="a\\"b"} 2' in text
+
+
+def test_master_exposes_scheduler_metrics():
+    master = Master()
+    master.register_node(Node(name="n", gpus=[GPU(gpu_id=0, total_vram_gb=24)], gpu_type="a100"))
+    master.submit(Task(task_id=1, user="u", cmd="run", min_vram_gb=20, priority=Priority.NORMAL))
+    master.submit(Task(task_id=2, user="u", cmd="run", min_vram_gb=20, priority=Priority.HIGH, gpu_type="a100"))
+    master.schedule_once()
+    master.on_oom(OOMSignal(task_id=2, missing_gb=1.0, new_min_vram_gb=22.0))
+    master.preempt_async(1)
+    text = master.metrics_text()
+    assert "labgpu_scheduler_tick_seconds_count 1" in text
+    assert 'labgpu_placement_attempts_total{result="placed"} 1' in text
+    assert 'labgpu_placement_attempts_total{result="no_fit"} 1' in text
+    assert 'labgpu_queue_depth{priority="high",gpu_type="a100"} 1' in text
+    assert 'labgpu_task_retries_total{reason="oom"} 1' in text and "labgpu_oom_total 1" in text
+    assert 'labgpu_preemptions_total{result="not-running"} 1' in text
+    assert 'labgpu_node_free_vram_gb{node="n"} 24' in text
+    assert "labgpu_stranded_vram_gb 4" in text and "labgpu_vram_fragmentation 0" in text
+    assert master.summary()["last_tick"]["assignments"] == 1
@@ -0,0 +1,102 @@
+import pytest
+
+from lab_gpu.models import GPU, Node, Priority, Task, TaskStatus
+from lab_gpu.scheduler import Scheduler, SchedulerPolicy, TaskProfile
+
+
+def _nodes():
+    return [
+        Node(name="A", gpus=[GPU(gpu_id=0, total_vram_gb=24, used_vram_gb=10)]),
+        Node(name="B", gpus=[GPU(gpu_id=0, total_vram_gb=48)]),
+        Node(name="C", gpus=[GPU(gpu_id=0, total_vram_gb=24, used_vram_gb=12)]),
+    ]
+
+
+@pytest.mark.parametrize(
+    "placement,node",
+    [("first-fit", "A"), ("best-fit", "C"), ("worst-fit", "B"), ("packing", "B")],
+)
+def test_placement_strategies(placement, node):
+    scheduler = Scheduler(SchedulerPolicy(placement=placement))
+    scheduler.submit(Task(task_id=1, user="a", cmd="run", min_vram_gb=8, priority=Priority.HIGH))
+    scheduler.submit(Task(task_id=2, user="b", cmd="run", min_vram_gb=30, priority=Priority.LOW))
+    assignments = scheduler.schedule(_nodes())
+    assert assignments[0] == (1, node, 0)
+
+
+def test_tick_reports_fragmentation():
+    scheduler = Scheduler(SchedulerPolicy(placement="best-fit"))
+    scheduler.submit(Task(task_id=1, user="a", cmd="run", min_vram_gb=8, priority=Priority.NORMAL))
+    scheduler.submit(Task(task_id=2, user="b", cmd="run", min_vram_gb=60, priority=Priority.NORMAL))
+    scheduler.schedule(_nodes())
+
+    stats = scheduler.last_tick
+    assert stats.assignments == 1
+    assert stats.pending == 1
+    assert stats.free_vram_gb == 66
+    assert stats.largest_free_gb == 48
+    assert stats.stranded_vram_gb == 66
+    assert stats.fragmentation == round(1 - 48 / 66, 4)
+
+    # A tick with nothing to place still refreshes the stats.
+    nodes = scheduler.capacity.nodes
+    scheduler.update_gpu("B", 0, unmanaged_vram_gb=40)
+    assert scheduler.schedule(nodes) == []
+    assert scheduler.last_tick.free_vram_gb == 26
+    assert scheduler.last_tick.largest_free_gb == 14
+
+
+def test_unknown_placement_rejected():
+    scheduler = Scheduler(SchedulerPolicy(placement="random"))
+    scheduler.submit(Task(task_id=1, user="a", cmd="run", min_vram_gb=8, priority=Priority.NORMAL))
+    with pytest.raises(ValueError):
+        scheduler.schedule(_nodes())
+
+
+def _two_gpu_node():
+    return [Node(name="n", gpus=[GPU(gpu_id=0, total_vram_gb=80), GPU(gpu_id=1, total_vram_gb=80)])]
+
+
+def _task(task_id, mem=10, profile_key=None):
+    return Task(task_id=task_id, user="u", cmd="run", min_vram_gb=mem, priority=Priority.NORMAL, profile_key=profile_key)
+
+
+def test_colocate_spreads_compute_and_caps_tenants():
+    scheduler = Scheduler(SchedulerPolicy(placement="co-locate", colocate_max_tenants=2, colocate_default_util=40))
+    nodes = _two_gpu_node()
+    for task_id in range(1, 6):
+        scheduler.submit(_task(task_id))
+    assignments = scheduler.schedule(nodes)
+    assert [gpu for _, _, gpu in assignments] == [0, 1, 0, 1]
+    assert scheduler.capacity.tenants("n", 0) == (2, 80.0)
+
+    scheduler.update_task_status(1, TaskStatus.SUCCEEDED)
+    assert scheduler.capacity.tenants("n", 0) == (1, 40.0)
+    assert scheduler.schedule(nodes) == [(5, "n", 0)]
+
+
+def test_colocate_keeps_heavy_tasks_apart_using_profile_and_telemetry():
+    scheduler = Scheduler(SchedulerPolicy(placement="co-locate", colocate_max_tenants=4))
+    scheduler.profiles["heavy"] = TaskProfile(peak_vram_gb=10, util_pct=90.0)
+    scheduler.profiles["light"] = TaskProfile(peak_vram_gb=10, util_pct=5.0)
+    nodes = _two_gpu_node()
+    scheduler.capacity.sync(nodes)
+    scheduler.update_gpu("n", 1, util_pct=60.0)
+    for task_id, key in [(1, "heavy"), (2, "heavy"), (3, "heavy"), (4, "light")]:
+        scheduler.submit(_task(task_id, profile_key=key))
+    # Task 3 would push either GPU past 100% once both hold a heavy tenant.
+    assert scheduler.schedule(nodes) == [(1, "n", 0), (2, "n", 1), (4, "n", 0)]
+
+    scheduler.update_task_status(2, TaskStatus.SUCCEEDED)
+    assert scheduler.schedule(nodes) == [(3, "n", 1)]
+
+
+def test_observed_utilisation_feeds_profile_intensity():
+    scheduler = Scheduler()
+    scheduler.submit(_task(1, profile_key="job"))
+    scheduler.update_task_status(1, TaskStatus.RUNNING)
+    scheduler.observe_task_vram(1, 8.0, util_pct=30.0)
+    scheduler.observe_task_vram(1, 9.0, util_pct=50.0)
+    scheduler.update_task_status(1, TaskStatus.SUCCEEDED)
+    assert scheduler.profiles["job"].util_pct == 40.0
+    assert scheduler._task_intensity(_task(2, profile_key="job")) == 40.0
@@ -0,0 +1,226 @@
+import subprocess
+import sys
+import time
+
+from lab_gpu.master import Master
+from lab_gpu.models import GPU, Node, Priority, Task, TaskStatus
+from lab_gpu.preemption import PreemptionPlanner, _cheapest_cover, victim_cost
+from lab_gpu.preemptor import Preemptor, TimerWheel
+from lab_gpu.scheduler import Scheduler, SchedulerPolicy
+
+
+def _running(task_id, priority, vram, start_ts, retry=0):
+    return Task(
+        task_id=task_id,
+        user="u",
+        cmd="run",
+        min_vram_gb=vram,
+        priority=priority,
+        status=TaskStatus.RUNNING,
+        start_ts=start_ts,
+        retry_count=retry,
+    )
+
+
+def test_cheapest_cover_prefers_fewer_expensive_victims_only_when_cheaper():
+    candidates = [(1.0, 10.0, 1), (1.0, 10.0, 2), (1.5, 20.0, 3)]
+    assert _cheapest_cover(candidates, 15.0) == (1.5, [3])
+    assert _cheapest_cover(candidates, 5.0) == (1.0, [1])
+    assert _cheapest_cover(candidates, 50.0) is None
+
+
+def test_victim_cost_grows_with_runtime_priority_and_retries():
+    now = 10_000.0
+    fresh = _running(1, Priority.LOW, 8, start_ts=now - 60)
+    old = _running(2, Priority.LOW, 8, start_ts=now - 7200)
+    normal = _running(3, Priority.NORMAL, 8, start_ts=now - 60)
+    retried = _running(4, Priority.LOW, 8, start_ts=now - 60, retry=2)
+    assert victim_cost(fresh, now) < victim_cost(old, now)
+    assert victim_cost(fresh, now) < victim_cost(normal, now)
+    assert victim_cost(fresh, now) < victim_cost(retried, now)
+
+
+def test_planner_only_targets_lower_priority_tasks():
+    now = 10_000.0
+    tasks = {
+        1: _running(1, Priority.LOW, 16, start_ts=now - 7200),
+        2: _running(2, Priority.LOW, 16, start_ts=now - 60),
+        3: _running(3, Priority.HIGH, 16, start_ts=now - 60),
+    }
+    nodes = [
+        Node(name="a", gpus=[GPU(gpu_id=0, total_vram_gb=24, used_vram_gb=16)]),
+        Node(name="b", gpus=[GPU(gpu_id=0, total_vram_gb=24, used_vram_gb=16)]),
+        Node(name="c", gpus=[GPU(gpu_id=0, total_vram_gb=24, used_vram_gb=16)]),
+    ]
+    running = {1: ("a", [0], 16.0), 2: ("b", [0], 16.0), 3: ("c", [0], 16.0)}
+    head = Task(task_id=9, user="v", cmd="run", min_vram_gb=20, priority=Priority.HIGH)
+
+    plan = PreemptionPlanner(tasks, running, nodes, now).plan(head)
+    assert plan is not None
+    assert (plan.node, plan.gpu_ids, plan.victims) == ("b", [0], [2])
+
+
+def test_master_preempts_and_requeues_victims():
+    master = Master(Scheduler(SchedulerPolicy(preemption=True)))
+    master.register_node(Node(name="n", gpus=[GPU(gpu_id=0, total_vram_gb=24)]))
+    master.submit(Task(task_id=1, user="low", cmd="run", min_vram_gb=16, priority=Priority.LOW))
+    assert master.schedule_once() == [(1, "n", 0)]
+
+    master.submit(Task(task_id=2, user="high", cmd="run", min_vram_gb=20, priority=Priority.HIGH))
+    assert master.schedule_once() == [(2, "n", 0)]
+    victim = master.scheduler.state.tasks[1]
+    assert victim.status == TaskStatus.PENDING
+    assert victim.preempt_count == 1
+    assert master.summary()["preemptions"] == 1
+    assert master.scheduler.state.active_counts == {"low": 0, "high": 1}
+
+
+def test_preemption_is_off_by_default():
+    master = Master()
+    master.register_node(Node(name="n", gpus=[GPU(gpu_id=0, total_vram_gb=24)]))
+    master.submit(Task(task_id=1, user="low", cmd="run", min_vram_gb=16, priority=Priority.LOW))
+    master.schedule_once()
+    master.submit(Task(task_id=2, user="high", cmd="run", min_vram_gb=20, priority=Priority.HIGH))
+    assert master.schedule_once() == []
+    assert master.scheduler.preemption_plan is None
+
+
+def test_timer_wheel_fires_due_timers_and_skips_cancelled():
+    wheel = TimerWheel(tick_s=1.0, slots=4, now=0.0)
+    fired = []
+    wheel.schedule(2, lambda: fired.append("a"))
+    wheel.schedule(9, lambda: fired.append("far"))
+    wheel.cancel(wheel.schedule(3, lambda: fired.append("cancelled")))
+    wheel.advance(5.0)
+    assert fired == ["a"] and wheel.active == 1
+    wheel.advance(9.0)
+    assert fired == ["a", "far"] and wheel.active == 0
+
+
+def test_idle_wheel_does_not_replay_missed_ticks():
+    wheel = TimerWheel(tick_s=0.1, slots=512, now=0.0)
+    fired = []
+    wheel.schedule(300, lambda: fired.append("soft"), now=1000.0)
+    wheel.advance(1000.0)
+    wheel.advance(1299.0)
+    assert fired == []
+    wheel.advance(1300.0)
+    assert fired == ["soft"]
+
+
+def test_preemptor_times_escalations_from_the_current_clock(tmp_path):
+    now = [0.0]
+    preemptor = Preemptor(tick_s=0.05, clock=lambda: now[0])
+    warmup = subprocess.Popen(["sleep", "60"])
+    assert preemptor.start(1, warmup.pid, str(tmp_path / "1.log"), 300, 30).wait(5) == "soft-exit"
+    warmup.wait(5)
+
+    now[0] += 600.0  # the preemptor sat idle
+    proc = _stubborn_process()
+    handle = preemptor.start(2, proc.pid, str(tmp_path / "2.log"), 300, 30)
+    assert handle.wait(0.3) is None and handle.state == "soft"
+    proc.kill()
+    assert handle.wait(5) == "soft-exit"
+    proc.wait(5)
+
+
+def _stubborn_process():
+    # Ignores SIGUSR1 and SIGTERM, so only SIGKILL ends it.
+    proc = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            "import signal, time\n"
+            "signal.signal(signal.SIGUSR1, signal.SIG_IGN)\n"
+            "signal.signal(signal.SIGTERM, signal.SIG_IGN)\n"
+            "print('ready', flush=True)\n"
+            "time.sleep(60)\n",
+        ],
+        stdout=subprocess.PIPE,
+    )
+    assert proc.stdout.readline() == b"ready\n"
+    return proc
+
+
+def test_preemptions_run_concurrently_without_blocking(tmp_path):
+    master = Master()
+    master.register_node(Node(name="n", gpus=[GPU(gpu_id=0, total_vram_gb=24)]))
+    procs = {}
+    for task_id in range(1, 4):
+        master.submit(Task(task_id=task_id, user="u", cmd="run", min_vram_gb=1, priority=Priority.LOW))
+    master.schedule_once()
+    for task_id in range(1, 4):
+        procs[task_id] = _stubborn_process() if task_id < 3 else subprocess.Popen(["sleep", "60"])
+        master.register_runtime(task_id, procs[task_id].pid, str(tmp_path / f"{task_id}.log"))
+
+    started = time.monotonic()
+    handles = {task_id: master.preempt_async(task_id, soft_timeout_s=0.3, term_timeout_s=0.3) for task_id in procs}
+    assert time.monotonic() - started < 0.2
+    assert master.preempt_async(1) is handles[1]
+    assert handles[3].wait(5) == "soft-exit"
+    assert handles[1].wait(5) == "killed" and handles[2].wait(5) == "killed"
+    assert time.monotonic() - started < 2.0
+    for proc in procs.values():
+        proc.wait(5)
+    assert "Preemption requested" in (tmp_path / "1.log").read_text()
+    assert master.reap_preemptions() == 3
+    assert master.state.runtimes == {}
+
+
+def test_victims_are_requeued_once_their_process_exits(tmp_path):
+    master = Master(Scheduler(SchedulerPolicy(preemption=True, preempt_soft_timeout_s=0.2, preempt_term_timeout_s=0.2)))
+    master.register_node(Node(name="n", gpus=[GPU(gpu_id=0, total_vram_gb=24)]))
+    master.submit(Task(task_id=1, user="low", cmd="run", min_vram_gb=16, priority=Priority.LOW))
+    master.schedule_once()
+    proc = _stubborn_process()
+    master.register_runtime(1, proc.pid, str(tmp_path / "1.log"))
+
+    master.submit(Task(task_id=2, user="high", cmd="run", min_vram_gb=20, priority=Priority.HIGH))
+    assert master.schedule_once() == []
+    assert master.scheduler.state.tasks[1].status == TaskStatus.RUNNING
+    assert master.schedule_once() == []  # no second round of signals
+    master._preempting[1][0].wait(5)
+    proc.wait(5)
+    assert master.schedule_once() == [(2, "n", 0)]
+    assert master.scheduler.state.tasks[1].preempt_count == 1
+    assert master.summary()["preemptions"] == 1
+
+
+def test_kill_marks_failed_after_exit(tmp_path):
+    master = Master()
+    master.register_node(Node(name="n", gpus=[GPU(gpu_id=0, total_vram_gb=24)]))
+    master.submit(Task(task_id=1, user="u", cmd="run", min_vram_gb=1, priority=Priority.NORMAL))
+    master.schedule_once()
+    proc = subprocess.Popen(["sleep", "60"])
+    master.register_runtime(1, proc.pid, str(tmp_path / "1.log"))
+    handle = master.kill_task(1)
+    assert handle.wait(5) == "soft-exit"
+    proc.wait(5)
+    assert master.summary()["failed"] == 1
+
+
+def test_preemptor_polls_without_pidfd(monkeypatch, tmp_path):
+    monkeypatch.delattr("os.pidfd_open", raising=False)
+    proc = subprocess.Popen(["sleep", "60"])
+    handle = Preemptor(tick_s=0.05).start(1, proc.pid, str(tmp_path / "1.log"), 30, 30)
+    assert handle.wait(5) == "soft-exit"
+    proc.wait(5)
+
+
+def test_signal_errors_fail_the_handle_and_keep_the_thread(tmp_path):
+    master = Master()
+    master.register_node(Node(name="n", gpus=[GPU(gpu_id=0, total_vram_gb=24)]))
+    for task_id in (1, 2):
+        master.submit(Task(task_id=task_id, user="u", cmd="run", min_vram_gb=1, priority=Priority.LOW))
+    master.schedule_once()
+    proc = subprocess.Popen(["sleep", "60"])
+    master.register_runtime(1, proc.pid, str(tmp_path / "missing" / "1.log"))
+    master.register_runtime(2, proc.pid, str(tmp_path / "2.log"))
+
+    assert master.preempt_task(1, soft_timeout_s=1, term_timeout_s=1).startswith("error (FileNotFoundError")
+    assert master.preemptor._thread.is_alive()
+    assert 1 not in master._preempting and 1 in master.state.runtimes
+    assert master.scheduler.state.tasks[1].status == TaskStatus.RUNNING
+
+    assert master.preempt_task(2, soft_timeout_s=1, term_timeout_s=1) == "soft-exit"
+    proc.wait(5)
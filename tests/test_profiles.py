@@ -0,0 +1,64 @@
+from lab_gpu.models import Priority, Task, TaskStatus
+from lab_gpu.profiles import ProfileStore, percentile
+from lab_gpu.scheduler import Scheduler, SchedulerPolicy
+
+
+def _task(task_id: int, mem: float = 0.0) -> Task:
+    return Task(task_id=task_id, user="u", cmd="train", min_vram_gb=mem, priority=Priority.NORMAL, profile_key="u:train")
+
+
+def test_percentile_is_nearest_rank():
+    samples = [float(x) for x in range(1, 21)]
+    assert percentile(samples, 50) == 10.0
+    assert percentile(samples, 95) == 19.0
+    assert percentile(samples, 100) == 20.0
+
+
+def test_store_keeps_a_bounded_window():
+    store = ProfileStore(window=3)
+    for gb in (10, 11, 12, 30):
+        store.record_success("k", gb)
+    profile = store.profiles["k"]
+    assert profile.samples == [11, 12, 30]
+    assert profile.peak_vram_gb == 30
+    assert profile.success_count == 4
+
+
+def test_oom_retry_jumps_to_learned_percentile():
+    scheduler = Scheduler(SchedulerPolicy(profile_percentile=90))
+    for gb in (18, 19, 20, 21, 22, 23, 24, 25, 26, 30):
+        scheduler.profile_store.record_success("u:train", gb)
+    scheduler.submit(_task(1, mem=8))
+    scheduler.update_task_status(1, TaskStatus.RUNNING)
+    scheduler.apply_oom_recovery(1, 2.0)
+    task = scheduler.state.tasks[1]
+    assert task.min_vram_gb == 26
+    assert scheduler.profiles["u:train"].oom_count == 1
+
+
+def test_telemetry_peak_feeds_profile_on_success():
+    scheduler = Scheduler()
+    scheduler.submit(_task(1, mem=4))
+    scheduler.update_task_status(1, TaskStatus.RUNNING)
+    scheduler.observe_task_vram(1, 9.5)
+    scheduler.observe_task_vram(1, 7.0)
+    scheduler.update_task_status(1, TaskStatus.SUCCEEDED)
+    assert scheduler.profiles["u:train"].samples == [9.5]
+
+    scheduler.submit(_task(2))
+    scheduler._apply_profile(scheduler.state.tasks[2])
+    assert scheduler.state.tasks[2].min_vram_gb == 9.5
+
+
+def test_profiles_persist_across_restarts(tmp_path):
+    path = str(tmp_path / "profiles.json")
+    scheduler = Scheduler(SchedulerPolicy(profile_path=path))
+    scheduler.schedule([])
+    scheduler.profile_store.record_oom("u:train", 12.0)
+    scheduler.schedule([])
+
+    restarted = Scheduler(SchedulerPolicy(profile_path=path))
+    restarted.schedule([])
+    profile = restarted.profiles["u:train"]
+    assert profile.samples == [12.0]
+    assert profile.oom_count == 1
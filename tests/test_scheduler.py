@@ -1,7 +1,9 @@
+import pytest
+
 from lab_gpu.agent import Agent, ProcessSample
 from lab_gpu.master import Master
-from lab_gpu.models import GPU, Node, Priority, Task, TaskStatus
-from lab_gpu.scheduler import Scheduler, TaskProfile
+from lab_gpu.models import GPU, Node, OOMSignal, Priority, Task, TaskStatus
+from lab_gpu.scheduler import Scheduler, SchedulerPolicy, TaskProfile
 
 
 def test_scheduler_backfilling():
@@ -83,3 +85,251 @@ def test_profile_recommended_vram_used_when_missing():
     assignments = scheduler.schedule([node_a, node_b])
     assert assignments == [(1, "B", 0)]
     assert scheduler.state.tasks[1].min_vram_gb >= 20
+
+
+def test_pending_index_orders_like_full_sort():
+    scheduler = Scheduler()
+    priorities = [Priority.HIGH, Priority.NORMAL, Priority.LOW]
+    for i in range(60):
+        task = Task(
+            task_id=i + 1,
+            user=f"user_{i % 4}",
+            cmd="run",
+            min_vram_gb=4,
+            priority=priorities[i % 3],
+            submit_ts=1000.0 + (i * 7) % 11,
+        )
+        scheduler.submit(task)
+    for task_id in (3, 10, 17):
+        scheduler.update_task_status(task_id, TaskStatus.RUNNING)
+    scheduler.move_to_front(40)
+    scheduler.apply_oom_recovery(10, 1.0)
+    scheduler.update_task_status(25, TaskStatus.FAILED)
+
+    pending = [t for t in scheduler.state.tasks.values() if t.status == TaskStatus.PENDING]
+    expected = sorted(
+        pending,
+        key=lambda t: (-scheduler._fair_share_score(t), t.submit_ts, t.task_id != 40, t.task_id),
+    )
+    assert [t.task_id for t in scheduler._ordered_pending()] == [t.task_id for t in expected]
+
+
+def test_pending_index_drops_assigned_tasks():
+    scheduler = Scheduler()
+    scheduler.submit(Task(task_id=1, user="a", cmd="run", min_vram_gb=4, priority=Priority.NORMAL))
+    scheduler.submit(Task(task_id=2, user="a", cmd="run", min_vram_gb=40, priority=Priority.NORMAL))
+    node = Node(name="N", gpus=[GPU(gpu_id=0, total_vram_gb=16)])
+
+    assert scheduler.schedule([node]) == [(1, "N", 0)]
+    assert 1 not in scheduler.state.pending_index
+    assert [t.task_id for t in scheduler._ordered_pending()] == [2]
+
+    scheduler.reset_task(1)
+    assert [t.task_id for t in scheduler._ordered_pending()] == [1, 2]
+
+
+def test_finished_task_releases_vram():
+    master = Master()
+    master.register_node(Node(name="A", gpus=[GPU(gpu_id=0, total_vram_gb=24)]))
+    master.submit(Task(task_id=1, user="a", cmd="run", min_vram_gb=16, priority=Priority.NORMAL))
+    master.submit(Task(task_id=2, user="b", cmd="run", min_vram_gb=16, priority=Priority.NORMAL))
+
+    assert master.schedule_once() == [(1, "A", 0)]
+    assert master.schedule_once() == []
+    master.mark_succeeded(1)
+    assert master.state.nodes["A"].gpus[0].used_vram_gb == 0
+    assert master.schedule_once() == [(2, "A", 0)]
+
+    assert master.update_gpu("A", 0, unmanaged_vram_gb=10)
+    master.on_oom(OOMSignal(task_id=2, missing_gb=1.0, new_min_vram_gb=17))
+    assert master.schedule_once() == []
+
+
+def test_idle_tick_skips_ordering(monkeypatch):
+    scheduler = Scheduler()
+    scheduler.submit(Task(task_id=1, user="a", cmd="run", min_vram_gb=40, priority=Priority.NORMAL))
+    nodes = [Node(name="A", gpus=[GPU(gpu_id=0, total_vram_gb=24)])]
+    assert scheduler.schedule(nodes) == []
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("idle tick walked the queue")
+
+    monkeypatch.setattr(scheduler.state.pending_index, "ordered", _fail)
+    assert scheduler.schedule(nodes) == []
+
+
+@pytest.mark.parametrize(
+    "partitioned,backfill_mode,seed,steps",
+    [(False, "limit", 3, 60), (True, "limit", 3, 60), (False, "easy", 131, 160), (True, "easy", 131, 160)],
+)
+def test_dirty_tracking_matches_full_pass(partitioned, backfill_mode, seed, steps):
+    import random
+
+    rng = random.Random(seed)
+    clock = [1000.0]
+
+    def build():
+        scheduler = Scheduler(
+            SchedulerPolicy(partitioned=partitioned, backfill_mode=backfill_mode), clock=lambda: clock[0]
+        )
+        nodes = [
+            Node(name=f"n{i}", gpus=[GPU(gpu_id=j, total_vram_gb=24) for j in range(2)], gpu_type=t)
+            for i, t in enumerate(["A100", "3090", None, "A100"])
+        ]
+        return scheduler, nodes
+
+    incremental, inc_nodes = build()
+    reference, ref_nodes = build()
+    next_id = 1
+    for _ in range(steps):
+        action = rng.random()
+        if action < 0.5:
+            fields = dict(
+                user=rng.choice("abc"),
+                cmd="run",
+                min_vram_gb=rng.choice([4, 8, 16, 30]),
+                priority=rng.choice(list(Priority)),
+                gpu_type=rng.choice([None, "A100", "3090"]),
+                time_limit_s=rng.choice([None, 600, 3000]),
+                submit_ts=float(next_id),
+            )
+            incremental.submit(Task(task_id=next_id, **fields))
+            reference.submit(Task(task_id=next_id, **fields))
+            next_id += 1
+        elif action < 0.8:
+            running = sorted(t.task_id for t in reference.state.tasks.values() if t.status == TaskStatus.RUNNING)
+            if running:
+                task_id = rng.choice(running)
+                incremental.update_task_status(task_id, TaskStatus.SUCCEEDED)
+                reference.update_task_status(task_id, TaskStatus.SUCCEEDED)
+        if backfill_mode != "limit":
+            clock[0] += rng.choice([0, 50, 400])
+        reference.capacity._grown = None
+        reference._order_dirty = True
+        assert incremental.schedule(inc_nodes) == reference.schedule(ref_nodes)
+
+
+def test_gang_task_placed_on_single_node():
+    scheduler = Scheduler()
+    scheduler.submit(Task(task_id=1, user="a", cmd="train", min_vram_gb=20, priority=Priority.HIGH, gpu_count=4))
+    nodes = [
+        Node(name="A", gpus=[GPU(gpu_id=i, total_vram_gb=24, used_vram_gb=10 if i == 0 else 0) for i in range(4)]),
+        Node(name="B", gpus=[GPU(gpu_id=i, total_vram_gb=24) for i in range(8)]),
+    ]
+
+    assert scheduler.schedule(nodes) == [(1, "B", 0), (1, "B", 1), (1, "B", 2), (1, "B", 3)]
+    task = scheduler.state.tasks[1]
+    assert task.assigned_gpus == [0, 1, 2, 3]
+    assert [gpu.used_vram_gb for gpu in nodes[1].gpus[:5]] == [20, 20, 20, 20, 0]
+
+    scheduler.update_task_status(1, TaskStatus.SUCCEEDED)
+    assert all(gpu.used_vram_gb == 0 for gpu in nodes[1].gpus)
+
+
+def _blocked_head_cluster(mode):
+    import time as _time
+
+    scheduler = Scheduler(SchedulerPolicy(backfill_mode=mode))
+    nodes = [
+        Node(name="A", gpus=[GPU(gpu_id=0, total_vram_gb=24)]),
+        Node(name="B", gpus=[GPU(gpu_id=0, total_vram_gb=24)]),
+    ]
+    scheduler.submit(Task(task_id=1, user="r", cmd="run", min_vram_gb=16, priority=Priority.HIGH, time_limit_s=1000))
+    scheduler.submit(Task(task_id=2, user="r", cmd="run", min_vram_gb=20, priority=Priority.HIGH))
+    assert scheduler.schedule(nodes) == [(1, "A", 0), (2, "B", 0)]
+    scheduler.state.tasks[1].start_ts = _time.time() - 100
+
+    scheduler.submit(Task(task_id=10, user="h", cmd="big", min_vram_gb=20, priority=Priority.HIGH))
+    scheduler.submit(Task(task_id=11, user="s", cmd="short", min_vram_gb=8, priority=Priority.NORMAL, time_limit_s=600))
+    scheduler.submit(Task(task_id=12, user="s", cmd="long", min_vram_gb=8, priority=Priority.NORMAL, time_limit_s=3000))
+    scheduler.submit(Task(task_id=13, user="s", cmd="open", min_vram_gb=4, priority=Priority.NORMAL))
+    return scheduler, nodes
+
+
+def test_easy_backfill_respects_head_reservation():
+    scheduler, nodes = _blocked_head_cluster("easy")
+    assert scheduler.schedule(nodes) == [(11, "A", 0), (13, "B", 0)]
+    reservation = scheduler.last_reservations[0]
+    assert (reservation.task_id, reservation.node, reservation.gpu_ids) == (10, "A", [0])
+
+    legacy, legacy_nodes = _blocked_head_cluster("limit")
+    assert legacy.schedule(legacy_nodes) == [(11, "A", 0)]
+
+    conservative, conservative_nodes = _blocked_head_cluster("conservative")
+    assert conservative.schedule(conservative_nodes) == [(11, "A", 0), (13, "B", 0)]
+
+
+def test_pending_queue_evicts_tasks_that_leave_pending():
+    scheduler = Scheduler()
+    for task_id in (1, 2, 3):
+        scheduler.submit(Task(task_id=task_id, user="u", cmd="run", min_vram_gb=4, priority=Priority.NORMAL))
+    scheduler.update_task_status(2, TaskStatus.RUNNING)
+    assert list(scheduler.state.pending_queue) == [1, 3]
+
+    scheduler.move_to_front(3)
+    scheduler.move_to_front(2)
+    assert list(scheduler.state.pending_queue) == [3, 1]
+
+    scheduler.apply_oom_recovery(2, 1.0)
+    scheduler.update_task_status(1, TaskStatus.SUCCEEDED)
+    assert list(scheduler.state.pending_queue) == [3, 2]
+    assert 1 not in scheduler.state.pending_queue
+
+
+def test_partitioned_pools_stay_on_their_own_nodes():
+    scheduler = Scheduler(SchedulerPolicy(partitioned=True))
+    nodes = [
+        Node(name="a100", gpus=[GPU(gpu_id=0, total_vram_gb=80)], gpu_type="A100"),
+        Node(name="3090", gpus=[GPU(gpu_id=0, total_vram_gb=24)], gpu_type="3090"),
+        Node(name="plain", gpus=[GPU(gpu_id=0, total_vram_gb=48)]),
+    ]
+    scheduler.submit(Task(task_id=1, user="a", cmd="run", min_vram_gb=40, priority=Priority.HIGH, gpu_type="A100"))
+    scheduler.submit(Task(task_id=2, user="a", cmd="run", min_vram_gb=40, priority=Priority.HIGH, gpu_type="A100"))
+    scheduler.submit(Task(task_id=3, user="b", cmd="run", min_vram_gb=20, priority=Priority.NORMAL, gpu_type="3090"))
+    scheduler.submit(Task(task_id=4, user="c", cmd="run", min_vram_gb=30, priority=Priority.LOW))
+    scheduler.submit(Task(task_id=5, user="c", cmd="run", min_vram_gb=10, priority=Priority.LOW, gpu_type="H100"))
+
+    assignments = scheduler.schedule(nodes)
+    assert assignments == [(3, "3090", 0), (1, "a100", 0), (2, "a100", 0), (4, "plain", 0), (5, "plain", 0)]
+    assert scheduler.capacity.total_free_gb == pytest.approx(12.0)
+
+
+def test_partitioned_typed_tasks_fall_back_to_untyped_nodes():
+    scheduler = Scheduler(SchedulerPolicy(partitioned=True))
+    nodes = [
+        Node(name="a", gpus=[GPU(gpu_id=0, total_vram_gb=80, used_vram_gb=80)], gpu_type="A100"),
+        Node(name="u", gpus=[GPU(gpu_id=0, total_vram_gb=48)]),
+    ]
+    scheduler.submit(Task(task_id=1, user="a", cmd="run", min_vram_gb=40, priority=Priority.HIGH, gpu_type="A100"))
+    assert scheduler.schedule(nodes) == [(1, "u", 0)]
+
+
+@pytest.mark.parametrize("partitioned", [False, True])
+def test_partitioned_keeps_priority_order_across_pools(partitioned):
+    scheduler = Scheduler(SchedulerPolicy(partitioned=partitioned))
+    nodes = [
+        Node(name="a", gpus=[GPU(gpu_id=0, total_vram_gb=80)], gpu_type="A100"),
+        Node(name="b", gpus=[GPU(gpu_id=0, total_vram_gb=24)], gpu_type="3090"),
+        Node(name="u", gpus=[GPU(gpu_id=0, total_vram_gb=24)]),
+    ]
+    scheduler.submit(Task(task_id=1, user="a", cmd="run", min_vram_gb=60, priority=Priority.HIGH))
+    scheduler.submit(Task(task_id=2, user="b", cmd="run", min_vram_gb=60, priority=Priority.LOW, gpu_type="A100"))
+    scheduler.submit(Task(task_id=3, user="c", cmd="run", min_vram_gb=20, priority=Priority.HIGH, gpu_type="3090"))
+    scheduler.submit(Task(task_id=4, user="d", cmd="run", min_vram_gb=20, priority=Priority.NORMAL, gpu_type="A100"))
+    assert sorted(scheduler.schedule(nodes)) == [(1, "a", 0), (3, "b", 0), (4, "a", 0)]
+    assert scheduler.state.tasks[2].status == TaskStatus.PENDING
+
+
+def test_partitioned_merge_is_deterministic():
+    from benchmarks.workload import WorkloadSpec, make_cluster, make_tasks
+
+    spec = WorkloadSpec(gpus=96, tasks=600, seed=5)
+    results = []
+    for workers in (1, 4):
+        scheduler = Scheduler(SchedulerPolicy(partitioned=True, pool_workers=workers))
+        nodes = make_cluster(spec)
+        for task in make_tasks(spec):
+            scheduler.submit(task)
+        results.append([scheduler.schedule(nodes) for _ in range(3)])
+    assert results[0] == results[1]
+    assert results[0][0]
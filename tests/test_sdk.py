@@ -31,3 +31,24 @@ def test_run_returns_exit_code():
     client = Client()
     result = client.run(cmd="python -c 'import sys; sys.exit(2)'", mem="1G", log_root="/tmp")
     assert result.exit_code == 2
+
+
+def test_acquire_exports_all_gang_gpus():
+    from lab_gpu.master import Master
+    from lab_gpu.models import GPU, Node
+    from lab_gpu.sdk import LocalBackend
+
+    master = Master()
+    master.register_node(Node(name="box", gpus=[GPU(gpu_id=i, total_vram_gb=24) for i in range(4)]))
+    client = Client(LocalBackend(master))
+    placement = client.acquire(mem="8G", gpus=2, timeout=0)
+    assert placement.gpu_ids == [0, 1]
+    assert os.environ.get("CUDA_VISIBLE_DEVICES") == "0,1"
+
+
+def test_request_device_retries_with_idempotency_key():
+    client = Client()
+    first = client.request_device(mem="1G", timeout=0, idempotency_key="job-7")
+    again = client.request_device(mem="1G", timeout=0, idempotency_key="job-7")
+    assert again.task_id == first.task_id
+    assert client.request_device(mem="1G", timeout=0).task_id != first.task_id
@@ -0,0 +1,79 @@
+import json
+from datetime import datetime
+
+from lab_gpu.scheduler import Scheduler, SchedulerPolicy
+from lab_gpu.simulator import VirtualClock, compare, load_trace, simulate, synthetic_trace
+
+
+def _write_trace(path, entries):
+    path.write_text("\n".join(json.dumps(entry) for entry in entries) + "\n")
+    return str(path)
+
+
+def test_scheduler_uses_injected_clock():
+    noon = datetime(2024, 1, 1, 12, 0).timestamp()
+    clock = VirtualClock(noon)
+    scheduler = Scheduler(clock=clock)
+    assert not scheduler._is_night()
+    clock.now = datetime(2024, 1, 2, 3, 0).timestamp()
+    assert scheduler._is_night()
+
+
+def test_replay_serial_queue(tmp_path):
+    path = _write_trace(
+        tmp_path / "trace.jsonl",
+        [
+            {"event": "node", "name": "n", "gpus": 1, "vram": 24},
+            {"event": "submit", "ts": 0, "task_id": 1, "user": "a", "mem": 20, "duration": 100},
+            {"event": "submit", "ts": 10, "task_id": 2, "user": "b", "mem": 20, "duration": 50},
+        ],
+    )
+    result = simulate(load_trace(path), SchedulerPolicy(backfill_time_limit_s=0), tick_s=5)
+    assert result["completed"] == 2
+    assert result["makespan_h"] == round(150 / 3600, 3)
+    assert result["wait_p99_s"] == 90.0
+    assert result["gpu_utilisation"] == 1.0
+    assert result["stranded_vram_gb"] == round(4 * 90 / 150, 2)
+
+
+def test_oom_retry_is_replayed(tmp_path):
+    path = _write_trace(
+        tmp_path / "trace.jsonl",
+        [
+            {"event": "node", "name": "n", "gpus": 1, "vram": 24},
+            {"event": "submit", "ts": 0, "task_id": 1, "user": "a", "mem": 8, "duration": 600, "peak_vram_gb": 12, "oom_after": 30},
+        ],
+    )
+    result = simulate(load_trace(path), SchedulerPolicy(), tick_s=5)
+    assert result["ooms"] == 1
+    assert result["completed"] == 1
+    assert result["makespan_h"] == round(630 / 3600, 3)
+
+
+
+def test_replay_leaves_the_live_profile_store_untouched(tmp_path):
+    profiles = tmp_path / "profiles.json"
+    profiles.write_text("{}\n")
+    path = _write_trace(
+        tmp_path / "trace.jsonl",
+        [
+            {"event": "node", "name": "n", "gpus": 1, "vram": 24},
+            {"event": "submit", "ts": 0, "task_id": 1, "user": "a", "mem": 8, "duration": 600, "peak_vram_gb": 12, "oom_after": 30, "profile_key": "train"},
+        ],
+    )
+    policy = SchedulerPolicy(profile_path=str(profiles))
+    assert simulate(load_trace(path), policy, tick_s=5)["ooms"] == 1
+    assert profiles.read_text() == "{}\n"
+    assert policy.profile_path == str(profiles)
+
+
+def test_compare_reports_every_policy():
+    trace = synthetic_trace(tasks=200, nodes=2, hours=2, seed=1)
+    results = compare(trace, {"limit": SchedulerPolicy(), "easy": SchedulerPolicy(backfill_mode="easy")})
+    assert set(results) == {"limit", "easy"}
+    for metrics in results.values():
+        assert metrics["tasks"] == 200
+        assert 0.0 < metrics["gpu_utilisation"] <= 1.0
+        assert 0.0 < metrics["fairness_jain"] <= 1.0
+        assert metrics["wait_p50_s"] <= metrics["wait_p90_s"] <= metrics["wait_p99_s"]
+        assert metrics["stranded_vram_gb"] >= 0.0 and 0.0 <= metrics["fragmentation"] < 1.0
@@ -0,0 +1,73 @@
+from lab_gpu.master import Master
+from lab_gpu.models import GPU, Node, Priority, Task, TaskStatus
+from lab_gpu.store import TaskStore
+
+
+def _submit(master, count):
+    for task_id in range(1, count + 1):
+        master.submit(
+            Task(
+                task_id=task_id,
+                user="alice" if task_id % 2 else "bob",
+                cmd=f"run {task_id}",
+                min_vram_gb=10,
+                priority=Priority.NORMAL,
+                submit_ts=1000.0 + task_id,
+            )
+        )
+
+
+def test_store_pages_match_in_memory_queries(tmp_path):
+    plain = Master()
+    stored = Master()
+    stored.open_store(str(tmp_path / "tasks.db"))
+    for master in (plain, stored):
+        master.register_node(Node(name="n", gpus=[GPU(gpu_id=0, total_vram_gb=40)]))
+        _submit(master, 25)
+        master.schedule_once()
+        master.mark_succeeded(1)
+
+    for filters in ({}, {"user": "bob"}, {"status": "pending"}, {"node": "n"}, {"since": 1010.0, "until": 1020.0}):
+        pages = {}
+        for name, master in (("plain", plain), ("stored", stored)):
+            ids, cursor = [], None
+            while True:
+                page, cursor = master.query_tasks(limit=4, before=cursor, **filters)
+                ids.append([task.task_id for task in page])
+                if cursor is None:
+                    break
+            pages[name] = ids
+        assert pages["plain"] == pages["stored"], filters
+    first, cursor = stored.query_tasks(limit=3)
+    assert [task.task_id for task in first] == [25, 24, 23] and cursor == 23
+    assert [task.task_id for task in stored.query_tasks(status="succeeded")[0]] == [1]
+
+
+def test_in_memory_pages_follow_task_ids_not_insertion_order():
+    master = Master()
+    for task_id in (2, 5, 1, 4, 3):
+        master.submit(Task(task_id=task_id, user="u", cmd="run", min_vram_gb=1, priority=Priority.NORMAL))
+    pages, cursor = [], None
+    while True:
+        page, cursor = master.query_tasks(limit=2, before=cursor)
+        pages.append([task.task_id for task in page])
+        if cursor is None:
+            break
+    assert pages == [[5, 4], [3, 2], [1]]
+
+
+def test_store_batches_writes_until_flush(tmp_path):
+    path = str(tmp_path / "tasks.db")
+    master = Master()
+    master.open_store(path)
+    _submit(master, 3)
+    master.register_runtime(2, 99, "/tmp/2.log")
+    reader = TaskStore(path)
+    assert reader.query()[0] == []
+    master.flush()
+    task = reader.get(2)
+    assert task.status == TaskStatus.PENDING and task.submit_ts == 1002.0
+    assert reader.runtime(2)[:2] == (99, "/tmp/2.log")
+    master.clear_runtime(2)
+    master.flush()
+    assert reader.runtime(2) is None
@@ -0,0 +1,89 @@
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from lab_gpu.http_models import AgentRegister
+from lab_gpu.master import Master
+from lab_gpu.models import GPU, Node, Priority, Task
+from lab_gpu.scheduler import Scheduler, SchedulerPolicy
+from lab_gpu.topology import link_score, load_topology_file, parse_topology
+
+# Two NVLink pairs (0-1, 2-3) on different NUMA nodes, PCIe/SYS in between.
+DGX_LIKE = {
+    "gpus": [0, 1, 2, 3],
+    "matrix": [
+        ["X", "NV4", "SYS", "SYS"],
+        ["NV4", "X", "SYS", "SYS"],
+        ["SYS", "SYS", "X", "NV4"],
+        ["SYS", "SYS", "NV4", "X"],
+    ],
+    "numa": [0, 0, 1, 1],
+    "cpus": {"0": "0-3", "1": "4-7"},
+}
+
+
+def _gang(task_id, gpus=2, vram=10):
+    return Task(task_id=task_id, user="u", cmd="train", min_vram_gb=vram, priority=Priority.NORMAL, gpu_count=gpus)
+
+
+def test_parse_topology_scores_links_and_numa_cpus():
+    topology = parse_topology(DGX_LIKE)
+    assert link_score("NV4") == 40.0 and link_score("PIX") > link_score("SYS")
+    assert topology.link(0, 1) == topology.link(1, 0) == 40.0
+    assert topology.score([0, 1]) > topology.score([1, 2])
+    assert topology.best_set([0, 1, 2, 3], 2) == [0, 1]
+    assert topology.best_set([1, 2, 3], 2) == [2, 3]
+    assert topology.cpu_affinity([2, 3]) == [4, 5, 6, 7]
+
+
+def test_topology_aware_gang_prefers_nvlink_pair_and_sets_affinity(tmp_path):
+    path = tmp_path / "topology.json"
+    path.write_text(json.dumps({"box": DGX_LIKE}))
+    master = Master(Scheduler(SchedulerPolicy(topology_aware=True)))
+    master.load_topology(str(path))
+    master.register_node(Node(name="box", gpus=[GPU(gpu_id=i, total_vram_gb=24) for i in range(4)]))
+    # GPU 0 is busy, so first-fit would take 1+2 across the SYS link.
+    master.state.nodes["box"].gpus[0].used_vram_gb = 20
+    master.submit(_gang(1))
+    assert sorted(gpu for _, _, gpu in master.schedule_once()) == [2, 3]
+    assert master.scheduler.state.tasks[1].cpu_affinity == [4, 5, 6, 7]
+
+
+def test_topology_aware_prefers_better_node_and_registration_payload():
+    from lab_gpu.server_api import _master, register
+
+    flat = {"matrix": [["X", "PHB"], ["PHB", "X"]]}
+    nvlink = {"matrix": [["X", "NV2"], ["NV2", "X"]]}
+    register(AgentRegister(node="topo-pcie", gpus=[{"id": i, "total_vram_gb": 24} for i in range(2)], topology=flat))
+    register(AgentRegister(node="topo-nv", gpus=[{"id": i, "total_vram_gb": 24} for i in range(2)], topology=nvlink))
+    assert _master.state.nodes["topo-nv"].topology.link(0, 1) == 20.0
+
+    master = Master(Scheduler(SchedulerPolicy(topology_aware=True)))
+    for name in ("topo-pcie", "topo-nv"):
+        master.register_node(_master.state.nodes[name])
+    master.submit(_gang(1))
+    assert {node for _, node, _ in master.schedule_once()} == {"topo-nv"}
+
+
+def test_load_topology_file_accepts_cpu_lists(tmp_path):
+    path = tmp_path / "topology.json"
+    path.write_text(json.dumps({"n": {"matrix": [[0, 12.5], [12.5, 0]], "numa": {"0": 0, "1": 0}, "cpus": {"0": [2, 3]}}}))
+    topology = load_topology_file(str(path))["n"]
+    assert topology.link(0, 1) == 12.5
+    assert topology.cpu_affinity([1]) == [2, 3]
+
+
+@pytest.mark.parametrize(
+    "topology",
+    [
+        {"matrix": [["X", "NVLINK"], ["NVLINK", "X"]]},
+        {"gpus": [0, 1, 2], "matrix": [["X", "NV2"], ["NV2", "X"]]},
+        {"matrix": [["X", "NV2"], ["NV2"]]},
+        {"matrix": [["X", "NV2"], ["NV2", "X"]], "numa": [0]},
+        {"matrix": [["X", "NV2"], ["NV2", "X"]], "cpus": "0-7"},
+    ],
+)
+def test_registration_rejects_malformed_topology(topology):
+    with pytest.raises(ValidationError):
+        AgentRegister(node="n", gpus=[{"id": i, "total_vram_gb": 24} for i in range(2)], topology=topology)
@@ -0,0 +1,81 @@
+import json
+import pstats
+
+from typer.testing import CliRunner
+
+from lab_gpu.cli import app
+from lab_gpu.master import Master
+from lab_gpu.models import GPU, Node, Priority, Task
+from lab_gpu.tracing import TRACER, Tracer, traced
+
+
+def test_spans_fill_a_ring_buffer_and_export_chrome_trace(tmp_path):
+    tracer = Tracer(capacity=2)
+    with tracer.span("off"):
+        pass
+    assert len(tracer) == 0
+    tracer.enable()
+    for name in ("a", "b", "c"):
+        with tracer.span(name, task_id=1):
+            pass
+    events = tracer.chrome_trace()["traceEvents"]
+    assert [e["name"] for e in events] == ["b", "c"]
+    assert events[0]["ph"] == "X" and events[0]["dur"] >= 0 and events[0]["args"] == {"task_id": 1}
+    assert tracer.export(str(tmp_path / "trace.json")) == 2
+    assert json.loads((tmp_path / "trace.json").read_text())["traceEvents"][1]["name"] == "c"
+
+
+def test_scheduler_hot_path_is_traced_only_when_enabled():
+    master = Master()
+    master.register_node(Node(name="n", gpus=[GPU(gpu_id=0, total_vram_gb=24)]))
+    master.submit(Task(task_id=1, user="u", cmd="run", min_vram_gb=1, priority=Priority.NORMAL))
+    TRACER.clear()
+    master.schedule_once()
+    assert len(TRACER) == 0
+    TRACER.enable()
+    try:
+        master.submit(Task(task_id=2, user="u", cmd="run", min_vram_gb=1, priority=Priority.NORMAL))
+        master.schedule_once()
+        master.summary()
+    finally:
+        TRACER.disable()
+    names = [e["name"] for e in TRACER.chrome_trace()["traceEvents"]]
+    TRACER.clear()
+    for name in ("scheduler.schedule", "scheduler.candidates", "scheduler.place", "master.schedule_once", "master.summary"):
+        assert name in names
+    assert traced("x")(lambda value: value * 2)(21) == 42
+
+
+def test_server_profile_dumps_pstats(tmp_path):
+    output = tmp_path / "ticks.pstats"
+    trace = tmp_path / "ticks.json"
+    result = CliRunner().invoke(
+        app, ["server", "profile", "--ticks", "2", "--output", str(output), "--trace", str(trace), "--top", "0"]
+    )
+    assert result.exit_code == 0, result.output
+    assert "Profiled 2 ticks" in result.output
+    assert pstats.Stats(str(output)).total_calls > 0
+    assert json.loads(trace.read_text())["traceEvents"]
+    assert not TRACER.enabled
+
+
+def test_server_profile_leaves_live_state_untouched(tmp_path):
+    from lab_gpu.master import Master
+    from lab_gpu.models import GPU, Node, Priority, Task
+
+    journal = tmp_path / "wal"
+    live = Master()
+    live.open_journal(str(journal))
+    live.register_node(Node(name="n", gpus=[GPU(gpu_id=0, total_vram_gb=24)]))
+    live.submit(Task(task_id=1, user="u", cmd="run", min_vram_gb=4, priority=Priority.NORMAL))
+    live.journal.close()
+    before = {path.name: path.read_bytes() for path in journal.iterdir()}
+    policy = tmp_path / "policy.yaml"
+    policy.write_text(f"journal_path: {journal}\n")
+
+    result = CliRunner().invoke(
+        app, ["server", "profile", "--ticks", "2", "--policy", str(policy), "--output", str(tmp_path / "p.pstats"), "--top", "0"]
+    )
+    assert result.exit_code == 0, result.output
+    assert "Profiled 2 ticks (1 assignments)" in result.output
+    assert {path.name: path.read_bytes() for path in journal.iterdir()} == before
@@ -37,7 +37,11 @@ exports.activate = activate;
 exports.deactivate = deactivate;
 const vscode = __importStar(require("vscode"));
 const child_process_1 = require("child_process");
+const http = __importStar(require("http"));
+const https = __importStar(require("https"));
 const STATUS_POLL_MS = 10000;
+const STREAM_RETRY_MS = 5000;
+const REFRESH_DEBOUNCE_MS = 200;
 const LAST_MEM_KEY = "labgpu.lastMem";
 let lastOoms = 0;
 function runCli(command, cb) {
@@ -45,6 +49,24 @@ function runCli(command, cb) {
         cb(err, stdout, stderr);
     });
 }
+function getJson(url, cb) {
+    const client = url.startsWith("https:") ? https : http;
+    client
+        .get(url, (res) => {
+        let data = "";
+        res.setEncoding("utf8");
+        res.on("data", (chunk) => (data += chunk));
+        res.on("end", () => {
+            try {
+                cb(null, JSON.parse(data));
+            }
+            catch (e) {
+                cb(e);
+            }
+        });
+    })
+        .on("error", (e) => cb(e));
+}
 function activate(context) {
     const output = vscode.window.createOutputChannel("Lab GPU");
     const statusBar = vscode.window.createStatusBarItem(vscode.StatusBarAlignment.Left, 100);
@@ -96,27 +118,79 @@ function activate(context) {
             }
         });
     });
-    const statusTimer = setInterval(() => {
+    const showStatus = (parsed) => {
+        statusBar.text = `GPU: ${parsed.busy ?? 0}/${parsed.total ?? 0} Busy | My Tasks: ${parsed.my_running ?? 0}`;
+        if (typeof parsed.ooms === "number" && parsed.ooms > lastOoms) {
+            lastOoms = parsed.ooms;
+            if (parsed.last_oom_task) {
+                vscode.window.showWarningMessage(`Task #${parsed.last_oom_task} Failed (OOM). Auto-retrying with more memory...`);
+            }
+        }
+    };
+    const pollStatus = () => {
         runCli("lab-gpu status --json", (err, stdout, stderr) => {
             if (err || stderr) {
                 statusBar.text = "GPU: unavailable";
                 return;
             }
             try {
-                const parsed = JSON.parse(stdout);
-                statusBar.text = `GPU: ${parsed.busy ?? 0}/${parsed.total ?? 0} Busy | My Tasks: ${parsed.my_running ?? 0}`;
-                if (typeof parsed.ooms === "number" && parsed.ooms > lastOoms) {
-                    lastOoms = parsed.ooms;
-                    if (parsed.last_oom_task) {
-                        vscode.window.showWarningMessage(`Task #${parsed.last_oom_task} Failed (OOM). Auto-retrying with more memory...`);
-                    }
-                }
+                showStatus(JSON.parse(stdout));
             }
             catch {
                 statusBar.text = "GPU: parse error";
             }
         });
-    }, STATUS_POLL_MS);
+    };
+    // With labgpu.serverUrl set, follow the server's /events stream and refresh
+    // only when something changed; otherwise poll the CLI.
+    const serverUrl = (vscode.workspace.getConfiguration("labgpu").get("serverUrl") || "").replace(/\/+$/, "");
+    let statusTimer;
+    let stream;
+    let stopped = false;
+    const followEvents = () => {
+        if (stopped)
+            return;
+        const client = serverUrl.startsWith("https:") ? https : http;
+        let refreshTimer;
+        let retried = false;
+        const retry = () => {
+            if (retried || stopped)
+                return;
+            retried = true;
+            statusBar.text = "GPU: unavailable";
+            setTimeout(followEvents, STREAM_RETRY_MS);
+        };
+        const refresh = () => {
+            getJson(`${serverUrl}/status`, (err, parsed) => {
+                if (err) {
+                    statusBar.text = "GPU: unavailable";
+                    return;
+                }
+                showStatus(parsed);
+            });
+        };
+        refresh();
+        stream = client.get(`${serverUrl}/events`, (res) => {
+            res.setEncoding("utf8");
+            res.on("data", (chunk) => {
+                // Blank lines are heartbeats; a burst of events costs one refresh.
+                if (!chunk.trim() || refreshTimer)
+                    return;
+                refreshTimer = setTimeout(() => {
+                    refreshTimer = undefined;
+                    refresh();
+                }, REFRESH_DEBOUNCE_MS);
+            });
+            res.on("end", retry);
+        });
+        stream.on("error", retry);
+    };
+    if (serverUrl) {
+        followEvents();
+    }
+    else {
+        statusTimer = setInterval(pollStatus, STATUS_POLL_MS);
+    }
     statusBar.command = "labgpu.showTasks";
     const showTasks = vscode.commands.registerCommand("labgpu.showTasks", async () => {
         runCli("lab-gpu status --json", (err, stdout) => {
@@ -146,7 +220,14 @@ function activate(context) {
         });
     });
     context.subscriptions.push(submitCmd, showTasks, statusBar);
-    context.subscriptions.push({ dispose: () => clearInterval(statusTimer) });
+    context.subscriptions.push({
+        dispose: () => {
+            stopped = true;
+            stream?.destroy();
+            if (statusTimer)
+                clearInterval(statusTimer);
+        },
+    });
 }
 function deactivate() { }
 //# sourceMappingURL=extension.js.map
\ No newline at end of file